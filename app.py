@@ -1,8 +1,5 @@
 
 import streamlit as st
-import torch
-
-torch.classes.__path__ = []
 
 # Page configuration
 st.set_page_config(
@@ -0,0 +1,101 @@
+"""Benchmark the version diff engines against whole-document difflib.
+
+    python benchmarks/bench_diff.py
+    python benchmarks/bench_diff.py --pages 400 --lines 50
+
+Each scenario builds two synthetic versions of a paged document and times
+difflib.unified_diff over the full line lists, as generate_version_diffs
+used to, against diff_texts() with every engine and per-page text. Every
+engine's hunks are applied back to the old version and must reproduce the
+new one.
+"""
+
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared_utils.diff_engine import DIFF_ENGINES, diff_texts
+
+
+def make_pages(rng, pages, lines, vocabulary, words_per_line):
+    words = [''.join(rng.choice('abcdefghij') for _ in range(6)) for _ in range(vocabulary)]
+    return [
+        ''.join(' '.join(rng.choice(words) for _ in range(words_per_line)) + '\n' for _ in range(lines))
+        for _ in range(pages)
+    ]
+
+
+def edit_page(rng, page, fraction):
+    return ''.join(
+        'x' + line if rng.random() < fraction else line
+        for line in page.splitlines(keepends=True)
+    )
+
+
+def scenarios(rng, pages, lines):
+    text = make_pages(rng, pages, lines, vocabulary=500, words_per_line=8)
+    one_page = list(text)
+    one_page[pages // 2] = edit_page(rng, text[pages // 2], 0.05)
+    yield 'one page edited', text, one_page
+    yield '30% of lines edited', text, [edit_page(rng, page, 0.3) for page in text]
+    yield 'OCR re-run, every line', text, [edit_page(rng, page, 1.0) for page in text]
+
+    repetitive = make_pages(rng, pages, lines, vocabulary=30, words_per_line=2)
+    yield 'repetitive lines, 30%', repetitive, [edit_page(rng, page, 0.3) for page in repetitive]
+
+
+def apply_hunks(old_lines, hunks):
+    """Rebuild the new version from the old one and a diff's hunks"""
+    out, pos = [], 0
+    for hunk in hunks:
+        start = hunk['old_start'] - 1 if hunk['old_count'] else hunk['old_start']
+        out.extend(old_lines[pos:start])
+        pos = start
+        for line in hunk['lines'][1:]:
+            if line[0] in ' -':
+                pos += 1
+            if line[0] in ' +':
+                out.append(line[1:])
+    return out + old_lines[pos:]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=200, help="Pages per document")
+    parser.add_argument('--lines', type=int, default=50, help="Lines per page")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failed = False
+    print(f"{'Scenario':<26} {'unified_diff':>12}" + ''.join(f" {name:>10}" for name in DIFF_ENGINES))
+    for name, prev_pages, curr_pages in scenarios(rng, args.pages, args.lines):
+        prev_text, curr_text = ''.join(prev_pages), ''.join(curr_pages)
+        prev_lines, curr_lines = prev_text.splitlines(), curr_text.splitlines()
+
+        _, baseline = timed(lambda: list(difflib.unified_diff(prev_lines, curr_lines, lineterm='')))
+        row = f"{name:<26} {baseline * 1000:10.1f}ms"
+        for engine in DIFF_ENGINES:
+            diff, elapsed = timed(lambda: diff_texts(prev_text, curr_text, engine=engine,
+                                                     prev_pages=prev_pages, curr_pages=curr_pages))
+            ok = apply_hunks(prev_lines, diff['hunks']) == curr_lines
+            failed |= not ok
+            row += f" {elapsed * 1000:8.1f}ms" + ('' if ok else ' BAD')
+        print(row)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
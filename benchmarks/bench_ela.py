@@ -0,0 +1,69 @@
+"""Benchmark the fused ElaEngine against the original ModdedDocAnalyzer chain.
+
+    python benchmarks/bench_ela.py document.pdf --dpi 300 --pages 5
+
+Both paths run on the same rendered pages, and the script checks that they
+find the same suspicious areas and deviation masks.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared_utils.convert_pdf import iter_pdf_pages, pdf_page_count
+from shared_utils.ela import ElaEngine
+from shared_utils.image_utils import ModdedDocAnalyzer
+
+
+def run_chain(analyzer, img):
+    ela_image = analyzer.convert_to_ela_image(img, quality=90)
+    deviation = analyzer.highlight_deviations(ela_image, threshold=20)
+    suspicious_areas, _ = analyzer.detect_highlighted_areas(ela_image)
+    return suspicious_areas, np.asarray(deviation)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdf')
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('--pages', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.pdf, 'rb') as f:
+        pdf_data = f.read()
+
+    analyzer = ModdedDocAnalyzer()
+    engine = ElaEngine(lower_bound=analyzer.lower_bound, upper_bound=analyzer.upper_bound)
+
+    chain_time = engine_time = 0.0
+    mismatches = 0
+    pages_done = min(args.pages, pdf_page_count(pdf_data))
+
+    for page_num, img in enumerate(iter_pdf_pages(pdf_data, dpi=args.dpi, last_page=pages_done)):
+        start = time.perf_counter()
+        chain_areas, chain_deviation = run_chain(analyzer, img)
+        chain_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = engine.analyze(img)
+        engine_time += time.perf_counter() - start
+
+        same = (chain_areas == result['suspicious_areas']
+                and np.array_equal(chain_deviation, result['deviation_mask']))
+        mismatches += not same
+        print(f"Page {page_num + 1}: {len(chain_areas)} areas, {'match' if same else 'MISMATCH'}")
+
+    print(f"\nOriginal chain: {chain_time / pages_done * 1000:.0f} ms/page")
+    print(f"ElaEngine:      {engine_time / pages_done * 1000:.0f} ms/page "
+          f"({chain_time / engine_time:.2f}x)")
+    if mismatches:
+        sys.exit(f"{mismatches} page(s) differ")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Import-time benchmark for the app's entry points.
+
+    python benchmarks/bench_imports.py
+    python benchmarks/bench_imports.py --runs 10 --budget 0.5
+
+Streamlit re-executes app.py and the page scripts, so their top-level
+imports are what every cold start and first page visit pays for. For each
+script the module-level import statements are replayed in a fresh
+interpreter, and the script reports the median wall time and whether any of
+the heavy ML frameworks got pulled in. Those should only load once a model
+is actually requested from shared_utils.model_registry.
+
+Exits non-zero if a script goes over the budget or imports a framework.
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = [
+    'app.py',
+    'pages/homepage.py',
+    'pages/extract_sigs.py',
+    'pages/check_manips.py',
+    'pages/forgery_page.py',
+    'service/server.py'
+]
+HEAVY_MODULES = ('torch', 'transformers', 'ultralytics', 'onnxruntime', 'skimage', 'scipy')
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{'elapsed': elapsed, 'heavy': heavy}}))
+"""
+
+
+def top_level_imports(path):
+    """Source of the module-level import statements in a script"""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    return '\n'.join(
+        ast.unparse(node) for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    )
+
+
+def time_imports(imports, runs):
+    code = _PROBE.format(imports=imports, heavy=HEAVY_MODULES)
+    samples, heavy = [], set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, '-c', code], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        samples.append(result['elapsed'])
+        heavy.update(result['heavy'])
+    return statistics.median(samples), sorted(heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per script")
+    parser.add_argument('--budget', type=float, default=1.0, help="Allowed import time per script, seconds")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'Script':<26} {'Imports':>9}   Heavy modules")
+    for script in SCRIPTS:
+        elapsed, heavy = time_imports(top_level_imports(os.path.join(ROOT_DIR, script)), args.runs)
+        over = elapsed > args.budget
+        failed |= over or bool(heavy)
+        flag = '  over budget' if over else ''
+        print(f"{script:<26} {elapsed * 1000:7.0f}ms   {', '.join(heavy) or '-'}{flag}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Load benchmark for micro-batched forgery verification.
+
+    python benchmarks/bench_microbatch.py --clients 16 --requests 20
+    python benchmarks/bench_microbatch.py --synthetic --clients 32
+
+Simulates many analysts verifying at once: each client thread sends its
+requests back to back. The same load runs twice, once with every request
+taking its own forward pass through the shared model (serialized, as a
+single session object must be) and once through the MicroBatcher, and the
+script prints throughput and latency for both.
+
+Without an exported ViT model, --synthetic stands in a model whose call
+cost is a fixed overhead plus a per-image cost, which is the shape that
+makes batching pay off.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from shared_utils.micro_batch import MicroBatcher
+from shared_utils.model_registry import classify_batch
+
+
+class SyntheticClassifier:
+    """Sleeps overhead + per_image * len(batch), like a batched forward pass."""
+
+    def __init__(self, overhead_ms=20.0, per_image_ms=3.0):
+        self.overhead = overhead_ms / 1000
+        self.per_image = per_image_ms / 1000
+
+    def __call__(self, images, batch_size=None):
+        single = isinstance(images, Image.Image)
+        batch = [images] if single else list(images)
+        time.sleep(self.overhead + self.per_image * len(batch))
+        results = [[{'label': 'genuine', 'score': 0.9}, {'label': 'forgery', 'score': 0.1}] for _ in batch]
+        return results[0] if single else results
+
+
+def run_load(call, clients, requests, image):
+    latencies = []
+    record = threading.Lock()
+
+    def client():
+        for _ in range(requests):
+            start = time.perf_counter()
+            call(image)
+            elapsed = time.perf_counter() - start
+            with record:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pick = lambda q: latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000
+    return {
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': pick(0.5),
+        'p95_ms': pick(0.95)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16, help="Concurrent client threads")
+    parser.add_argument('--requests', type=int, default=20, help="Requests per client")
+    parser.add_argument('--max-batch', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10)
+    parser.add_argument('--synthetic', action='store_true', help="Use a simulated model instead of the ViT")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        model = SyntheticClassifier()
+    else:
+        from shared_utils.model_registry import get_forgery_classifier
+        model = get_forgery_classifier()
+
+    image = Image.new('RGB', (448, 224), 'white')
+
+    lock = threading.Lock()
+
+    def unbatched(img):
+        with lock:
+            return model(img)
+
+    batcher = MicroBatcher(lambda images: classify_batch(model, images),
+                           max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+
+    print(f"{args.clients} clients x {args.requests} requests, "
+          f"max batch {args.max_batch}, max wait {args.max_wait_ms}ms")
+    baseline = run_load(unbatched, args.clients, args.requests, image)
+    batched = run_load(batcher, args.clients, args.requests, image)
+    batcher.close()
+
+    for name, stats in (('Per-request', baseline), ('Micro-batched', batched)):
+        print(f"  {name:<14} {stats['throughput']:8.1f} req/s   "
+              f"p50 {stats['p50_ms']:7.1f} ms   p95 {stats['p95_ms']:7.1f} ms")
+    print(f"  Mean batch size {batcher.mean_batch_size:.1f}, "
+          f"throughput {batched['throughput'] / baseline['throughput']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Compare the pdf2image (poppler subprocess) and PyMuPDF rasterization paths.
+
+    python benchmarks/bench_rasterize.py document.pdf --dpi 200 300
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared_utils.convert_pdf import iter_pdf_pages
+
+
+def bench_pdf2image(pdf_data, dpi):
+    from pdf2image import convert_from_bytes
+
+    start = time.perf_counter()
+    pages = convert_from_bytes(pdf_data, dpi=dpi)
+    for img in pages:
+        img.load()
+    return len(pages), time.perf_counter() - start
+
+
+def bench_pymupdf(pdf_data, dpi, as_array=False):
+    start = time.perf_counter()
+    count = 0
+    for img in iter_pdf_pages(pdf_data, dpi=dpi, as_array=as_array):
+        count += 1
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdf')
+    parser.add_argument('--dpi', type=int, nargs='+', default=[200, 300])
+    args = parser.parse_args()
+
+    with open(args.pdf, 'rb') as f:
+        pdf_data = f.read()
+
+    runs = [
+        ('pdf2image', bench_pdf2image),
+        ('pymupdf (PIL)', bench_pymupdf),
+        ('pymupdf (array)', lambda data, dpi: bench_pymupdf(data, dpi, as_array=True))
+    ]
+
+    for dpi in args.dpi:
+        print(f"\n{dpi} DPI")
+        for name, fn in runs:
+            try:
+                pages, elapsed = fn(pdf_data, dpi)
+            except Exception as e:
+                print(f"  {name:<16} failed: {e}")
+                continue
+            print(f"  {name:<16} {elapsed:7.2f}s  {pages / elapsed:6.1f} pages/s")
+
+
+if __name__ == '__main__':
+    main()
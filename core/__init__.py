@@ -0,0 +1,28 @@
+"""UI-free document forensics.
+
+Every function here takes raw bytes or images and returns plain data, so
+the analyses can be profiled, batched or served without Streamlit. The
+pages under pages/ only render what these return.
+"""
+
+from core.manipulation import analyze_manipulation
+from core.signatures import (
+    crop_signatures,
+    detect_signatures,
+    encode_crops,
+    iter_signature_pages,
+    signature_crops,
+    write_crops_zip
+)
+from core.verification import verify_signature
+
+__all__ = [
+    'analyze_manipulation',
+    'crop_signatures',
+    'detect_signatures',
+    'encode_crops',
+    'iter_signature_pages',
+    'signature_crops',
+    'verify_signature',
+    'write_crops_zip'
+]
@@ -0,0 +1,42 @@
+"""ELA and incremental-update analysis of a PDF."""
+
+from shared_utils.extract_versions import analyze_pdf_versions
+from shared_utils.image_utils import ModdedDocAnalyzer
+
+
+def analyze_manipulation(pdf_bytes, first_page=1, last_page=None, dpi=300, preview_width=1200,
+                         versions=True, analyzer=None, workers=None, use_cache=True, prefilter=True,
+                         images=True):
+    """
+    Look for signs of manipulation in a PDF.
+
+    Args:
+        pdf_bytes (bytes): The PDF file content
+        first_page, last_page (int): 1-based page range for ELA, last_page
+            None for the whole document
+        dpi (int): Render resolution for ELA
+        preview_width (int): Width of the preview images kept per page, or
+            None to keep full resolution
+        versions (bool): Also compare the text of incremental saves
+        analyzer (ModdedDocAnalyzer): Custom HSV bounds, defaults apply otherwise
+        workers (int): Render/analysis worker processes
+        use_cache (bool): Reuse cached pages and results
+        prefilter (bool): Skip ELA on pages with no content to draw
+        images (bool): Keep display images per page, False for areas only
+
+    Returns:
+        dict: ELA 'pages' and 'summary' as from ModdedDocAnalyzer.analyze_pdf,
+            and 'versions' from analyze_pdf_versions (None when the PDF has
+            no incremental updates or versions is False)
+    """
+    analyzer = analyzer or ModdedDocAnalyzer()
+    ela = analyzer.analyze_pdf(
+        pdf_bytes, first_page=first_page, last_page=last_page, dpi=dpi,
+        workers=workers, preview_width=preview_width, use_cache=use_cache, prefilter=prefilter,
+        images=images
+    )
+    return {
+        'pages': ela['pages'],
+        'summary': ela['summary'],
+        'versions': analyze_pdf_versions(pdf_bytes, use_cache=use_cache) if versions else None
+    }
@@ -0,0 +1,252 @@
+"""Signature detection over every page of a PDF."""
+
+import io
+import json
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from shared_utils.convert_pdf import REGION_MARGIN, open_pdf, region_clips, render_regions
+from shared_utils.detection import detect_document
+from shared_utils.model_registry import get_signature_detector
+
+# Stage-one render resolution for coarse-to-fine detection
+COARSE_DPI = int(os.environ.get('STREAMHP_COARSE_DPI', 72))
+
+
+def _signature_records(detections):
+    return [
+        {'bbox': [int(v) for v in box], 'confidence': float(score), 'label': label}
+        for box, score, label in zip(detections['boxes'], detections['scores'], detections['labels'])
+    ]
+
+
+def _pixel_box(clip, shape, dpi):
+    x1, y1 = round(clip.x0 * dpi / 72), round(clip.y0 * dpi / 72)
+    return [x1, y1, x1 + shape[1], y1 + shape[0]]
+
+
+def iter_signature_pages(pdf_bytes, dpi=200, model=None, use_cache=True, workers=None, tiled=False,
+                         prefilter=True, coarse_dpi=None):
+    """
+    Detect signatures page by page, yielding each page as soon as it's done.
+
+    With coarse_dpi, pages are rendered and searched at that resolution
+    and only the detected regions are rendered again at dpi. The detector
+    letterboxes every page to its input size anyway, so a 72 DPI letter
+    page (612 x 792) loses little against 200 DPI, at a tenth of the
+    rasterization cost.
+
+    Args:
+        pdf_bytes (bytes): The PDF file content
+        dpi (int): Render resolution, for crops only when coarse_dpi is set
+        model: Detector to use, defaults to the shared signature detector
+        use_cache (bool): Reuse cached pages and detections
+        workers (int): Render processes, 1 renders in this process
+        tiled (bool): Detect over overlapping tiles to catch small signatures
+        prefilter (bool): Skip detection on blank pages
+        coarse_dpi (int): Detect on renders at this DPI, e.g. COARSE_DPI
+
+    Yields:
+        dict: 'page' (1-based), the rendered 'image', raw 'detections'
+            arrays, 'signatures' as a list of bbox/confidence/label dicts
+            (pixels of 'image') and whether the page was 'skipped' as blank.
+            With coarse_dpi, 'crops' holds each signature rendered at dpi,
+            padded by REGION_MARGIN points, and 'crop_boxes' where each
+            crop sits in page pixels at dpi.
+    """
+    if coarse_dpi and tiled:
+        raise ValueError("Tiled detection needs full-resolution pages, use it without coarse_dpi")
+
+    model = model or get_signature_detector()
+    detected = detect_document(model, pdf_bytes, dpi=coarse_dpi or dpi, use_cache=use_cache,
+                               workers=workers, tiled=tiled, prefilter=prefilter)
+    doc = open_pdf(pdf_bytes) if coarse_dpi else None
+    try:
+        for page_num, img, detections in detected:
+            page = {
+                'page': page_num + 1,
+                'image': img,
+                'detections': detections,
+                'signatures': _signature_records(detections),
+                'skipped': detections.get('skipped', False),
+                'crop_dpi': dpi
+            }
+            if doc is not None:
+                clips = region_clips(doc[page_num], detections['boxes'], source_dpi=coarse_dpi)
+                page['crops'] = render_regions(doc[page_num], clips, dpi=dpi)
+                page['crop_boxes'] = [
+                    _pixel_box(clip, crop.shape, dpi) for clip, crop in zip(clips, page['crops'])
+                ]
+                page['crop_padding'] = REGION_MARGIN
+            yield page
+    finally:
+        if doc is not None:
+            doc.close()
+
+
+def crop_signatures(image, signatures):
+    """
+    Cut each signature's bbox out of a page image as (H, W, 3) arrays.
+
+    Crops are copies, so the page can be freed once it has been cropped.
+    """
+    pixels = np.asarray(image)
+    return [pixels[y1:y2, x1:x2].copy() for x1, y1, x2, y2 in (s['bbox'] for s in signatures)]
+
+
+def signature_crops(page):
+    """
+    Crop every signature on a page.
+
+    Pages from coarse-to-fine detection already carry high-DPI 'crops',
+    which are used instead.
+
+    Args:
+        page (dict): A page from iter_signature_pages()
+
+    Returns:
+        list: dicts with the 'page' number, the signature's 1-based 'index'
+            on that page, its 'confidence', the crop 'image', and where the
+            crop sits on the page: 'bbox' in page pixels at 'dpi', including
+            'padding_pt' points of padding around the detection
+    """
+    if 'crops' in page:
+        images, boxes = page['crops'], page['crop_boxes']
+        padding = page['crop_padding']
+    else:
+        images = crop_signatures(page['image'], page['signatures'])
+        boxes, padding = [s['bbox'] for s in page['signatures']], 0
+    return [
+        {
+            'page': page['page'],
+            'index': index,
+            'bbox': box,
+            'dpi': page.get('crop_dpi'),
+            'padding_pt': padding,
+            'confidence': signature['confidence'],
+            'image': image
+        }
+        for index, (signature, image, box) in enumerate(zip(page['signatures'], images, boxes), start=1)
+    ]
+
+
+def encode_png(pixels):
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def encode_crops(crops, workers=None):
+    """
+    PNG-encode crops from signature_crops() in a thread pool.
+
+    Pillow releases the GIL while compressing, so crops encode in parallel.
+
+    Returns:
+        list: PNG bytes, in the same order as crops
+    """
+    if not crops:
+        return []
+    workers = workers or min(len(crops), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(encode_png, (crop['image'] for crop in crops)))
+
+
+def crop_file_name(crop):
+    return f"signature_page{crop['page']}_sig{crop['index']}.png"
+
+
+def write_crops_zip(crops, file, workers=None):
+    """
+    Stream crops and a JSON manifest into a ZIP archive.
+
+    Crops are encoded in a thread pool with at most a few PNGs in flight per
+    worker, and each is written to the archive as soon as it's ready, so
+    memory stays flat however many signatures there are. PNGs are already
+    compressed and are stored as is.
+
+    Args:
+        crops (list): Records from signature_crops()
+        file: Path or writable binary file for the archive
+        workers (int): Encoding threads, defaults to the CPU count
+
+    Returns:
+        list: The manifest entries, one per crop with its 'file', 'page',
+            'index', 'bbox' of the crop in page pixels at 'dpi', the
+            'padding_pt' included around the detection and 'confidence'
+    """
+    workers = workers or os.cpu_count() or 1
+    window = 2 * workers
+    manifest = []
+
+    with zipfile.ZipFile(file, 'w', compression=zipfile.ZIP_STORED) as archive, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        remaining = iter(crops)
+        pending = deque()
+        while True:
+            for crop in remaining:
+                pending.append((crop, pool.submit(encode_png, crop['image'])))
+                if len(pending) >= window:
+                    break
+            if not pending:
+                break
+
+            crop, future = pending.popleft()
+            name = crop_file_name(crop)
+            archive.writestr(name, future.result())
+            manifest.append({
+                'file': name,
+                'page': crop['page'],
+                'index': crop['index'],
+                'bbox': crop['bbox'],
+                'dpi': crop['dpi'],
+                'padding_pt': crop['padding_pt'],
+                'confidence': crop['confidence']
+            })
+
+        archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+    return manifest
+
+
+def detect_signatures(pdf_bytes, dpi=200, model=None, use_cache=True, with_crops=False, workers=None,
+                      tiled=False, prefilter=True, coarse_dpi=None):
+    """
+    Detect signatures on every page of a PDF.
+
+    Boxes are always in page pixels at dpi, also when coarse_dpi detects on
+    lower-resolution renders, so they line up with the crops.
+
+    Returns:
+        dict: 'dpi' of the boxes, 'total_pages', 'total_signatures',
+            'skipped_pages' (pages the pre-filter found blank) and 'pages',
+            each with its 'page' number, 'signatures' and, if asked, their
+            'crops', with each signature's padded 'crop_bbox'
+    """
+    scale = dpi / coarse_dpi if coarse_dpi else 1
+    pages = []
+    for page in iter_signature_pages(pdf_bytes, dpi=dpi, model=model, use_cache=use_cache, workers=workers,
+                                     tiled=tiled, prefilter=prefilter, coarse_dpi=coarse_dpi):
+        signatures = [
+            {**signature, 'bbox': [round(v * scale) for v in signature['bbox']]}
+            for signature in page['signatures']
+        ]
+        entry = {'page': page['page'], 'signatures': signatures, 'skipped': page['skipped']}
+        if with_crops:
+            crops = signature_crops(page)
+            entry['crops'] = [crop['image'] for crop in crops]
+            for signature, crop in zip(signatures, crops):
+                signature['crop_bbox'] = crop['bbox']
+        pages.append(entry)
+
+    return {
+        'dpi': dpi,
+        'total_pages': len(pages),
+        'total_signatures': sum(len(p['signatures']) for p in pages),
+        'skipped_pages': sum(p['skipped'] for p in pages),
+        'pages': pages
+    }
@@ -0,0 +1,53 @@
+"""Genuine/forged verdicts for a questioned signature against a reference."""
+
+import io
+
+from PIL import Image
+
+from shared_utils.combine_imgs import create_comparison_image
+from shared_utils.model_registry import get_batched_forgery_classifier
+
+
+def _load_image(image):
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(image))
+    return image
+
+
+def confidence_level(score):
+    """'high', 'medium' or 'low', the bands the forgery page reports"""
+    if score > 0.8:
+        return 'high'
+    if score > 0.6:
+        return 'medium'
+    return 'low'
+
+
+def verify_signature(reference, questioned, model=None):
+    """
+    Classify a questioned signature as genuine or forged against a reference.
+
+    Args:
+        reference, questioned: Image bytes, paths, file objects or PIL images
+        model: Classifier to use, defaults to the shared forgery classifier
+            behind the micro-batching scheduler
+
+    Returns:
+        dict: 'verdict' ('genuine' or 'forgery'), its 'score', the
+            'confidence' band, all label 'scores' and the side-by-side
+            'comparison' image the classifier saw
+    """
+    model = model or get_batched_forgery_classifier()
+    comparison = create_comparison_image(_load_image(reference), _load_image(questioned))
+    scores = {r['label']: float(r['score']) for r in model(comparison)}
+
+    genuine, forgery = scores.get('genuine', 0.0), scores.get('forgery', 0.0)
+    verdict, score = ('genuine', genuine) if genuine > forgery else ('forgery', forgery)
+
+    return {
+        'verdict': verdict,
+        'score': score,
+        'confidence': confidence_level(score),
+        'scores': scores,
+        'comparison': comparison
+    }
@@ -1,11 +1,7 @@
 import streamlit as st
 
-from shared_utils import analyze_pdf_versions, display_diff_summary, ModdedDocAnalyzer
-import torch
-
-torch.classes.__path__ = []
-
-analyzer = ModdedDocAnalyzer()
+from core import analyze_manipulation
+from shared_utils import display_diff_summary
     
 st.markdown(
     """
@@ -68,16 +64,22 @@ col1, col2 = st.columns([0.3, 0.7], gap='large')
 
 with col1:
     manip_uploader = st.file_uploader(label="Upload PDF File", type="pdf", accept_multiple_files=False)
+    first_page = st.number_input("First page", min_value=1, value=1, step=1)
+    last_page = st.number_input("Last page (0 = all pages)", min_value=0, value=0, step=1)
     manip_submit = st.button("Submit")
 
 with col2:
     c1, c2 = st.columns(2)
     if manip_submit:
         if manip_uploader:
+            result = analyze_manipulation(
+                manip_uploader.getvalue(),
+                first_page=int(first_page),
+                last_page=int(last_page) or None
+            )
             with c1:
-                result = analyzer.analyze_pdf(manip_uploader)
+                summary = result.get('summary')
 
-                result_img = result.get('images').get('deviation_mask')
                 with st.container(key='manip-card'):
                     st.markdown("## Detection Results")
                     st.markdown("""
@@ -88,8 +90,20 @@ with col2:
 
                     """, unsafe_allow_html=True)
                     st.divider()
-                    st.image(result_img)
+                    flagged = ', '.join(str(p) for p in summary['flagged_pages']) or 'none'
+                    st.markdown(f"""
+                    <div class="workflow-step">
+                        <strong>Pages analyzed:</strong> {summary['pages_analyzed']} of {summary['total_pages']}<br>
+                        <strong>Empty pages skipped:</strong> {summary['pages_skipped']}<br>
+                        <strong>Suspicious areas:</strong> {summary['suspicious_areas_count']}<br>
+                        <strong>Flagged pages:</strong> {flagged}
+                    </div>
+                    """, unsafe_allow_html=True)
+
+                    for page in result.get('pages'):
+                        st.markdown(f"#### Page {page['page']}: {page['suspicious_areas_count']} suspicious area(s)")
+                        st.image(page['images']['deviation_mask'])
             with c2:
-                result = analyze_pdf_versions(manip_uploader)
+                versions = result.get('versions')
                 with st.container(key='version-card'):
-                    display_diff_summary(result.get('diffs'))
\ No newline at end of file
+                    display_diff_summary(versions.get('diffs') if versions else None)
\ No newline at end of file
@@ -1,11 +1,13 @@
+import os
+import tempfile
+
 import streamlit as st
-from pdf2image import convert_from_bytes
-from PIL import Image
-from io import BytesIO
-import numpy as np
-import torch
 
-torch.classes.__path__ = []
+from core import encode_crops, iter_signature_pages, signature_crops, write_crops_zip
+from core.signatures import COARSE_DPI, crop_file_name
+from shared_utils.convert_pdf import pdf_page_count
+from shared_utils.detection import draw_detections
+from shared_utils.model_registry import get_signature_detector
 
 
 st.markdown(
@@ -98,12 +100,117 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-@st.cache_resource()
+
 def load_signature():
-    from ultralytics import YOLO
+    return get_signature_detector()
+
+
+def results_header():
+    st.subheader("📊 Analysis Results")
+    st.markdown("""<hr style="height:10px;border:none;color:#333;background-color:#808080;" /> """, unsafe_allow_html=True) 
+
+    st.write("---")
+
+
+def page_preview(page):
+    """
+    Keep only what show_page needs from a detected page.
+
+    Previews are drawn and downscaled to their display width, so results
+    kept in the session don't hold full-resolution pages.
+    """
+    preview = {'page': page['page'], 'skipped': page['skipped'], 'signatures': len(page['signatures'])}
+    if page['skipped']:
+        return preview
+
+    if preview['signatures']:
+        image, width = draw_detections(page['image'], page['detections']), 400
+    else:
+        image, width = page['image'].copy(), 300
+    image.thumbnail((width, image.height))
+    preview['image'] = image
+    return preview
+
+
+def show_page(preview):
+    """Show one page's detections, or the page itself if it has none"""
+    page_signatures = preview['signatures']
+
+    if preview['skipped']:
+        st.info(f"Page {preview['page']} is blank, skipped")
+    elif page_signatures == 0:
+        st.warning(f"No signatures detected")
+        st.image(preview['image'], caption=f"Page {preview['page']}:", width=300)
+    else:
+        st.markdown(f"##### ***Found {page_signatures} total signature(s)***")
+        
+        # Show detection results
+        st.markdown("##### Detections:")
+        with st.container(key='inner-card2'):
+            st.image(preview['image'], width=400)
+
+
+def show_crops(results):
+    """Show every crop, PNG-encoding only the ones selected for download"""
+    crops = results['crops']
+    selected = []
+    for crop in crops:
+        name = f"Signature {crop['index']} (page {crop['page']})"
+        with st.container(key='inner-card1'):
+            st.image(crop['image'], caption=name, width=400)
+        if st.checkbox(f"Select {name} for download", key=f"select_{crop['page']}_{crop['index']}"):
+            selected.append(crop)
+        st.markdown("---")
+
+    if not selected:
+        return
+
+    # Encoded crops are kept, so toggling a selection only encodes the new one
+    encoded = results['png']
+    pending = [crop for crop in selected if (crop['page'], crop['index']) not in encoded]
+    for crop, png in zip(pending, encode_crops(pending)):
+        encoded[(crop['page'], crop['index'])] = png
+
+    st.markdown("##### Downloads:")
+    for crop in selected:
+        st.download_button(
+            label=f"Download Signature {crop['index']} (page {crop['page']})",
+            data=encoded[(crop['page'], crop['index'])],
+            file_name=crop_file_name(crop),
+            mime="image/png",
+            key=f"download_{crop['page']}_{crop['index']}",
+            on_click='ignore',
+            type='primary'
+        )
+
+
+def show_bulk_export(results):
+    """Offer every crop plus a manifest as one ZIP, built on request"""
+    if not results['crops']:
+        return
+
+    if st.button("📦 Prepare ZIP of all signatures", key='prepare_zip', use_container_width=True):
+        with st.spinner(f"Writing {len(results['crops'])} signatures to ZIP..."):
+            # Streamed through an anonymous temp file, which is gone once
+            # closed, and read back once so reruns reuse the same payload
+            with tempfile.TemporaryFile() as f:
+                write_crops_zip(results['crops'], f)
+                f.seek(0)
+                results['zip'] = f.read()
+
+    if results.get('zip'):
+        stem = os.path.splitext(results['name'])[0]
+        st.download_button(
+            label="Download all signatures (ZIP)",
+            data=results['zip'],
+            file_name=f"{stem}_signatures.zip",
+            mime="application/zip",
+            key='download_zip',
+            on_click='ignore',
+            type='primary',
+            use_container_width=True
+        )
 
-    sig_model = YOLO('models/sig_detect.onnx')
-    return sig_model
 
 st.markdown("""
 <div class="main-header">
@@ -125,97 +232,86 @@ with col1:
     
     if pdf_uploader:
         st.success(f"✅ Uploaded: {pdf_uploader.name}")
+        tiled = st.checkbox(
+            "High-resolution tiled detection",
+            help="Runs the detector over overlapping tiles of each page to catch small initials. Slower."
+        )
+        coarse = st.checkbox(
+            "Fast two-pass detection",
+            value=False,
+            disabled=tiled,
+            help=f"Searches {COARSE_DPI} DPI renders of each page and renders only the signatures at full quality."
+        )
         submit_btn = st.button("🔍 Analyze Document", type="primary", use_container_width=True)
     else:
         submit_btn = False
 
 with col2:
+    # Results outlive the run that produced them, so selecting crops for
+    # download doesn't lose the analysis
+    results = st.session_state.get('signature_results')
+
     if not pdf_uploader:
         st.info("""
         ### 📋 Instructions:
         1. Upload a PDF document using the file uploader
         2. Click "Analyze Document" to detect signatures
-        3. View detected signatures and extracted crops
+        3. View detected signatures and select crops to download
         
         **Supported formats:** PDF files only
         """)
-    elif submit_btn and pdf_uploader is not None:
+        results = None
+    elif submit_btn:
         with st.spinner("Converting PDF and analyzing signatures..."):
-            pdf_images = convert_from_bytes(
-                pdf_uploader.getvalue(), 
-                dpi=200,
-                fmt='jpeg'
-            )
+            pdf_bytes = pdf_uploader.getvalue()
             
             # Load model
             model = load_signature()
             
-            # Summary metrics
-            total_signatures = 0
-            total_pages = len(pdf_images)
+            results = {
+                'file_id': pdf_uploader.file_id,
+                'name': pdf_uploader.name,
+                'total_pages': pdf_page_count(pdf_bytes),
+                'pages': [],
+                'crops': [],
+                'png': {}
+            }
             
             with st.container(key='sig-card'):
+                results_header()
                 
-                st.subheader("📊 Analysis Results")
-                st.markdown("""<hr style="height:10px;border:none;color:#333;background-color:#808080;" /> """, unsafe_allow_html=True) 
+                # Pages render across worker processes as detection consumes
+                # them, and detections for a previously seen PDF come from cache
+                coarse_dpi = COARSE_DPI if coarse and not tiled else None
+                for page in iter_signature_pages(pdf_bytes, dpi=200, model=model, tiled=tiled,
+                                                 coarse_dpi=coarse_dpi):
+                    preview = page_preview(page)
+                    show_page(preview)
+                    results['pages'].append(preview)
+                    results['crops'].extend(signature_crops(page))
+
+            st.session_state['signature_results'] = results
+    elif results is not None and results['file_id'] == pdf_uploader.file_id:
+        with st.container(key='sig-card'):
+            results_header()
+            for preview in results['pages']:
+                show_page(preview)
+    else:
+        results = None
+
+    if results is not None:
+        total_pages = results['total_pages']
+        total_signatures = len(results['crops'])
+        skipped_pages = sum(preview['skipped'] for preview in results['pages'])
+
+        with st.container(key='sig2-card'):
+            st.subheader("✂️ Extracted Signatures:")
+            st.markdown("""<hr style="height:10px;border:none;color:#333;background-color:#808080;" /> """, unsafe_allow_html=True) 
+
+            st.write("---")
+            show_bulk_export(results)
+            show_crops(results)
 
-                st.write("---")
-                
-                # Process each page
-                for page_num, img in enumerate(pdf_images):
-                  
-                    # Run prediction
-                    prediction = model.predict(img)
-                    
-                    for p in prediction:
-                        boxes = p.boxes
-                        page_signatures = len(boxes)
-                        total_signatures += page_signatures
-                        
-                        if page_signatures == 0:
-                            st.warning(f"No signatures detected")
-                            st.image(img, caption=f"Page {page_num + 1}:", width=300)
-                        else:
-                            st.markdown(f"##### ***Found {page_signatures} total signature(s)***")
-                            
-                            # Show detection results
-                            st.markdown("##### Detections:")
-                            with st.container(key='inner-card2'):
-                                st.image(p.plot(), width=400)
-                            
-            with st.container(key='sig2-card'):
-                st.subheader("✂️ Extracted Signatures:")
-                st.markdown("""<hr style="height:10px;border:none;color:#333;background-color:#808080;" /> """, unsafe_allow_html=True) 
-
-                st.write("---")
-                # Extract and display crops
-                img_array = np.array(img)
-                
-                for i, box in enumerate(boxes):
-                    # Get bounding box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                    
-                    # Crop the image
-                    cropped = img_array[y1:y2, x1:x2]
-                    crop_img = Image.fromarray(cropped)
-                    with st.container(key='inner-card1'):
-                        st.image(crop_img, caption=f"Signature {i+1}", width=400)
-                    
-                    # Download button
-                    img_buffer = BytesIO()
-                    crop_img.save(img_buffer, format='PNG')
-                    img_buffer.seek(0)
-                    
-                    st.download_button(
-                        label=f"Download Signature {i+1}",
-                        data=img_buffer.getvalue(),
-                        file_name=f"signature_page{page_num+1}_sig{i+1}.png",
-                        mime="image/png",
-                        key=f"download_{page_num}_{i}",
-                        type='primary'
-                    )
-                    
-                    st.markdown("---")
         with st.container(key='sig3-card'):
             avg_sigs = round(total_signatures / total_pages, 1) if total_pages > 0 else 0
 
@@ -227,6 +323,10 @@ with col2:
                     <strong>Total Pages:</strong> {total_pages}
                 </div>
                 
+                <div class="workflow-step">
+                    <strong>Blank Pages Skipped:</strong> {skipped_pages}
+                </div>
+                
                 <div class="workflow-step">
                     <strong>Total Signatures:</strong> {total_signatures}
                 </div>
@@ -241,4 +341,4 @@ with col2:
             if total_signatures > 0:
                 st.markdown("### ***Analysis complete!***")
             else:
-                st.markdown("#### ***No signatures detected.***")
\ No newline at end of file
+                st.markdown("#### ***No signatures detected.***")
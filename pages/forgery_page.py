@@ -1,12 +1,10 @@
 import streamlit as st
-from transformers import pipeline
 
 
-from shared_utils.combine_imgs import create_comparison_image
+from core import verify_signature
 from datetime import datetime
-import torch
 
-torch.classes.__path__ = []
+
 def get_custom_css():
     """Return custom CSS for the Streamlit app"""
     return """
@@ -258,14 +256,10 @@ if img_sub:
         with result_col1:
             with st.spinner("🔄 Analyzing signatures..."):
                 try:
-                    # Load model
-                    model = pipeline("image-classification", 'aevalone/vit-base-patch16-224-finetuned-forgery')
-                    
-                    # Create comparison image
-                    combined_img = create_comparison_image(img1_upload, img2_upload)
+                    verification = verify_signature(img1_upload, img2_upload)
                     
                     st.subheader("📊 Signature Comparison")
-                    st.image(combined_img, caption="Side-by-side signature comparison",  use_container_width=True)
+                    st.image(verification['comparison'], caption="Side-by-side signature comparison",  use_container_width=True)
                     
                 except Exception as e:
                     st.error(f"❌ Error during analysis: {str(e)}")
@@ -273,29 +267,14 @@ if img_sub:
         
         with result_col2:
             try:
-                # Get model results
-                results = model(combined_img)
-                
-                # Process results
-                gscore = 0
-                fscore = 0
-                
-                for r in results:
-                    if r.get('label') == 'genuine':
-                        gscore = r.get('score', 0)
-                    elif r.get('label') == 'forgery':
-                        fscore = r.get('score', 0)
-                
-                # Determine final result
-                if gscore > fscore:
+                final_score = verification['score']
+                if verification['verdict'] == 'genuine':
                     final_result = "Genuine"
-                    final_score = gscore
                     result_color = "#28a745"
                     icon = "✓"
                     conf_text = "GENUINE"
                 else:
                     final_result = "Forged"
-                    final_score = fscore
                     result_color = "#dc3545"
                     icon = "✗"
                     conf_text = "FORGERY"
@@ -307,9 +286,9 @@ if img_sub:
                 create_result_card(conf_text, icon, result_color, final_score)
                 
                 # Additional details
-                if final_score > 0.8:
+                if verification['confidence'] == 'high':
                     st.success("High confidence - The model is very certain about this prediction")
-                elif final_score > 0.6:
+                elif verification['confidence'] == 'medium':
                     st.warning("Medium confidence - The model has reasonable certainty")
                 else:
                     st.info("Low confidence - Consider additional analysis or expert review")
@@ -1,7 +1,4 @@
 import streamlit as st
-import torch
-
-torch.classes.__path__ = []
 
 
 
@@ -0,0 +1,9 @@
+"""HTTP inference service over the core analyses.
+
+Run with `python -m service`; see service.server for the endpoints and
+service.client for a local client and load tester.
+"""
+
+from service.server import InferenceService
+
+__all__ = ['InferenceService']
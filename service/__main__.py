@@ -0,0 +1,25 @@
+import argparse
+import asyncio
+
+from service.server import DEFAULT_QUEUE_SIZE, DEFAULT_WORKERS, InferenceService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve signature detection, ELA and verification over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Concurrent inference jobs")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Jobs allowed to wait for a worker before requests get 503")
+    parser.add_argument('--preload', action='store_true', help="Load the models before accepting requests")
+    args = parser.parse_args()
+
+    service = InferenceService(workers=args.workers, queue_size=args.queue_size)
+    try:
+        asyncio.run(service.serve(args.host, args.port, preload=args.preload))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""Asyncio client and load tester for the inference service.
+
+    python -m service.client health
+    python -m service.client detect document.pdf
+    python -m service.client verify reference.png questioned.png
+    python -m service.client load verify reference.png questioned.png --concurrency 32 --requests 500
+
+The load command keeps `concurrency` requests in flight over persistent
+connections and reports throughput, latency percentiles and how many
+requests the service turned away with 503.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+
+class ServiceClient:
+    """One keep-alive connection to the service, opened on first use."""
+
+    def __init__(self, host='127.0.0.1', port=8080):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._reader = self._writer = None
+
+    async def _send(self, method, path, body, content_type):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        )
+        self._writer.write(head.encode('latin-1') + body)
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by the service")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = (await self._reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+        payload = await self._reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, json.loads(payload) if payload else None
+
+    async def request(self, method, path, body=b'', content_type='application/octet-stream'):
+        """Send one request and return (status, decoded JSON payload)"""
+        try:
+            return await self._send(method, path, body, content_type)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # The service may have dropped an idle keep-alive connection
+            await self.close()
+            return await self._send(method, path, body, content_type)
+
+    async def health(self):
+        return await self.request('GET', '/health')
+
+    async def metrics(self):
+        return await self.request('GET', '/metrics')
+
+    async def detect(self, pdf_bytes, dpi=200, tiled=False):
+        query = urlencode({'dpi': dpi, 'tiled': int(tiled)})
+        return await self.request('POST', f"/detect?{query}", pdf_bytes, 'application/pdf')
+
+    async def ela(self, pdf_bytes, first_page=1, last_page=0, dpi=300):
+        query = urlencode({'first_page': first_page, 'last_page': last_page, 'dpi': dpi})
+        return await self.request('POST', f"/ela?{query}", pdf_bytes, 'application/pdf')
+
+    async def verify(self, reference, questioned):
+        body = json.dumps({
+            'reference': base64.b64encode(reference).decode(),
+            'questioned': base64.b64encode(questioned).decode()
+        }).encode()
+        return await self.request('POST', '/verify', body, 'application/json')
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if values else 0.0
+
+
+async def load_test(call, host='127.0.0.1', port=8080, concurrency=16, total=200):
+    """
+    Issue `total` requests with `concurrency` in flight and summarize the run.
+
+    Args:
+        call: async function taking a ServiceClient and returning (status, payload)
+
+    Returns:
+        dict: Throughput, latency percentiles (ms) and status code counts
+    """
+    remaining = iter(range(total))
+    latencies, statuses = [], Counter()
+
+    async def worker():
+        client = ServiceClient(host, port)
+        try:
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    status, _ = await call(client)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    status = 'connection_error'
+                    await client.close()
+                latencies.append(time.perf_counter() - start)
+                statuses[status] += 1
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(statuses[200] / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(_percentile(latencies, 0.5) * 1000, 2),
+            'p95': round(_percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(_percentile(latencies, 0.99) * 1000, 2)
+        },
+        'statuses': dict(statuses)
+    }
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _call_for(endpoint, files):
+    if endpoint == 'verify':
+        reference, questioned = _read(files[0]), _read(files[1])
+        return lambda client: client.verify(reference, questioned)
+    pdf = _read(files[0])
+    return lambda client: getattr(client, endpoint)(pdf)
+
+
+async def _main(args):
+    if args.command == 'load':
+        report = await load_test(
+            _call_for(args.endpoint, args.files), args.host, args.port,
+            concurrency=args.concurrency, total=args.requests
+        )
+        print(json.dumps(report, indent=2))
+        return
+
+    client = ServiceClient(args.host, args.port)
+    try:
+        if args.command in ('health', 'metrics'):
+            status, payload = await getattr(client, args.command)()
+        else:
+            status, payload = await _call_for(args.command, args.files)(client)
+    finally:
+        await client.close()
+    print(status)
+    print(json.dumps(payload, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Call or load-test the inference service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('health', help="Liveness and current load")
+    subparsers.add_parser('metrics', help="Request counts and latency percentiles")
+    for endpoint in ('detect', 'ela'):
+        sub = subparsers.add_parser(endpoint, help=f"POST a PDF to /{endpoint}")
+        sub.add_argument('files', nargs=1, metavar='pdf')
+    verify = subparsers.add_parser('verify', help="POST a reference and questioned signature to /verify")
+    verify.add_argument('files', nargs=2, metavar='image')
+
+    load = subparsers.add_parser('load', help="Load-test one endpoint")
+    load.add_argument('endpoint', choices=('detect', 'ela', 'verify'))
+    load.add_argument('files', nargs='+', help="A PDF, or reference and questioned images for verify")
+    load.add_argument('--concurrency', type=int, default=16)
+    load.add_argument('--requests', type=int, default=200)
+
+    args = parser.parse_args()
+    if args.command == 'load' and args.endpoint == 'verify' and len(args.files) != 2:
+        parser.error("verify needs a reference and a questioned image")
+    asyncio.run(_main(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+"""Asyncio HTTP service over the core analyses, standard library only.
+
+    python -m service --host 127.0.0.1 --port 8080
+
+Endpoints:
+    POST /detect   PDF body, ?dpi=200&tiled=0&coarse_dpi=0 -> signatures per page
+    POST /ela      PDF body, ?first_page&last_page&dpi -> ELA summary and areas
+    POST /verify   JSON {"reference": b64, "questioned": b64} -> verdict
+    GET  /health   liveness and current load
+    GET  /metrics  request counts, rejections and latency percentiles
+
+The event loop only parses requests. Inference runs in a bounded thread
+pool, at most `workers` jobs at once with up to `queue_size` more waiting;
+requests beyond that are turned away with 503 and Retry-After instead of
+piling up, so callers see backpressure rather than timeouts. Each job
+renders its pages in its own thread rather than a process pool of its own,
+so the executor alone bounds CPU use. Render resolutions are clamped to
+MAX_DPI, since one page at an arbitrary DPI can exhaust memory.
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_WORKERS = int(os.environ.get('STREAMHP_SERVICE_WORKERS', min(os.cpu_count() or 1, 4)))
+DEFAULT_QUEUE_SIZE = int(os.environ.get('STREAMHP_SERVICE_QUEUE', 32))
+MAX_BODY_BYTES = int(os.environ.get('STREAMHP_SERVICE_MAX_BODY_MB', 100)) * 1024 * 1024
+MAX_DPI = int(os.environ.get('STREAMHP_SERVICE_MAX_DPI', 600))
+READ_TIMEOUT = 30
+
+
+class HttpError(Exception):
+    def __init__(self, status, message=None, headers=None):
+        super().__init__(message or status.phrase)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _int_param(query, name, default, minimum=None, maximum=None):
+    """Read an integer query parameter, clamped to [minimum, maximum]"""
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+    if minimum is not None:
+        value = max(value, minimum)
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+
+def _dpi_param(query, name, default):
+    return _int_param(query, name, default, minimum=1, maximum=MAX_DPI)
+
+
+def _decode_image(payload, name):
+    value = payload.get(name)
+    if not isinstance(value, str):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be a base64-encoded image")
+    try:
+        return base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} is not valid base64")
+
+
+def _input_errors():
+    """Exceptions meaning the uploaded document or image can't be decoded"""
+    import pymupdf
+    from PIL import UnidentifiedImageError
+
+    return pymupdf.FileDataError, UnidentifiedImageError
+
+
+def _detect(body, query):
+    from core import detect_signatures
+
+    tiled = bool(_int_param(query, 'tiled', 0))
+    coarse_dpi = _int_param(query, 'coarse_dpi', 0, minimum=0, maximum=MAX_DPI) or None
+    if tiled and coarse_dpi:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "tiled can't be combined with coarse_dpi")
+    try:
+        return detect_signatures(
+            body,
+            dpi=_dpi_param(query, 'dpi', 200),
+            tiled=tiled,
+            coarse_dpi=coarse_dpi,
+            workers=1
+        )
+    except _input_errors() as e:
+        raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+
+
+def _ela(body, query):
+    from core import analyze_manipulation
+
+    try:
+        result = analyze_manipulation(
+            body,
+            first_page=_int_param(query, 'first_page', 1, minimum=1),
+            last_page=_int_param(query, 'last_page', 0) or None,
+            dpi=_dpi_param(query, 'dpi', 300),
+            versions=False,
+            workers=1,
+            images=False
+        )
+    except _input_errors() as e:
+        raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+    return {
+        'summary': result['summary'],
+        'pages': [
+            {
+                'page': page['page'],
+                'suspicious_areas': [list(map(int, area)) for area in page['suspicious_areas']],
+                'areas': page['areas']
+            }
+            for page in result['pages']
+        ]
+    }
+
+
+def _verify(body, query):
+    from core import verify_signature
+
+    try:
+        payload = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be JSON")
+    if not isinstance(payload, dict):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+
+    try:
+        result = verify_signature(_decode_image(payload, 'reference'), _decode_image(payload, 'questioned'))
+    except _input_errors() as e:
+        raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+    result.pop('comparison')
+    return result
+
+
+# path -> (method, handler run in the executor)
+ROUTES = {
+    '/detect': ('POST', _detect),
+    '/ela': ('POST', _ela),
+    '/verify': ('POST', _verify)
+}
+
+
+class Metrics:
+    """Per-route counters plus a window of recent latencies for percentiles."""
+
+    def __init__(self, window=1000):
+        self.started = time.time()
+        self.requests = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+        self.rejected = 0
+
+    def record(self, path, status, elapsed):
+        self.requests[path] += 1
+        self.statuses[path][int(status)] += 1
+        self.latencies[path].append(elapsed)
+
+    def snapshot(self):
+        routes = {}
+        for path, count in self.requests.items():
+            latencies = sorted(self.latencies[path])
+            pick = lambda q: round(latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000, 2)
+            routes[path] = {
+                'requests': count,
+                'statuses': dict(self.statuses[path]),
+                'latency_ms': {'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99)} if latencies else None
+            }
+        return {'uptime_s': round(time.time() - self.started, 1), 'rejected': self.rejected, 'routes': routes}
+
+
+class InferenceService:
+    """HTTP front end with a bounded executor and admission control."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inference')
+        self.metrics = Metrics()
+        self.running = 0
+        self.waiting = 0
+        self._slots = None
+
+    async def run_job(self, handler, body, query):
+        """Run a handler in the executor, or reject it if the queue is full"""
+        if self.running + self.waiting >= self.workers + self.queue_size:
+            self.metrics.rejected += 1
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy, retry later", {'Retry-After': '1'})
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, handler, body, query)
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    def health(self):
+        from shared_utils.model_registry import loaded_models
+
+        return {
+            'status': 'ok',
+            'running': self.running,
+            'waiting': self.waiting,
+            'capacity': self.workers + self.queue_size,
+            'models_loaded': loaded_models()
+        }
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+
+        if url.path == '/health':
+            return self.health()
+        if url.path == '/metrics':
+            return {**self.metrics.snapshot(), 'running': self.running, 'waiting': self.waiting}
+
+        route = ROUTES.get(url.path)
+        if route is None:
+            raise HttpError(HTTPStatus.NOT_FOUND)
+        expected, handler = route
+        if method != expected:
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, headers={'Allow': expected})
+        if not body:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Empty request body")
+        return await self.run_job(handler, body, query)
+
+    async def _read_request(self, reader):
+        """Parse one request, returning None when the client closes the connection"""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), READ_TIMEOUT)
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                return None
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Incomplete request")
+        except asyncio.LimitOverrunError:
+            raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ', 2)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise HttpError(HTTPStatus.LENGTH_REQUIRED, "Send a Content-Length instead of chunked bodies")
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await asyncio.wait_for(reader.readexactly(length), READ_TIMEOUT) if length else b''
+
+        keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+        return method, target, body, keep_alive
+
+    @staticmethod
+    async def _write_response(writer, status, payload, keep_alive, extra_headers=None):
+        body = json.dumps(payload, default=str).encode()
+        headers = {
+            'Content-Type': 'application/json',
+            'Content-Length': str(len(body)),
+            'Connection': 'keep-alive' if keep_alive else 'close',
+            **(extra_headers or {})
+        }
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode('latin-1') + b'\r\n' + body)
+        await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                path = None
+                start = time.perf_counter()
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, body, keep_alive = request
+                    path = urlsplit(target).path
+                    payload = await self.dispatch(method, target, body)
+                    status, headers = HTTPStatus.OK, None
+                except HttpError as e:
+                    status, headers = e.status, e.headers
+                    payload = {'error': str(e)}
+                except asyncio.TimeoutError:
+                    status, headers, keep_alive = HTTPStatus.REQUEST_TIMEOUT, None, False
+                    payload = {'error': 'Request timed out'}
+                except Exception as e:
+                    print(f"Error handling {path}: {e}")
+                    status, headers = HTTPStatus.INTERNAL_SERVER_ERROR, None
+                    payload = {'error': f"{type(e).__name__}: {e}"}
+
+                if path in ROUTES:
+                    self.metrics.record(path, status, time.perf_counter() - start)
+                await self._write_response(writer, status, payload, keep_alive, headers)
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionResetError, BrokenPipeError):
+                pass
+
+    async def serve(self, host='127.0.0.1', port=8080, preload=False):
+        self._slots = asyncio.Semaphore(self.workers)
+        if preload:
+            from shared_utils.model_registry import get_forgery_classifier, get_signature_detector
+
+            loop = asyncio.get_running_loop()
+            for loader in (get_signature_detector, get_forgery_classifier):
+                await loop.run_in_executor(self.executor, loader)
+
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=64 * 1024)
+        addresses = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Serving on {addresses} with {self.workers} workers, queue of {self.queue_size}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
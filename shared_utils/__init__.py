@@ -2,10 +2,13 @@ from shared_utils.convert_pdf import handle_pdf
 from shared_utils.combine_imgs import create_comparison_image
 from shared_utils.extract_versions import analyze_pdf_versions, display_diff_summary
 from shared_utils.image_utils import ModdedDocAnalyzer
+from shared_utils.model_registry import get_forgery_classifier, get_signature_detector
 __all__ = [
     'handle_pdf',
     'create_comparison_image',
     'analyze_pdf_versions',
     'display_diff_summary',
-    'ModdedDocAnalyser'
+    'ModdedDocAnalyser',
+    'get_forgery_classifier',
+    'get_signature_detector'
 ]
\ No newline at end of file
@@ -0,0 +1,288 @@
+"""Headless batch forensics over folders of PDFs.
+
+Runs signature extraction, ELA and version analysis on every PDF under the
+given folders, one document per worker process:
+
+    python -m shared_utils.batch scans/ archive/ --output results/
+    python -m shared_utils.batch scans/ --output results/ --tasks signatures,ela --workers 4
+
+Each finished document appends one JSON line to <output>/results.jsonl, and
+signature crops are written under <output>/crops/. Rerunning with the same
+output folder skips documents already recorded as done (same path, size and
+modification time), so an interrupted run picks up where it stopped.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+TASKS = ('signatures', 'ela', 'versions')
+RESULTS_FILE = 'results.jsonl'
+
+
+def find_pdfs(paths):
+    """All PDF files under the given files and folders, sorted"""
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(os.path.abspath(path))
+            continue
+        for root, _, files in os.walk(path):
+            found.extend(
+                os.path.abspath(os.path.join(root, name))
+                for name in files if name.lower().endswith('.pdf')
+            )
+    return sorted(set(found))
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_completed(results_path):
+    """(path, size, mtime) of documents a previous run finished successfully"""
+    done = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a partial last line
+                continue
+            if record.get('status') == 'ok':
+                done.add((record['path'], record['size'], record['mtime']))
+    return done
+
+
+def _run_signatures(pdf_data, doc_id, crops_dir, dpi, tiled, prefilter, coarse_dpi):
+    from PIL import Image
+
+    from core import detect_signatures
+
+    # One render process per worker, the batch pool already fills the CPUs
+    result = detect_signatures(pdf_data, dpi=dpi, use_cache=False, with_crops=bool(crops_dir), workers=1,
+                               tiled=tiled, prefilter=prefilter, coarse_dpi=coarse_dpi)
+    signatures = []
+    for page in result['pages']:
+        for i, signature in enumerate(page['signatures']):
+            crop_path = None
+            if crops_dir:
+                crop_path = os.path.join(crops_dir, doc_id, f"page{page['page']}_sig{i + 1}.png")
+                os.makedirs(os.path.dirname(crop_path), exist_ok=True)
+                Image.fromarray(page['crops'][i]).save(crop_path)
+            signatures.append({'page': page['page'], **signature, 'dpi': result['dpi'], 'crop': crop_path})
+    return signatures, [page['page'] for page in result['pages'] if page['skipped']]
+
+
+def _run_ela(pdf_data, dpi, prefilter):
+    from core import analyze_manipulation
+
+    # Same page selection and results as the ELA page, minus the display images
+    result = analyze_manipulation(pdf_data, dpi=dpi, preview_width=None, versions=False, workers=1,
+                                  use_cache=False, prefilter=prefilter, images=False)
+    return {
+        **result['summary'],
+        'pages': [
+            {
+                'page': page['page'],
+                'suspicious_areas': [list(map(int, area)) for area in page['suspicious_areas']],
+                'areas': page['areas']
+            }
+            for page in result['pages']
+        ]
+    }
+
+
+def _run_versions(pdf_data):
+    from shared_utils.extract_versions import analyze_pdf_versions
+
+    result = analyze_pdf_versions(pdf_data, use_cache=False)
+    if result is None:
+        return {'count': 1, 'diffs': []}
+    return {
+        'count': len(result['versions']),
+        'diffs': [
+            None if diff is None else {
+                'additions': diff['additions'],
+                'removals': diff['removals'],
+                'hunks': len(diff['hunks'])
+            }
+            for diff in result['diffs']
+        ]
+    }
+
+
+def process_document(path, tasks, crops_dir=None, dpi=200, ela_dpi=300, tiled=False, prefilter=True,
+                     coarse_dpi=None):
+    """
+    Run the selected analyses on one PDF and return a JSON-ready record.
+
+    Errors are caught and recorded so one bad file doesn't stop the batch.
+    """
+    from shared_utils.result_cache import document_hash
+
+    size, mtime = _fingerprint(path)
+    record = {'path': path, 'size': size, 'mtime': mtime}
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            pdf_data = f.read()
+        record['sha256'] = document_hash(pdf_data)
+        doc_id = f"{os.path.splitext(os.path.basename(path))[0]}-{record['sha256'][:12]}"
+
+        if 'signatures' in tasks:
+            record['signatures'], record['signature_skipped_pages'] = _run_signatures(
+                pdf_data, doc_id, crops_dir, dpi, tiled, prefilter, coarse_dpi
+            )
+        if 'ela' in tasks:
+            record['ela'] = _run_ela(pdf_data, ela_dpi, prefilter)
+        if 'versions' in tasks:
+            record['versions'] = _run_versions(pdf_data)
+        record['status'] = 'ok'
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+        record['traceback'] = traceback.format_exc()
+    record['elapsed'] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def _crash_record(path, error):
+    """Record for a document whose worker process died under it"""
+    size, mtime = _fingerprint(path)
+    return {'path': path, 'size': size, 'mtime': mtime, 'status': 'error', 'error': error, 'elapsed': 0.0}
+
+
+def _pool_context():
+    # Fresh interpreters, so the models load once per worker and never
+    # inherit threads from the parent
+    if 'forkserver' in mp.get_all_start_methods():
+        return mp.get_context('forkserver')
+    return mp.get_context('spawn')
+
+
+def run_batch(inputs, output, tasks=TASKS, workers=None, dpi=200, ela_dpi=300, save_crops=True, tiled=False,
+              prefilter=True, coarse_dpi=None):
+    """
+    Process every PDF under inputs, appending results to output/results.jsonl.
+
+    Returns:
+        dict: Counts of processed, skipped and failed documents
+    """
+    os.makedirs(output, exist_ok=True)
+    results_path = os.path.join(output, RESULTS_FILE)
+    crops_dir = os.path.join(output, 'crops') if save_crops and 'signatures' in tasks else None
+
+    done = load_completed(results_path)
+    found = find_pdfs(inputs)
+    todo = [p for p in found if (p, *_fingerprint(p)) not in done]
+    skipped = len(found) - len(todo)
+    print(f"{len(todo)} documents to process, {skipped} already done")
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(todo) or 1))
+    counts = {'processed': 0, 'failed': 0, 'skipped': skipped}
+    if not todo:
+        return counts
+
+    start = time.perf_counter()
+    remaining = list(reversed(todo))
+
+    def write(out, record):
+        # Flushed per document so an interrupted run loses at most the
+        # documents still in flight
+        out.write(json.dumps(record) + '\n')
+        out.flush()
+        os.fsync(out.fileno())
+
+        counts['processed'] += 1
+        if record['status'] != 'ok':
+            counts['failed'] += 1
+            print(f"Failed {record['path']}: {record['error']}")
+        done_count = counts['processed'] + skipped
+        print(f"[{done_count}/{len(todo) + skipped}] {record['path']} ({record['elapsed']:.1f}s)")
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+    with open(results_path, 'a', encoding='utf-8') as out:
+        pending = {}
+        try:
+            while remaining or pending:
+                # A short queue per worker keeps memory flat on huge folders
+                while remaining and len(pending) < workers * 2:
+                    path = remaining.pop()
+                    pending[pool.submit(
+                        process_document, path, tasks, crops_dir, dpi, ela_dpi, tiled, prefilter, coarse_dpi
+                    )] = path
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in finished:
+                    path = pending.pop(future)
+                    try:
+                        record = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        record = _crash_record(path, "Worker process died (native crash or out of memory)")
+                    write(out, record)
+
+                if broken:
+                    # A native crash or the OOM killer takes the whole pool down,
+                    # with every document in flight. They are recorded as errors,
+                    # so a rerun retries them, and the run goes on in a new pool.
+                    for path in pending.values():
+                        write(out, _crash_record(path, "Worker pool died while processing this document"))
+                    pending.clear()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+        except KeyboardInterrupt:
+            print("Interrupted, rerun with the same --output to resume")
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {counts['processed']} documents in {elapsed:.1f}s "
+          f"({counts['failed']} failed, {counts['skipped']} skipped)")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run document forensics over folders of PDFs")
+    parser.add_argument('inputs', nargs='+', help="PDF files or folders to scan recursively")
+    parser.add_argument('--output', required=True, help="Folder for results.jsonl and crops")
+    parser.add_argument('--tasks', default=','.join(TASKS),
+                        help=f"Comma-separated analyses to run, from {', '.join(TASKS)}")
+    parser.add_argument('--workers', type=int, help="Worker processes, defaults to the CPU count")
+    parser.add_argument('--dpi', type=int, default=200, help="Render DPI for signature detection")
+    parser.add_argument('--ela-dpi', type=int, default=300, help="Render DPI for ELA")
+    parser.add_argument('--no-crops', action='store_true', help="Don't write signature crops")
+    parser.add_argument('--tiled', action='store_true',
+                        help="Detect signatures over overlapping page tiles to catch small initials")
+    parser.add_argument('--coarse-dpi', type=int,
+                        help="Detect signatures at this DPI (e.g. 72) and render only crops at --dpi")
+    parser.add_argument('--no-prefilter', action='store_true',
+                        help="Run signature detection on blank pages (thresholds: STREAMHP_BLANK_MAX_INK, "
+                             "STREAMHP_INK_CONTRAST) and ELA on pages with no content too")
+
+    args = parser.parse_args()
+    tasks = tuple(t.strip() for t in args.tasks.split(',') if t.strip())
+    unknown = set(tasks) - set(TASKS)
+    if unknown:
+        parser.error(f"Unknown tasks: {', '.join(sorted(unknown))}")
+    if args.tiled and args.coarse_dpi:
+        parser.error("--tiled and --coarse-dpi can't be combined")
+
+    run_batch(args.inputs, args.output, tasks=tasks, workers=args.workers, dpi=args.dpi,
+              ela_dpi=args.ela_dpi, save_crops=not args.no_crops, tiled=args.tiled,
+              prefilter=not args.no_prefilter, coarse_dpi=args.coarse_dpi)
+
+
+if __name__ == '__main__':
+    main()
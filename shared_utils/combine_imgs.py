@@ -1,9 +1,9 @@
 from PIL import Image
 
 def create_comparison_image(img1_path, img2_path):
-    # Open images
-    img1 = Image.open(img1_path).convert("RGB")
-    img2 = Image.open(img2_path).convert("RGB")
+    # Open images, paths and file objects or already loaded PIL images
+    img1 = (img1_path if isinstance(img1_path, Image.Image) else Image.open(img1_path)).convert("RGB")
+    img2 = (img2_path if isinstance(img2_path, Image.Image) else Image.open(img2_path)).convert("RGB")
     
     # Resize to same height
     height = max(img1.height, img2.height)
@@ -1,41 +1,177 @@
-from pdf2image import convert_from_bytes
+import pymupdf
+import numpy as np
+from PIL import Image
 
 import io
 
 
+class _PixmapArray:
+    """Exposes a pixmap's sample buffer to NumPy and keeps the pixmap alive."""
+
+    def __init__(self, pix):
+        self.pix = pix
+        self.__array_interface__ = {
+            'shape': (pix.height, pix.width, pix.n),
+            'typestr': '|u1',
+            'data': (pix.samples_ptr, False),
+            'strides': (pix.stride, pix.n, 1),
+            'version': 3
+        }
+
+
+def pixmap_to_array(pix):
+    """View a pixmap as an (H, W, C) uint8 array without copying the samples"""
+    return np.asarray(_PixmapArray(pix))
+
+
+def pixmap_to_image(pix):
+    """Wrap a pixmap's samples in a PIL image straight from its buffer"""
+    mode = 'L' if pix.n == 1 else 'RGB'
+    return Image.frombuffer(mode, (pix.width, pix.height), pixmap_to_array(pix), 'raw', mode, pix.stride, 1)
+
+
+def read_pdf_bytes(pdf_data):
+    """Return the content of bytes, a memoryview or an uploaded file object"""
+    if hasattr(pdf_data, 'getvalue'):
+        return pdf_data.getvalue()
+    if hasattr(pdf_data, 'read'):
+        return pdf_data.read()
+    return pdf_data
+
+
+def open_pdf(pdf_data):
+    """Open a PDF from bytes, a memoryview or an uploaded file object"""
+    return pymupdf.open(stream=read_pdf_bytes(pdf_data), filetype='pdf')
+
+
+def pdf_page_count(pdf_data):
+    """Return the number of pages in a PDF given as bytes"""
+    with open_pdf(pdf_data) as doc:
+        return doc.page_count
+
+
+def render_page(page, dpi=200, grayscale=False, clip=None, as_array=False):
+    """
+    Render a single PyMuPDF page in-process.
+
+    Args:
+        page (pymupdf.Page): The page to render
+        dpi (int): DPI resolution for the image
+        grayscale (bool): Render a single-channel image instead of RGB
+        clip (tuple): Optional (x0, y0, x1, y1) region in PDF points
+        as_array (bool): Return a NumPy array instead of a PIL image
+
+    Returns:
+        PIL.Image or np.ndarray: The rendered page. Arrays are (H, W, C) views
+            over the pixmap buffer.
+    """
+    pix = page.get_pixmap(
+        dpi=dpi,
+        colorspace=pymupdf.csGRAY if grayscale else pymupdf.csRGB,
+        clip=pymupdf.Rect(clip) if clip is not None else None,
+        alpha=False
+    )
+    return pixmap_to_array(pix) if as_array else pixmap_to_image(pix)
+
+
+# Padding in PDF points around regions found on a coarse render, which
+# are only accurate to a pixel or two there
+REGION_MARGIN = 6
+
+
+def region_clips(page, boxes, source_dpi=72, margin=REGION_MARGIN):
+    """
+    Map boxes found on a render of a page to padded clip rectangles in PDF points.
+
+    Args:
+        page (pymupdf.Page): The rendered page
+        boxes (iterable): (x1, y1, x2, y2) boxes in pixels of a render at source_dpi
+        source_dpi (int): DPI of the render the boxes were found on
+        margin (float): Padding around each box in PDF points
+
+    Returns:
+        list: One pymupdf.Rect per box, clipped to the page
+    """
+    scale = 72 / source_dpi
+    # Pixmap pixels and clip rectangles both follow the rotated page.rect
+    return [
+        pymupdf.Rect(x1 * scale - margin, y1 * scale - margin, x2 * scale + margin, y2 * scale + margin) & page.rect
+        for x1, y1, x2, y2 in boxes
+    ]
+
+
+def render_regions(page, clips, dpi=200, as_array=True):
+    """Render each clip rectangle of a page, e.g. from region_clips(), at dpi"""
+    return [render_page(page, dpi=dpi, clip=clip, as_array=as_array) for clip in clips]
+
+
+def iter_pdf_pages(pdf_data, dpi=200, first_page=1, last_page=None, grayscale=False, as_array=False,
+                   use_cache=False):
+    """
+    Rasterize a PDF one page at a time.
+
+    Each page is rendered only when the consumer asks for it, so memory
+    stays at a page or two however long the document is.
+
+    Args:
+        pdf_data (bytes): The PDF file content as bytes
+        dpi (int): DPI resolution for the images
+        first_page (int): First page to render (1-based)
+        last_page (int): Last page to render, defaults to the last page
+        grayscale (bool): Render single-channel images
+        as_array (bool): Yield NumPy arrays instead of PIL images
+        use_cache (bool): Serve and store pages through the shared page cache
+
+    Yields:
+        PIL.Image or np.ndarray: One image per page, in page order
+    """
+    pdf_data = read_pdf_bytes(pdf_data)
+    if use_cache:
+        from shared_utils.page_cache import render_cached
+        from shared_utils.result_cache import document_hash
+        doc_hash = document_hash(pdf_data)
+
+    with open_pdf(pdf_data) as doc:
+        if last_page is None:
+            last_page = doc.page_count
+
+        for page_num in range(first_page - 1, last_page):
+            if use_cache:
+                yield render_cached(doc[page_num], doc_hash, dpi=dpi, grayscale=grayscale, as_array=as_array)
+            else:
+                yield render_page(doc[page_num], dpi=dpi, grayscale=grayscale, as_array=as_array)
+
+
 def handle_pdf(pdf_file, dpi=200, fmt="jpeg", quality=75):
     """
     Convert PDF bytes to a list of JPEG image buffers.
-    
+
     Args:
         pdf_file (bytes): The PDF file content as bytes
         dpi (int): DPI resolution for the images (higher = better quality but larger files)
         fmt (str): Image format ('jpeg' or 'png')
         quality (int): JPEG quality (1-100, higher = better quality but larger files)
-        
+
     Returns:
         list: List of image byte buffers
     """
     # Convert PDF to images
     try:
-        pdf_images = convert_from_bytes(
-            pdf_file, 
-            dpi=dpi,
-            fmt=fmt
-        )
-        
         # Create list to store image buffers
         image_buffers = []
-        
-        # Convert each image to bytes and store in list
-        for i, img in enumerate(pdf_images):
+
+        # Encode each page as it is rendered so only one decoded page is held
+        for img in iter_pdf_pages(pdf_file, dpi=dpi, use_cache=True):
             buffer = io.BytesIO()
-            img.save(buffer, format='JPEG', quality=quality)
+            if fmt == 'png':
+                img.save(buffer, format='PNG')
+            else:
+                img.save(buffer, format='JPEG', quality=quality)
             buffer.seek(0)  # Reset buffer position to start
             image_buffers.append(buffer.getvalue())
-            
+
         return image_buffers
-        
+
     except Exception as e:
         print(f"Error converting PDF: {str(e)}")
-        return []
\ No newline at end of file
+        return []
@@ -0,0 +1,246 @@
+"""Batched signature detection over document pages."""
+
+import os
+import time
+from collections import deque
+from itertools import islice
+
+import numpy as np
+
+from shared_utils.model_registry import inference_lock
+
+DEFAULT_BATCH_SIZE = int(os.environ.get('STREAMHP_DETECT_BATCH_SIZE', 8))
+
+
+def iter_batches(items, batch_size):
+    """Group any iterable into lists of at most batch_size items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def effective_batch_size(model, batch_size):
+    """
+    Clamp the batch size to what the loaded detector accepts.
+
+    ONNX models exported without `dynamic=True` have a fixed batch axis of 1,
+    so they can only be fed one page per call.
+    """
+    backend = getattr(getattr(model, 'predictor', None), 'model', None)
+    if backend is not None and getattr(backend, 'onnx', False) and not getattr(backend, 'dynamic', True):
+        if batch_size > 1:
+            print("Detector has a static batch axis, re-export with dynamic=True to batch pages")
+        return 1
+    return batch_size
+
+
+def predict_batches(model, pages, batch_size=DEFAULT_BATCH_SIZE, lock_name='signature_detector', unit='pages'):
+    """
+    Run the detector over pages in batches.
+
+    Args:
+        model: Ultralytics YOLO model
+        pages (iterable): Page images (PIL or numpy), consumed lazily
+        batch_size (int): Pages per inference call
+        lock_name (str): Registry lock to hold around each call, or None
+        unit (str): What the images are, for the throughput log line
+
+    Yields:
+        tuple: (batch, results), the page images of one batch and their
+            Ultralytics Results objects
+    """
+    batch_size = effective_batch_size(model, batch_size)
+    total_pages = 0
+    inference_time = 0.0
+
+    for batch in iter_batches(pages, batch_size):
+        start = time.perf_counter()
+        if lock_name:
+            with inference_lock(lock_name):
+                results = model.predict(batch, verbose=False)
+        else:
+            results = model.predict(batch, verbose=False)
+        inference_time += time.perf_counter() - start
+        total_pages += len(batch)
+        yield batch, results
+
+    if total_pages:
+        rate = total_pages / inference_time if inference_time else float('inf')
+        print(f"Detected signatures on {total_pages} {unit} in {inference_time:.2f}s "
+              f"({rate:.1f} {unit}/s, batch size {batch_size})")
+
+
+def detect_pages(model, pages, batch_size=DEFAULT_BATCH_SIZE, lock_name='signature_detector'):
+    """
+    Run the detector over pages in batches.
+
+    Yields:
+        tuple: (page_num, image, result) for each page in order, where result
+            is the Ultralytics Results object for that page
+    """
+    page_num = 0
+    for batch, results in predict_batches(model, pages, batch_size, lock_name):
+        for img, result in zip(batch, results):
+            yield page_num, img, result
+            page_num += 1
+
+
+def batch_to_detections(results):
+    """
+    Plain boxes, scores and labels for a batch of Ultralytics results.
+
+    Each page's Boxes.data is an (n, 6) tensor of xyxy, confidence and
+    class. The batch is concatenated on the device and copied to the host
+    in one transfer, then split back into per-page views.
+
+    Returns:
+        list: One {'boxes', 'scores', 'labels'} dict per result
+    """
+    if not results:
+        return []
+
+    data = [result.boxes.data for result in results]
+    if isinstance(data[0], np.ndarray):
+        rows = np.concatenate(data)
+    else:
+        import torch
+
+        rows = torch.cat(data).cpu().numpy()
+
+    splits = np.cumsum([len(d) for d in data])[:-1]
+    return [
+        {
+            'boxes': page_rows[:, :4],
+            'scores': page_rows[:, 4],
+            'labels': [result.names[int(c)] for c in page_rows[:, 5]]
+        }
+        for result, page_rows in zip(results, np.split(rows, splits))
+    ]
+
+
+def empty_detections(skipped=False):
+    """Detections for a page with no boxes. skipped marks pages the pre-filter left out."""
+    detections = {
+        'boxes': np.zeros((0, 4), dtype=np.float32),
+        'scores': np.zeros(0, dtype=np.float32),
+        'labels': []
+    }
+    if skipped:
+        detections['skipped'] = True
+    return detections
+
+
+def detect_kept_pages(model, pages, skip=(), batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Batch the detector over the pages not in skip, yielding every page in order.
+
+    Yields:
+        tuple: (page_num, image, detections), with empty_detections(skipped=True)
+            for skipped pages
+    """
+    waiting = deque()
+
+    def kept():
+        for page_num, img in enumerate(pages):
+            waiting.append((page_num, img))
+            if page_num not in skip:
+                yield img
+
+    def skipped():
+        while waiting and waiting[0][0] in skip:
+            page_num, img = waiting.popleft()
+            yield page_num, img, empty_detections(skipped=True)
+
+    for _, results in predict_batches(model, kept(), batch_size=batch_size):
+        for detections in batch_to_detections(results):
+            yield from skipped()
+            page_num, img = waiting.popleft()
+            yield page_num, img, detections
+    yield from skipped()
+
+
+def result_to_detections(result):
+    """Plain boxes, scores and labels from an Ultralytics result, safe to pickle."""
+    return batch_to_detections([result])[0]
+
+
+def draw_detections(image, detections, color=(255, 0, 0), width=3):
+    """Draw detection boxes and scores on a copy of a page image."""
+    from PIL import Image, ImageDraw
+
+    marked = Image.fromarray(image) if not isinstance(image, Image.Image) else image.convert('RGB')
+    draw = ImageDraw.Draw(marked)
+    for (x1, y1, x2, y2), score, label in zip(
+        detections['boxes'], detections['scores'], detections['labels']
+    ):
+        draw.rectangle([x1, y1, x2, y2], outline=color, width=width)
+        draw.text((x1 + width, max(y1 - 12, 0)), f"{label} {score:.2f}", fill=color)
+    return marked
+
+
+def detect_document(model, pdf_data, dpi=200, batch_size=DEFAULT_BATCH_SIZE, use_cache=True, workers=None,
+                    tiled=False, prefilter=True):
+    """
+    Render a PDF and detect signatures on every page, reusing cached detections.
+
+    Detections are cached by document hash, DPI, detector version and tiling
+    settings. On a hit pages are still rendered for display, but the
+    detector is skipped. workers sets the render processes, 1 renders in
+    this process. tiled runs the detector over overlapping tiles of each
+    page (see shared_utils.tiling) to find small signatures. prefilter
+    skips blank pages (see shared_utils.prefilter).
+
+    Yields:
+        tuple: (page_num, image, detections) for each page in order, with
+            detections as returned by result_to_detections(). Pages skipped
+            as blank have no boxes and detections['skipped'] set.
+    """
+    from shared_utils.model_registry import SIG_MODEL_PATH, resolve_model_path
+    from shared_utils.parallel_render import iter_pdf_pages_parallel
+    from shared_utils.result_cache import cache_key, document_hash, file_version, get_result_cache
+
+    if hasattr(pdf_data, 'getvalue'):
+        pdf_data = pdf_data.getvalue()
+
+    params = {}
+    if tiled:
+        from shared_utils.tiling import TILE_MIN_INK, TILE_OVERLAP, TILE_SIZE, detect_tiled
+
+        params['tiles'] = [TILE_SIZE, TILE_OVERLAP, TILE_MIN_INK]
+    if prefilter:
+        from shared_utils.prefilter import find_blank_pages, prefilter_params
+
+        params['prefilter'] = prefilter_params()
+
+    cache = get_result_cache()
+    key = cache_key(
+        'signatures', document_hash(pdf_data), dpi=dpi,
+        model=file_version(resolve_model_path(SIG_MODEL_PATH)), **params
+    )
+    cached = cache.get(key) if use_cache else None
+    pages = iter_pdf_pages_parallel(pdf_data, dpi=dpi, workers=workers, use_cache=use_cache)
+
+    if cached is not None:
+        for page_num, (img, detections) in enumerate(zip(pages, cached)):
+            yield page_num, img, detections
+        return
+
+    skip = find_blank_pages(pdf_data) if prefilter else set()
+    if skip:
+        print(f"Pre-filter skipped {len(skip)} blank pages")
+
+    collected = []
+    if tiled:
+        detected = detect_tiled(model, pages, batch_size=batch_size, skip=skip)
+    else:
+        detected = detect_kept_pages(model, pages, skip=skip, batch_size=batch_size)
+    for page_num, img, detections in detected:
+        yield page_num, img, detections
+        collected.append(detections)
+
+    # Only a complete pass is worth caching
+    if use_cache:
+        cache.put(key, collected)
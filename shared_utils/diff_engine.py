@@ -0,0 +1,399 @@
+"""Line diff engine for comparing extracted PDF version text.
+
+Lines are interned to integer ids first, so every comparison after that is
+an int compare. When per-page text is available, identical pages are
+matched as whole blocks and changed pages are diffed pairwise, so one line
+diff never spans more than a page or two. The line diff is a linear-space
+Myers bisection, optionally anchored on patience-style unique lines.
+Myers costs O((N + M) * D), so regions with no lines in common are replaced
+outright and regions whose edit distance passes MAX_EDIT_COST fall back to
+difflib. Results come back as structured hunks with counts, plus
+unified-diff lines in the same format as difflib.
+"""
+
+import difflib
+import os
+from bisect import bisect_left
+
+# Edit distance past which a region is handed to difflib instead of Myers
+MAX_EDIT_COST = int(os.environ.get('STREAMHP_DIFF_MAX_COST', 200))
+
+# Returned by _bisect when the edit distance is over max_cost
+_TOO_COSTLY = object()
+
+
+def intern_lines(*sequences):
+    """Map each distinct line to an int id, shared across all sequences"""
+    ids = {}
+    return [[ids.setdefault(line, len(ids)) for line in seq] for seq in sequences]
+
+
+def _bisect(a, b, max_cost=None):
+    """
+    Find a point on an optimal edit path through the middle of a and b.
+
+    Linear-space Myers: forward and reverse searches meet in the middle.
+    Returns (x, y) to split at, None when a and b share nothing, or
+    _TOO_COSTLY when the edit distance is over max_cost.
+    """
+    n, m = len(a), len(b)
+    max_d = (n + m + 1) // 2
+    limit = max_d if max_cost is None else min(max_d, (max_cost + 1) // 2)
+    v_offset = max_d
+    v_length = 2 * max_d + 2
+    v1 = [-1] * v_length
+    v2 = [-1] * v_length
+    v1[v_offset + 1] = 0
+    v2[v_offset + 1] = 0
+    delta = n - m
+    front = delta % 2 != 0
+    k1start = k1end = k2start = k2end = 0
+
+    for d in range(limit):
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = v_offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[x1] == b[y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n:
+                k1end += 2
+            elif y1 > m:
+                k1start += 2
+            elif front:
+                k2_offset = v_offset + delta - k1
+                if 0 <= k2_offset < v_length and v2[k2_offset] != -1:
+                    if x1 >= n - v2[k2_offset]:
+                        return x1, y1
+
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = v_offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[n - x2 - 1] == b[m - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2end += 2
+            elif y2 > m:
+                k2start += 2
+            elif not front:
+                k1_offset = v_offset + delta - k2
+                if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    if x1 >= n - x2:
+                        return x1, v_offset + x1 - k1_offset
+
+    return None if limit == max_d else _TOO_COSTLY
+
+
+def _trim(a, b, a0, a1, b0, b1, matches):
+    """Match the common prefix and suffix of a[a0:a1] and b[b0:b1], return what's left"""
+    start = 0
+    while a0 + start < a1 and b0 + start < b1 and a[a0 + start] == b[b0 + start]:
+        start += 1
+    if start:
+        matches.append((a0, b0, start))
+    a0 += start
+    b0 += start
+
+    end = 0
+    while a1 - end > a0 and b1 - end > b0 and a[a1 - end - 1] == b[b1 - end - 1]:
+        end += 1
+    if end:
+        matches.append((a1 - end, b1 - end, end))
+    return a0, a1 - end, b0, b1 - end
+
+
+def _myers_region(a, b, a0, a1, b0, b1, matches, max_cost=None):
+    max_cost = MAX_EDIT_COST if max_cost is None else max_cost
+    # An explicit stack instead of recursion keeps deep splits off the C stack
+    stack = [(a0, a1, b0, b1)]
+    while stack:
+        a0, a1, b0, b1 = _trim(a, b, *stack.pop(), matches)
+        if a0 == a1 or b0 == b1:
+            continue
+        # Rewritten regions (OCR re-runs) would otherwise cost Myers its worst case
+        if set(a[a0:a1]).isdisjoint(b[b0:b1]):
+            continue
+        split = _bisect(a[a0:a1], b[b0:b1], max_cost)
+        if split is _TOO_COSTLY:
+            _difflib_region(a, b, a0, a1, b0, b1, matches)
+            continue
+        if split is None:
+            continue
+        x, y = split
+        stack.append((a0 + x, a1, b0 + y, b1))
+        stack.append((a0, a0 + x, b0, b0 + y))
+
+
+def _unique_anchors(a, b, a0, a1, b0, b1):
+    """Lines unique on both sides, longest increasing run of their positions"""
+    counts = {}
+    for i in range(a0, a1):
+        entry = counts.setdefault(a[i], [0, 0, i, 0])
+        entry[0] += 1
+    for j in range(b0, b1):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[1] += 1
+            entry[3] = j
+    pairs = sorted((i, j) for ca, cb, i, j in counts.values() if ca == 1 and cb == 1)
+
+    # Patience sorting for the longest increasing subsequence of b positions
+    tails, tail_idx, prev = [], [], [-1] * len(pairs)
+    for idx, (_, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_idx.append(idx)
+        else:
+            tails[pos] = j
+            tail_idx[pos] = idx
+        prev[idx] = tail_idx[pos - 1] if pos else -1
+
+    anchors = []
+    idx = tail_idx[-1] if tail_idx else -1
+    while idx != -1:
+        anchors.append(pairs[idx])
+        idx = prev[idx]
+    return anchors[::-1]
+
+
+def _patience_region(a, b, a0, a1, b0, b1, matches):
+    stack = [(a0, a1, b0, b1)]
+    while stack:
+        a0, a1, b0, b1 = _trim(a, b, *stack.pop(), matches)
+        if a0 == a1 or b0 == b1:
+            continue
+        anchors = _unique_anchors(a, b, a0, a1, b0, b1)
+        if not anchors:
+            _myers_region(a, b, a0, a1, b0, b1, matches)
+            continue
+        for i, j in anchors:
+            stack.append((a0, i, b0, j))
+            matches.append((i, j, 1))
+            a0, b0 = i + 1, j + 1
+        stack.append((a0, a1, b0, b1))
+
+
+def _difflib_region(a, b, a0, a1, b0, b1, matches):
+    matcher = difflib.SequenceMatcher(None, a[a0:a1], b[b0:b1], autojunk=False)
+    for i, j, size in matcher.get_matching_blocks():
+        if size:
+            matches.append((a0 + i, b0 + j, size))
+
+
+DIFF_ENGINES = {
+    'myers': _myers_region,
+    'patience': _patience_region,
+    'difflib': _difflib_region
+}
+
+
+def _opcodes(matches, n, m):
+    """difflib-style opcodes from (i, j, size) matching runs"""
+    opcodes = []
+    i = j = 0
+    for ai, bj, size in sorted(matches) + [(n, m, 0)]:
+        tag = ''
+        if i < ai and j < bj:
+            tag = 'replace'
+        elif i < ai:
+            tag = 'delete'
+        elif j < bj:
+            tag = 'insert'
+        if tag:
+            opcodes.append((tag, i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            if opcodes and opcodes[-1][0] == 'equal':
+                tag, i1, _, j1, _ = opcodes.pop()
+                opcodes.append(('equal', i1, i, j1, j))
+            else:
+                opcodes.append(('equal', ai, i, bj, j))
+    return opcodes
+
+
+def diff_ids(a, b, engine='myers', blocks=None):
+    """
+    Opcodes turning id sequence a into b.
+
+    Args:
+        a, b (list): Interned line ids
+        engine (str): Key into DIFF_ENGINES
+        blocks (list): Optional (tag, i1, i2, j1, j2) regions already known,
+            e.g. from a page-level diff; only non-equal ones are diffed
+    """
+    diff_region = DIFF_ENGINES[engine]
+    matches = []
+    for tag, i1, i2, j1, j2 in blocks or [('replace', 0, len(a), 0, len(b))]:
+        if tag == 'equal':
+            matches.append((i1, j1, i2 - i1))
+        elif tag == 'replace':
+            diff_region(a, b, i1, i2, j1, j2, matches)
+    return _opcodes([run for run in matches if run[2]], len(a), len(b))
+
+
+def _pages_split_cleanly(pages):
+    """Whether joining pages and splitting lines equals splitting each page"""
+    for i, page in enumerate(pages):
+        if page and (page + 'x').splitlines()[-1] != 'x':
+            return False
+        if page.endswith('\r') and i + 1 < len(pages) and pages[i + 1].startswith('\n'):
+            return False
+    return True
+
+
+def _page_pairs(i1, i2, j1, j2):
+    """
+    Split a run of changed pages into page-sized (i1, i2, j1, j2) regions.
+
+    Pages are paired in order, and pages left over on the longer side join
+    the last pair, so edits that move lines across pages within that pair
+    are still matched.
+    """
+    pairs = min(i2 - i1, j2 - j1)
+    if pairs <= 1:
+        return [(i1, i2, j1, j2)]
+    regions = [(i1 + k, i1 + k + 1, j1 + k, j1 + k + 1) for k in range(pairs - 1)]
+    regions.append((i1 + pairs - 1, i2, j1 + pairs - 1, j2))
+    return regions
+
+
+def _page_blocks(prev_pages, curr_pages, prev_lines, curr_lines):
+    """Line-level regions from a page-level diff, equal pages become equal blocks"""
+    def offsets(page_lines):
+        out = [0]
+        for lines in page_lines:
+            out.append(out[-1] + len(lines))
+        return out
+
+    prev_off, curr_off = offsets(prev_lines), offsets(curr_lines)
+    page_a, page_b = intern_lines(prev_pages, curr_pages)
+    blocks = []
+    for tag, i1, i2, j1, j2 in diff_ids(page_a, page_b, engine='myers'):
+        regions = _page_pairs(i1, i2, j1, j2) if tag == 'replace' else [(i1, i2, j1, j2)]
+        blocks.extend(
+            (tag, prev_off[r1], prev_off[r2], curr_off[s1], curr_off[s2])
+            for r1, r2, s1, s2 in regions
+        )
+    return blocks
+
+
+def _format_range(start, stop):
+    """Unified-diff range, same as difflib's"""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f'{beginning}'
+    if not length:
+        beginning -= 1
+    return f'{beginning},{length}'
+
+
+def group_opcodes(opcodes, context=3):
+    """Split opcodes into hunks with `context` lines around each change"""
+    if not opcodes:
+        return []
+    codes = list(opcodes)
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+
+    groups, group = [], []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > context * 2:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        groups.append(group)
+    return [g for g in groups if any(code[0] != 'equal' for code in g)]
+
+
+def diff_texts(prev_text, curr_text, fromfile='', tofile='', context=3, engine='patience',
+               prev_pages=None, curr_pages=None):
+    """
+    Diff two extracted texts line by line.
+
+    Args:
+        prev_text, curr_text (str): Full text of each version
+        fromfile, tofile (str): Labels for the unified-diff header
+        context (int): Unchanged lines kept around each change
+        engine (str): 'myers', 'patience' or 'difflib'
+        prev_pages, curr_pages (list): Optional per-page text; pages that are
+            identical in both versions are skipped without a line diff
+
+    Returns:
+        dict: 'hunks' (each with old/new start and count, additions,
+            removals and its lines), total 'additions' and 'removals', and
+            'lines' in unified-diff format
+    """
+    use_pages = (
+        prev_pages is not None and curr_pages is not None
+        and _pages_split_cleanly(prev_pages) and _pages_split_cleanly(curr_pages)
+    )
+    if use_pages:
+        prev_page_lines = [page.splitlines() for page in prev_pages]
+        curr_page_lines = [page.splitlines() for page in curr_pages]
+        prev_lines = [line for lines in prev_page_lines for line in lines]
+        curr_lines = [line for lines in curr_page_lines for line in lines]
+        blocks = _page_blocks(prev_pages, curr_pages, prev_page_lines, curr_page_lines)
+    else:
+        prev_lines, curr_lines = prev_text.splitlines(), curr_text.splitlines()
+        blocks = None
+
+    a, b = intern_lines(prev_lines, curr_lines)
+    opcodes = diff_ids(a, b, engine=engine, blocks=blocks)
+
+    hunks = []
+    for group in group_opcodes(opcodes, context):
+        first, last = group[0], group[-1]
+        hunk = {
+            'old_start': first[1] + 1,
+            'old_count': last[2] - first[1],
+            'new_start': first[3] + 1,
+            'new_count': last[4] - first[3],
+            'additions': 0,
+            'removals': 0,
+            'lines': [f'@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@']
+        }
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                hunk['lines'].extend(' ' + line for line in prev_lines[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                hunk['lines'].extend('-' + line for line in prev_lines[i1:i2])
+                hunk['removals'] += i2 - i1
+            if tag in ('replace', 'insert'):
+                hunk['lines'].extend('+' + line for line in curr_lines[j1:j2])
+                hunk['additions'] += j2 - j1
+        hunks.append(hunk)
+
+    lines = []
+    if hunks:
+        lines = [f'--- {fromfile}', f'+++ {tofile}']
+        for hunk in hunks:
+            lines.extend(hunk['lines'])
+
+    return {
+        'hunks': hunks,
+        'additions': sum(h['additions'] for h in hunks),
+        'removals': sum(h['removals'] for h in hunks),
+        'lines': lines
+    }
@@ -0,0 +1,234 @@
+"""Fused Error Level Analysis over a single uint8 page array.
+
+ElaEngine reproduces the ModdedDocAnalyzer chain (convert_to_ela_image,
+highlight_deviations and detect_highlighted_areas) but works on one array.
+The difference, HSV-bound mask and binary opening run in place in per-thread
+scratch buffers. The brightness scaling is folded into lookup tables instead
+of being applied to the page, and labeling only computes bounding boxes and
+areas.
+"""
+
+import io
+import threading
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# 8-connectivity, the measure.label default for 2D images
+_CONNECTIVITY = np.ones((3, 3), dtype=bool)
+
+
+def _hsv_table(sat_bounds, val_bounds):
+    """
+    Lookup table of the HSV saturation/value test, indexed by (max, min) channel.
+
+    PIL derives V from the largest channel and S from the smallest and
+    largest as int(float32(max - min) / max * 255.0), so both bounds can be
+    precomputed exactly for all 256 x 256 combinations.
+    """
+    vmax = np.arange(256, dtype=np.float32)[:, None]
+    vmin = np.arange(256, dtype=np.float32)[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sat = ((vmax - vmin) / vmax).astype(np.float64) * 255.0
+    sat = np.where(vmax > vmin, np.trunc(sat), 0)
+
+    table = (sat >= sat_bounds[0]) & (sat <= sat_bounds[1])
+    table &= (vmax >= val_bounds[0]) & (vmax <= val_bounds[1])
+    return table
+
+
+def _brightness_lut(max_diff):
+    """Same float32 multiply-and-truncate as ImageEnhance.Brightness(255 / max_diff)"""
+    scale = np.float32(255.0 / (max_diff or 1))
+    return np.clip(np.arange(256, dtype=np.float32) * scale, 0, 255).astype(np.uint8)
+
+
+def _bounding_window(mask, pad):
+    """Slices covering the True pixels of mask plus `pad` on every side, or None"""
+    rows = np.flatnonzero(mask.any(axis=1))
+    if not rows.size:
+        return None
+    cols = np.flatnonzero(mask[rows[0]:rows[-1] + 1].any(axis=0))
+    height, width = mask.shape
+    return (
+        slice(max(rows[0] - pad, 0), min(rows[-1] + pad + 1, height)),
+        slice(max(cols[0] - pad, 0), min(cols[-1] + pad + 1, width))
+    )
+
+
+class ElaEngine:
+    """Error Level Analysis with fused thresholding, morphology and labeling."""
+
+    def __init__(self, quality=90, threshold=20, lower_bound=(0, 10, 10),
+                 upper_bound=(179, 255, 245), kernel_size=5, min_area=50):
+        from skimage import morphology
+
+        self.quality = quality
+        self.threshold = threshold
+        self.min_area = min_area
+        self.footprint = morphology.disk(kernel_size // 2).astype(bool)
+        self.radius = kernel_size // 2
+
+        # Bounds use the OpenCV hue scale (0-179), PIL's runs 0-255
+        self.hue_bounds = (int(lower_bound[0] * 255 / 179), int(upper_bound[0] * 255 / 179))
+        sat_bounds = (int(lower_bound[1]), int(upper_bound[1]))
+        val_bounds = (int(lower_bound[2]), int(upper_bound[2]))
+
+        self._hsv_table = _hsv_table(sat_bounds, val_bounds)
+        self._local = threading.local()
+
+    def _buffers(self, shape):
+        """Scratch buffers for this thread, reallocated only when the page size changes."""
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None or buffers['shape'] != shape:
+            height, width = shape[:2]
+            buffers = {
+                'shape': shape,
+                'rgb': np.empty(shape, dtype=np.uint8),
+                'vmax': np.empty((height, width), dtype=np.uint8),
+                'vmin': np.empty((height, width), dtype=np.uint8),
+                'index': np.empty((height, width), dtype=np.uint16),
+                'mask': np.empty((height, width), dtype=bool),
+                # Flat so any window of the page can be viewed contiguously
+                'eroded': np.empty(height * width, dtype=bool),
+                'opened': np.empty(height * width, dtype=bool),
+                'labels': np.empty(height * width, dtype=np.int32)
+            }
+            self._local.buffers = buffers
+        return buffers
+
+    def difference(self, original, buffers):
+        """Return |original - JPEG(original)| as a uint8 array, before brightness scaling."""
+        buffer = io.BytesIO()
+        Image.fromarray(original).save(buffer, format='JPEG', quality=self.quality)
+        buffer.seek(0)
+        with Image.open(buffer) as resaved:
+            diff = np.array(resaved)
+
+        # |original - resaved| without leaving uint8, written over the decode
+        scratch = buffers['rgb']
+        np.maximum(original, diff, out=scratch)
+        np.minimum(original, diff, out=diff)
+        np.subtract(scratch, diff, out=diff)
+        return diff
+
+    def hsv_mask(self, diff, lut, buffers):
+        """
+        Mask of pixels whose scaled ELA values pass the PIL HSV bounds.
+
+        The brightness LUT is monotonic, so the max and min channels of the
+        scaled image are the LUT of the raw max and min. Folding the LUT into
+        the HSV table means the scaled image never has to be built.
+        """
+        vmax, vmin = buffers['vmax'], buffers['vmin']
+        index, mask = buffers['index'], buffers['mask']
+
+        # Pairwise channel reductions are much faster than max(axis=2)
+        np.maximum(diff[:, :, 0], diff[:, :, 1], out=vmax)
+        np.maximum(vmax, diff[:, :, 2], out=vmax)
+        np.minimum(diff[:, :, 0], diff[:, :, 1], out=vmin)
+        np.minimum(vmin, diff[:, :, 2], out=vmin)
+
+        table = self._hsv_table[lut[:, None], lut[None, :]].ravel()
+        np.left_shift(vmax, 8, out=index, dtype=np.uint16)
+        index |= vmin
+        np.take(table, index, out=mask)
+
+        if self.hue_bounds != (0, 255):
+            # Rarely restricted, so fall back to PIL for the hue channel
+            hue = np.asarray(Image.fromarray(lut[diff]).convert('HSV'))[:, :, 0]
+            mask &= (hue >= self.hue_bounds[0]) & (hue <= self.hue_bounds[1])
+
+        return mask
+
+    def find_regions(self, mask, buffers):
+        """Binary opening plus connected components, keeping only boxes and areas."""
+        from scipy import ndimage as ndi
+
+        # Opening can't reach further than the kernel radius past the mask,
+        # so only the window around the masked pixels needs processing
+        window = _bounding_window(mask, self.radius)
+        if window is None:
+            return [], []
+        rows, cols = window
+        shape = (rows.stop - rows.start, cols.stop - cols.start)
+        size = shape[0] * shape[1]
+
+        eroded = buffers['eroded'][:size].reshape(shape)
+        opened = buffers['opened'][:size].reshape(shape)
+        labels = buffers['labels'][:size].reshape(shape)
+
+        # skimage's binary_opening border handling: erosion pads with True,
+        # dilation with False
+        ndi.binary_erosion(mask[window], structure=self.footprint, output=eroded, border_value=1)
+        ndi.binary_dilation(eroded, structure=self.footprint, output=opened, border_value=0)
+
+        count = ndi.label(opened, structure=_CONNECTIVITY, output=labels)
+        if not count:
+            return [], []
+
+        areas = np.bincount(labels.ravel(), minlength=count + 1)[1:]
+        suspicious_areas, region_areas = [], []
+        for area, region in zip(areas, ndi.find_objects(labels, max_label=count)):
+            if area > self.min_area:
+                r, c = region
+                suspicious_areas.append((
+                    cols.start + c.start,
+                    rows.start + r.start,
+                    c.stop - c.start,
+                    r.stop - r.start
+                ))
+                region_areas.append(int(area))
+        return suspicious_areas, region_areas
+
+    def analyze(self, image, keep_ela=False, mark=False):
+        """
+        Run the full ELA analysis on one page.
+
+        Args:
+            image (PIL.Image or np.ndarray): Page image, RGB
+            keep_ela (bool): Also return the brightness-scaled ELA array
+            mark (bool): Also draw the suspicious areas on the ELA image
+
+        Returns:
+            dict: suspicious_areas as (x, y, w, h) tuples, their pixel areas,
+                the per-channel deviation mask and, if asked, the ELA array
+                and marked image
+        """
+        if isinstance(image, Image.Image):
+            image = np.asarray(image.convert('RGB'))
+        image = np.ascontiguousarray(image)
+
+        buffers = self._buffers(image.shape)
+        diff = self.difference(image, buffers)
+        lut = _brightness_lut(int(diff.max()))
+
+        # lut[x] > threshold is a plain cutoff on the raw difference
+        cutoff = int(np.searchsorted(lut, self.threshold, side='right'))
+        deviation = np.greater_equal(diff, cutoff).view(np.uint8)
+        deviation *= 255
+
+        mask = self.hsv_mask(diff, lut, buffers)
+        suspicious_areas, areas = self.find_regions(mask, buffers)
+
+        result = {
+            'suspicious_areas': suspicious_areas,
+            'areas': areas,
+            'deviation_mask': deviation
+        }
+        if keep_ela or mark:
+            ela = np.take(lut, diff, out=diff)
+            if keep_ela:
+                result['ela'] = ela
+            if mark:
+                result['marked'] = self.mark_regions(ela, suspicious_areas)
+        return result
+
+    @staticmethod
+    def mark_regions(image, suspicious_areas):
+        """Draw suspicious area boxes the same way ModdedDocAnalyzer does"""
+        marked_image = Image.fromarray(image) if isinstance(image, np.ndarray) else image.copy()
+        draw = ImageDraw.Draw(marked_image)
+        for x, y, w, h in suspicious_areas:
+            draw.rectangle([x, y, x + w, y + h], outline=(0, 255, 0), width=2)
+        return marked_image
@@ -1,35 +1,105 @@
 import re
 import pymupdf
-import difflib
-import streamlit as st
+import os
 
-def extract_pdf_versions(pdf_data):
-    """Extract all PDF versions from incremental updates"""
-    if hasattr(pdf_data, 'read'):
+from shared_utils.diff_engine import diff_texts
+from shared_utils.result_cache import cache_key, document_hash, get_result_cache
+
+# Top-level tokens that delimit incremental updates. Stream openings are
+# matched too so their binary payload can be skipped, and `endstream` is
+# excluded from the `stream` alternative by the lookbehind.
+_VERSION_TOKENS = re.compile(rb'(?<!end)stream\r?\n|startxref\s+(\d+)|%%EOF')
+
+DEFAULT_DIFF_ENGINE = os.environ.get('STREAMHP_DIFF_ENGINE', 'patience')
+
+
+def _pdf_bytes(pdf_data):
+    """Bytes of an upload given as bytes, a BytesIO or a file-like object"""
+    if hasattr(pdf_data, 'getvalue'):
+        pdf_data = pdf_data.getvalue()
+    elif hasattr(pdf_data, 'read'):
         pdf_data = pdf_data.read()
-        
-    startxref_positions = [m.start() for m in re.finditer(b'startxref', pdf_data)]
+    return bytes(pdf_data)
+
+
+class PdfVersionIndex:
+    """
+    Single-pass index of the incremental updates in a PDF.
+
+    Each entry is a (startxref offset, xref offset, EOF offset) triple.
+    The index behaves as a sequence of versions: indexing returns that
+    version as bytes, copied only when asked for, and view() gives a
+    zero-copy memoryview for internal use. A file with many saves holds
+    one copy of the original bytes, not one per version.
+    """
+
+    def __init__(self, pdf_data, entries=None):
+        self.data = _pdf_bytes(pdf_data)
+        # Entries from an earlier scan of the same bytes skip the rescan
+        self.entries = [tuple(e) for e in entries] if entries is not None else self._scan(self.data)
+
+    @staticmethod
+    def _scan(data):
+        entries = []
+        pending = None
+        pos = 0
+
+        while True:
+            match = _VERSION_TOKENS.search(data, pos)
+            if match is None:
+                break
+            token = match.group(0)
+
+            if token.startswith(b'stream'):
+                # Skip the payload so startxref/%%EOF bytes inside it are ignored
+                end = data.find(b'endstream', match.end())
+                if end == -1:
+                    break
+                pos = end + len(b'endstream')
+                continue
+
+            if token.startswith(b'startxref'):
+                pending = (match.start(), int(match.group(1)))
+            elif pending is not None:
+                entries.append((pending[0], pending[1], match.end()))
+                pending = None
+            pos = match.end()
+
+        return entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, i):
+        """Return version i (cumulative, as in the file) as bytes"""
+        return self.data[:self.entries[i][2]]
+
+    def view(self, i):
+        """Return version i as a memoryview slice of the original bytes"""
+        return memoryview(self.data)[:self.entries[i][2]]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def extract_pdf_versions(pdf_data):
+    """
+    Extract all PDF versions from incremental updates.
+
+    Returns:
+        PdfVersionIndex or list: The versions, each read as bytes on
+            access, or an empty list if the PDF was never updated
+    """
+    index = pdf_data if isinstance(pdf_data, PdfVersionIndex) else PdfVersionIndex(pdf_data)
     
-    if len(startxref_positions) <= 1:
+    if len(index) <= 1:
         print("No incremental updates detected in this PDF.")
         return []
     
-    print(f"Found {len(startxref_positions)} potential versions")
-    
-    # Find EOF positions for each version
-    eof_positions = []
-    for pos in startxref_positions:
-        eof_pos = pdf_data.find(b'%%EOF', pos)
-        if eof_pos != -1:
-            eof_positions.append(eof_pos + 5)  # +5 to include %%EOF
+    print(f"Found {len(index)} potential versions")
     
-    # Extract version data (each version is cumulative)
-    versions = []
-    for i, eof_pos in enumerate(eof_positions):
-        version_data = pdf_data[:eof_pos]
-        versions.append(version_data)
-    
-    return versions
+    # Versions are cumulative, so they are sliced from the original only on access
+    return index
 
 def extract_text_from_pdf_data(pdf_data):
     """Extract text from PDF data without saving to file"""
@@ -44,12 +114,248 @@ def extract_text_from_pdf_data(pdf_data):
         print(f"Error extracting text: {e}")
         return ""
  
+_XREF_SUBSECTION = re.compile(rb'\s*(\d+)\s+(\d+)[ \t]*(?:\r\n|\r|\n)')
+_XREF_ENTRY = re.compile(rb'\s*\d{10}\s+\d{5}\s+[nf]')
+_XREF_STREAM_HEADER = re.compile(rb'\s*\d+\s+\d+\s+obj')
+_INDIRECT_REF = re.compile(r'(\d+)\s+\d+\s+R')
+# Back-references to the page tree and an annotation's page
+_BACK_REF = re.compile(r'/(?:Parent|P)\s+\d+\s+\d+\s+R')
+_INHERITED_KEYS = ('Resources', 'MediaBox', 'CropBox', 'Rotate')
+
+
+def _xref_stream_objects(pdf_data, offset):
+    """Object numbers covered by the cross-reference stream at offset"""
+    if not _XREF_STREAM_HEADER.match(pdf_data, offset):
+        return None
+    end = pdf_data.find(b'stream', offset)
+    header = bytes(pdf_data[offset:end])
+
+    index = re.search(rb'/Index\s*\[([\d\s]*)\]', header)
+    if index:
+        numbers = [int(n) for n in index.group(1).split()]
+        ranges = zip(numbers[::2], numbers[1::2])
+    else:
+        size = re.search(rb'/Size\s+(\d+)', header)
+        if not size:
+            return None
+        ranges = [(0, int(size.group(1)))]
+
+    return {num for start, count in ranges for num in range(start, start + count)}
+
+
+def parse_xref_objects(pdf_data, xref_offset):
+    """
+    Return the object numbers an update's cross-reference section lists.
+
+    Handles classic xref tables (including hybrid files with an XRefStm)
+    and cross-reference streams. Only the section headers are read, since
+    every listed object counts as touched by the update.
+
+    Returns:
+        set: Object numbers, or None if the section can't be parsed
+    """
+    if not pdf_data.startswith(b'xref', xref_offset):
+        return _xref_stream_objects(pdf_data, xref_offset)
+
+    objects = set()
+    pos = xref_offset + len(b'xref')
+    while True:
+        header = _XREF_SUBSECTION.match(pdf_data, pos)
+        if header is None:
+            break
+        start, count = int(header.group(1)), int(header.group(2))
+        pos = header.end()
+        for num in range(start, start + count):
+            entry = _XREF_ENTRY.match(pdf_data, pos)
+            if entry is None:
+                return None
+            objects.add(num)
+            pos = entry.end()
+
+    trailer_end = pdf_data.find(b'startxref', pos)
+    trailer = bytes(pdf_data[pos:trailer_end])
+    if not trailer.lstrip().startswith(b'trailer'):
+        return None
+
+    # Hybrid-reference files list further objects in a stream
+    xref_stream = re.search(rb'/XRefStm\s+(\d+)', trailer)
+    if xref_stream:
+        extra = _xref_stream_objects(pdf_data, int(xref_stream.group(1)))
+        if extra is None:
+            return None
+        objects |= extra
+
+    objects.discard(0)
+    return objects
+
+
+def _references(source):
+    """Indirect references in an object's source, minus back-references"""
+    return [int(ref) for ref in _INDIRECT_REF.findall(_BACK_REF.sub('', source))]
+
+
+def _parent(doc, xref):
+    kind, value = doc.xref_get_key(xref, 'Parent')
+    return int(value.split()[0]) if kind == 'xref' else None
+
+
+def _page_tree(doc):
+    """Xrefs of every page and every /Pages node above them"""
+    tree = set()
+    for pno in range(doc.page_count):
+        xref = doc[pno].xref
+        while xref is not None and xref not in tree:
+            tree.add(xref)
+            xref = _parent(doc, xref)
+    return tree
+
+
+def _touches(doc, xref, touched, tree, memo, active):
+    """
+    Whether xref or anything it references was touched.
+
+    Page tree nodes are not followed, so link destinations and annotation
+    back-references to other pages don't tie every page together.
+
+    Returns:
+        tuple: (touched, settled). Unsettled False answers depended on an
+            object still being visited higher up a reference cycle, so
+            they aren't memoized.
+    """
+    if xref in memo:
+        return memo[xref], True
+    if xref in active:
+        return False, False
+    if xref in touched:
+        memo[xref] = True
+        return True, True
+
+    try:
+        refs = _references(doc.xref_object(xref, compressed=True))
+    except Exception:
+        memo[xref] = True
+        return True, True
+
+    active.add(xref)
+    settled = True
+    try:
+        for ref in refs:
+            if ref in tree:
+                continue
+            found, done = _touches(doc, ref, touched, tree, memo, active)
+            if found:
+                memo[xref] = True
+                return True, True
+            settled &= done
+    finally:
+        active.discard(xref)
+    if settled:
+        memo[xref] = False
+    return False, settled
+
+
+def _inherited_refs(doc, page_xref, touched):
+    """
+    References a page picks up from the page tree, or None if a touched
+    ancestor supplies one of its inherited attributes.
+    """
+    refs = []
+    for key in _INHERITED_KEYS:
+        if doc.xref_get_key(page_xref, key)[0] != 'null':
+            continue
+        ancestor = _parent(doc, page_xref)
+        while ancestor is not None:
+            kind, value = doc.xref_get_key(ancestor, key)
+            if kind != 'null':
+                if ancestor in touched:
+                    return None
+                refs.extend(_references(value))
+                break
+            ancestor = _parent(doc, ancestor)
+    return refs
+
+
+def _changed_pages(doc, touched):
+    """Page numbers whose text may differ after an update touching these objects"""
+    all_pages = set(range(doc.page_count))
+    if touched is None:
+        return all_pages
+
+    tree = _page_tree(doc)
+    memo, active = {}, set()
+
+    def changed(pno):
+        page_xref = doc[pno].xref
+        if page_xref in touched:
+            return True
+        # Resources, boxes and rotation can come from any /Pages ancestor
+        inherited = _inherited_refs(doc, page_xref, touched)
+        if inherited is None:
+            return True
+        refs = _references(doc.xref_object(page_xref, compressed=True)) + inherited
+        return any(
+            _touches(doc, ref, touched, tree, memo, active)[0]
+            for ref in refs if ref not in tree
+        )
+
+    return {pno for pno in all_pages if changed(pno)}
+
+
+def extract_revision_texts(index):
+    """
+    Extract per-page text for every version, re-reading only changed pages.
+
+    Each update's xref section lists the objects it rewrote. A page is
+    re-extracted only if its page object, or something it references
+    (content streams, resources, fonts, XObjects, including resources
+    inherited from /Pages ancestors), is in that list. References to other
+    pages, such as link destinations, aren't followed. Other pages reuse
+    the text cached for their page object.
+
+    Returns:
+        tuple: (version_texts, page_texts). version_texts match what
+            extract_text_from_pdf_data() returns for each version.
+    """
+    cache = {}
+    version_texts, page_texts = [], []
+
+    for i, (_, xref_offset, _) in enumerate(index.entries):
+        touched = None if i == 0 else parse_xref_objects(index.data, xref_offset)
+        try:
+            doc = pymupdf.open(stream=index.view(i), filetype="pdf")
+        except Exception as e:
+            print(f"Error opening version {i+1}: {e}")
+            version_texts.append("")
+            page_texts.append([])
+            continue
+
+        with doc:
+            changed = _changed_pages(doc, touched)
+            texts = []
+            for pno in range(doc.page_count):
+                page_xref = doc[pno].xref
+                if pno in changed or page_xref not in cache:
+                    cache[page_xref] = doc[pno].get_text()
+                texts.append(cache[page_xref])
+
+        page_texts.append(texts)
+        version_texts.append("".join(texts))
+        print(f"Version {i+1}: {len(version_texts[-1])} characters extracted "
+              f"({len(changed)} of {len(texts)} pages re-read)")
+
+    return version_texts, page_texts
+
+
 def compare_pdf_versions(versions):
     """Compare consecutive PDF versions and return differences"""
     if len(versions) < 2:
         print("Need at least two versions to compare")
         return []
 
+    # An index lets unchanged pages be skipped between revisions
+    if isinstance(versions, PdfVersionIndex):
+        return extract_revision_texts(versions)[0]
+
     # Extract text from all versions
     version_texts = []
     for i, version_data in enumerate(versions):
@@ -59,8 +365,20 @@ def compare_pdf_versions(versions):
 
     return version_texts
 
-def generate_version_diffs(version_texts):
-    """Generate diffs between consecutive versions"""
+def generate_version_diffs(version_texts, page_texts=None, engine=DEFAULT_DIFF_ENGINE):
+    """
+    Generate diffs between consecutive versions.
+
+    Args:
+        version_texts (list): Full text of each version
+        page_texts (list): Optional per-page text of each version, lets
+            pages that did not change skip the line diff
+        engine (str): 'myers', 'patience' or 'difflib'
+
+    Returns:
+        list: None where a comparison was skipped, otherwise the dict from
+            diff_texts() with hunks, addition/removal counts and diff lines
+    """
     diffs = []
     
     for i in range(len(version_texts) - 1):
@@ -78,29 +396,30 @@ def generate_version_diffs(version_texts):
         # Basic difference check
         if prev_text == curr_text:
             print("  No text differences detected")
-            diffs.append([])
+            diffs.append({'hunks': [], 'additions': 0, 'removals': 0, 'lines': []})
             continue
         
-        # Generate unified diff
-        diff_lines = list(difflib.unified_diff(
-            prev_text.splitlines(),
-            curr_text.splitlines(),
+        diff = diff_texts(
+            prev_text,
+            curr_text,
             fromfile=f'Version {i+1}',
             tofile=f'Version {i+2}',
-            lineterm=''
-        ))
-        
-        # Count changes
-        additions = len([line for line in diff_lines if line.startswith('+')])
-        removals = len([line for line in diff_lines if line.startswith('-')])
-        print(f"  Changes: {additions} additions, {removals} removals")
+            engine=engine,
+            prev_pages=page_texts[i] if page_texts else None,
+            curr_pages=page_texts[i + 1] if page_texts else None
+        )
+        print(f"  Changes: {diff['additions']} additions, {diff['removals']} removals "
+              f"in {len(diff['hunks'])} hunks")
         
-        diffs.append(diff_lines)
+        diffs.append(diff)
     
     return diffs
 
 def display_diff_summary(diffs):
     """Display a summary of differences without complex data structures"""
+    # Imported here so the analysis functions work without Streamlit
+    import streamlit as st
+
     if not diffs:
         st.write("No diffs to display")
         return
@@ -110,33 +429,69 @@ def display_diff_summary(diffs):
         
         if diff is None:
             st.write("⚠️ Comparison skipped (empty text)")
-        elif not diff:
+        elif not diff['hunks']:
             st.write("✅ No differences detected")
         else:
-            # Count changes
-            additions = len([line for line in diff if line.startswith('+')])
-            removals = len([line for line in diff if line.startswith('-')])
-            
-            st.write(f"📊 **Changes:** {additions} additions, {removals} removals")
+            st.write(f"📊 **Changes:** {diff['additions']} additions, {diff['removals']} removals "
+                     f"in {len(diff['hunks'])} hunks")
 
-            st.code('\n'.join(diff), language='diff')
+            st.code('\n'.join(diff['lines']), language='diff')
 
                     
-def analyze_pdf_versions(pdf_data):
-    """Main function to analyze PDF versions without saving files"""
-    # Extract all versions
-    versions = extract_pdf_versions(pdf_data)
+def analyze_pdf_versions(pdf_data, engine=DEFAULT_DIFF_ENGINE, use_cache=True):
+    """
+    Main function to analyze PDF versions without saving files.
+
+    The version index, texts and diffs are cached by document hash, so a
+    re-uploaded PDF skips the scan, text extraction and diffing.
+
+    Returns:
+        dict or None: 'versions' as a PdfVersionIndex (len() and indexing
+            like a list of bytes), plus 'texts', 'page_texts' and 'diffs',
+            or None when the PDF has no incremental updates
+    """
+    pdf_data = _pdf_bytes(pdf_data)
+    cache = get_result_cache()
+    key = cache_key('versions', document_hash(pdf_data), engine=engine)
+    cached = cache.get(key) if use_cache else None
+
+    if cached is not None:
+        # Reuse the cached index instead of rescanning
+        index = PdfVersionIndex(pdf_data, entries=cached['entries'])
+        if len(index) <= 1:
+            return None
+        return {
+            'versions': index,
+            'texts': cached['texts'],
+            'page_texts': cached['page_texts'],
+            'diffs': cached['diffs']
+        }
+
+    # Index all versions in one pass
+    index = PdfVersionIndex(pdf_data)
+    versions = extract_pdf_versions(index)
     if not versions:
+        if use_cache:
+            cache.put(key, {'entries': index.entries})
         return None
     
-    # Extract text from all versions
-    version_texts = compare_pdf_versions(versions)
+    # Extract text from all versions, re-reading only pages each update touched
+    version_texts, page_texts = extract_revision_texts(index)
     
     # Generate diffs between consecutive versions
-    diffs = generate_version_diffs(version_texts)
+    diffs = generate_version_diffs(version_texts, page_texts, engine=engine)
+
+    if use_cache:
+        cache.put(key, {
+            'entries': index.entries,
+            'texts': version_texts,
+            'page_texts': page_texts,
+            'diffs': diffs
+        })
     
     return {
         'versions': versions,
         'texts': version_texts,
+        'page_texts': page_texts,
         'diffs': diffs
     }
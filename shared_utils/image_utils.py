@@ -1,30 +1,52 @@
 # image_utils.py
 """Image processing utilities without OpenCV dependency"""
 
+import io
+
 import numpy as np
-from skimage import measure, morphology
-from PIL import Image, ImageChops, ImageEnhance, ImageDraw
+from PIL import Image, ImageDraw
+
+from shared_utils.ela import ElaEngine
 
 class ModdedDocAnalyzer:
-    def __init__(self):
-        self.lower_bound = np.array([0, 10, 10])
-        self.upper_bound = np.array([179, 255, 245])
+    def __init__(self, lower_bound=(0, 10, 10), upper_bound=(179, 255, 245)):
+        self.lower_bound = np.array(lower_bound)
+        self.upper_bound = np.array(upper_bound)
+        self.engine = ElaEngine(lower_bound=self.lower_bound, upper_bound=self.upper_bound)
+    
+    def recompress(self, image, quality=90):
+        """Round-trip an image through JPEG in memory and return the decoded pixels."""
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        # A per-call buffer keeps concurrent sessions from sharing a temp file
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=quality)
+        buffer.seek(0)
+        with Image.open(buffer) as resaved:
+            return np.asarray(resaved)
     
-    def convert_to_ela_image(self, image, quality=90):
-        """Performs Error Level Analysis on an image."""
-        # image = Image.open(image_path).convert('RGB')
-        temp_image = image.copy()
-        temp_image.save("temp.jpg", quality=quality)
-        temp_image = Image.open("temp.jpg")
-        
-        ela_image = ImageChops.difference(image, temp_image)
-        extrema = ela_image.getextrema()
-        max_diff = max([ex[1] for ex in extrema])
-        if max_diff == 0:
-            max_diff = 1
-        scale = 255.0 / max_diff
-        ela_image = ImageEnhance.Brightness(ela_image).enhance(scale)
-        return ela_image
+    def convert_to_ela_image(self, image, quality=90, as_array=False):
+        """
+        Performs Error Level Analysis on an image.
+        
+        Accepts a PIL image or an (H, W, 3) uint8 array. Nothing touches the
+        filesystem, so it is safe to call from many threads at once.
+        """
+        original = np.asarray(image.convert('RGB') if isinstance(image, Image.Image) else image)
+        resaved = self.recompress(original, quality=quality)
+        
+        ela = np.abs(original.astype(np.int16) - resaved).astype(np.uint8)
+        max_diff = int(ela.max()) or 1
+        
+        # Same float32 multiply-and-truncate as ImageEnhance.Brightness
+        scale = np.float32(255.0 / max_diff)
+        lut = np.clip(np.arange(256, dtype=np.float32) * scale, 0, 255).astype(np.uint8)
+        ela = lut[ela]
+        
+        return ela if as_array else Image.fromarray(ela)
     
     def highlight_deviations(self, ela_image, threshold=20):
         """Highlights deviations in an ELA image based on a threshold."""
@@ -34,6 +56,8 @@ class ModdedDocAnalyzer:
     
     def apply_morphology(self,mask, kernel_size=5):
         """Apply erosion and dilation to clean up the mask."""
+        from skimage import morphology
+
         # Convert to binary
         binary_mask = mask > 127
         
@@ -49,6 +73,8 @@ class ModdedDocAnalyzer:
 
     def find_and_mark_regions(self, original_image, mask, min_area=50):
         """Find contours and draw bounding boxes on suspicious areas."""
+        from skimage import measure
+
         # Convert mask to binary
         binary_mask = mask > 127
         
@@ -133,32 +159,129 @@ class ModdedDocAnalyzer:
         )
         
         return suspicious_areas, marked_image
-    def analyze_pdf(self, manip_uploader):
-        """Perform complete deepfake analysis on a PDF."""
-        # Convert PDF to image
-        from pdf2image import convert_from_bytes
-        image = convert_from_bytes(manip_uploader.getvalue(), dpi=300, use_pdftocairo=True)
-       
-        for img in image:
-            # Perform ELA analysis
-            ela_image = self.convert_to_ela_image(img, quality=90)
-            
-            # Detect suspicious areas
-            deviation = self.highlight_deviations(ela_image, threshold=20)
-
-            # Find and mark suspicious areas
-            suspicious_areas, marked_image = self.detect_highlighted_areas(ela_image)
-            
-            results = {
+    def analyze_page(self, img, preview_width=None, images=True):
+        """Run ELA on one page image and package the results, with display images unless images is False."""
+        # Fused ELA, deviation mask and region detection
+        analysis = self.engine.analyze(img, keep_ela=images, mark=images)
+        suspicious_areas = analysis['suspicious_areas']
+        if not images:
+            return {
                 "suspicious_areas_count": len(suspicious_areas),
                 "suspicious_areas": suspicious_areas,
-                "images": {
-                    "original": image[0],
-                    "ela_analysis":ela_image,
-                    "deviation_mask": deviation,
-                    "marked_areas":marked_image
-                }
+                "areas": analysis['areas'],
+                "images": None
             }
+        
+        images = {
+            "original": img if isinstance(img, Image.Image) else Image.fromarray(img),
+            "ela_analysis": Image.fromarray(analysis['ela']),
+            "deviation_mask": Image.fromarray(analysis['deviation_mask']),
+            "marked_areas": analysis['marked']
+        }
+        if preview_width:
+            for image in images.values():
+                image.thumbnail((preview_width, preview_width * 4))
+        
+        return {
+            "suspicious_areas_count": len(suspicious_areas),
+            "suspicious_areas": suspicious_areas,
+            "areas": analysis['areas'],
+            "images": images
+        }
+    
+    def analyze_pdf(self, manip_uploader, first_page=1, last_page=None, dpi=300,
+                    workers=None, preview_width=1200, use_cache=True, prefilter=True, images=True):
+        """
+        Perform ELA manipulation analysis on every page in a range of a PDF.
+        
+        Pages are rendered lazily inside a page-parallel worker pool, so pages
+        outside the range are never rasterized. Page images are kept as
+        previews no wider than preview_width, while suspicious area
+        coordinates stay in full-resolution pixels. Page results are cached
+        by document hash and analysis settings, so only pages not analyzed
+        before with the same settings are rendered again. With prefilter,
+        uncached pages with no content to draw are skipped. Headless callers
+        pass images=False to get only the areas, with 'images' None.
+        
+        Returns:
+            dict: 'pages' with one result per analyzed page and 'summary'
+                with document-level totals, including the 'skipped_pages'
+        """
+        from shared_utils.convert_pdf import open_pdf
+        from shared_utils.parallel_render import map_pages
+        from shared_utils.result_cache import cache_key, document_hash, get_result_cache
+        
+        pdf_data = manip_uploader.getvalue() if hasattr(manip_uploader, 'getvalue') else manip_uploader
+        with open_pdf(pdf_data) as doc:
+            total_pages = doc.page_count
+        last_page = total_pages if not last_page else min(last_page, total_pages)
+        page_indices = range(first_page - 1, last_page)
+        
+        params = {'lower_bound': tuple(self.lower_bound.tolist()), 'upper_bound': tuple(self.upper_bound.tolist())}
+        engine = self.engine
+        cache = get_result_cache()
+        doc_hash = document_hash(pdf_data)
+        keys = {
+            page_index: cache_key(
+                'ela', doc_hash, page=page_index, dpi=dpi, preview_width=preview_width, images=images,
+                quality=engine.quality, threshold=engine.threshold, kernel_size=engine.radius * 2 + 1,
+                min_area=engine.min_area, **params
+            )
+            for page_index in page_indices
+        }
+        results = {}
+        if use_cache:
+            for page_index, key in keys.items():
+                cached = cache.get(key)
+                if cached is not None:
+                    results[page_index] = cached
+        
+        missing = [i for i in page_indices if i not in results]
+        skipped = set()
+        if prefilter and missing:
+            from shared_utils.prefilter import find_empty_pages
             
-            return results
-            
\ No newline at end of file
+            skipped = find_empty_pages(pdf_data, missing)
+            missing = [i for i in missing if i not in skipped]
+        for page_index, result in zip(missing, map_pages(
+            pdf_data, missing, _analyze_page_task,
+            (dpi, preview_width, params, doc_hash if use_cache else None, images),
+            workers=workers
+        )):
+            result['page'] = page_index + 1
+            results[page_index] = result
+            if use_cache:
+                cache.put(keys[page_index], result)
+        pages = [results[i] for i in page_indices if i not in skipped]
+        
+        flagged = [p['page'] for p in pages if p['suspicious_areas_count']]
+        summary = {
+            "total_pages": total_pages,
+            "pages_analyzed": len(pages),
+            "pages_skipped": len(skipped),
+            "skipped_pages": [i + 1 for i in sorted(skipped)],
+            "flagged_pages": flagged,
+            "suspicious_areas_count": sum(p['suspicious_areas_count'] for p in pages)
+        }
+        
+        return {"pages": pages, "summary": summary}
+
+
+_worker_analyzers = {}
+
+
+def _analyze_page_task(page, dpi, preview_width, params, doc_hash=None, images=True):
+    """Render (or load from the page cache) and analyze one page inside a map_pages worker."""
+    from shared_utils.convert_pdf import render_page
+    from shared_utils.page_cache import render_cached
+    
+    key = tuple(sorted(params.items()))
+    analyzer = _worker_analyzers.get(key)
+    if analyzer is None:
+        analyzer = _worker_analyzers[key] = ModdedDocAnalyzer(**params)
+    
+    if doc_hash:
+        img = render_cached(page, doc_hash, dpi=dpi, as_array=True)
+    else:
+        img = render_page(page, dpi=dpi)
+    return analyzer.analyze_page(img, preview_width=preview_width, images=images)
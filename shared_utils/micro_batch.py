@@ -0,0 +1,109 @@
+"""Dynamic micro-batching for models called one item at a time from many threads.
+
+Each Streamlit session (and each service worker) asks for one prediction at
+a time. A MicroBatcher queues those requests and a single scheduler thread
+drains them: it takes the first waiting item, keeps collecting for up to
+max_wait_ms or until max_batch_size items are queued, runs one batched
+forward pass and hands every caller its own result.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Turn concurrent single-item calls into batched calls of batch_fn."""
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=10, name='micro-batcher'):
+        """
+        Args:
+            batch_fn (callable): Takes a list of items, returns a list of
+                results in the same order
+            max_batch_size (int): Most items per batch_fn call
+            max_wait_ms (float): How long the first item in a batch may wait
+                for others to arrive
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queue one item and return a Future for its result"""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item):
+        """Blocking single-item call, batched with whatever else is in flight"""
+        return self.submit(item).result()
+
+    @property
+    def mean_batch_size(self):
+        return self.items / self.batches if self.batches else 0.0
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self):
+        """Next batch of (item, future) entries, or None once closed"""
+        batch = []
+        while not batch:
+            first = self._queue.get()
+            if first is _STOP:
+                return None
+            # Callers may have cancelled while waiting, those are dropped
+            if first[1].set_running_or_notify_cancel():
+                batch.append(first)
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                # Finish this batch, then stop
+                self._queue.put(_STOP)
+                break
+            if entry[1].set_running_or_notify_cancel():
+                batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for _, future in batch:
+                    _deliver(future.set_exception, e)
+                continue
+
+            self.batches += 1
+            self.items += len(items)
+            for (_, future), result in zip(batch, results):
+                _deliver(future.set_result, result)
+
+
+def _deliver(setter, value):
+    """Resolve a future, which a caller's wrapper may already have settled"""
+    try:
+        setter(value)
+    except InvalidStateError:
+        pass
@@ -0,0 +1,201 @@
+"""Process-wide registry for the ML models used by the app.
+
+Streamlit reruns page scripts on every interaction and serves each session
+from its own thread, so models are loaded once per process here and shared
+by every session instead of being rebuilt inside button handlers.
+"""
+
+import os
+import sys
+import threading
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(ROOT_DIR, 'models')
+VIT_MODEL_DIR = os.path.join(MODELS_DIR, 'vitmodel')
+VIT_ONNX_PATH = os.path.join(VIT_MODEL_DIR, 'model.onnx')
+SIG_MODEL_PATH = os.path.join(MODELS_DIR, 'sig_detect.onnx')
+FORGERY_MODEL_ID = 'aevalone/vit-base-patch16-224-finetuned-forgery'
+
+# 'onnx' or 'torch'; defaults to ONNX whenever an exported model is present
+FORGERY_BACKEND = os.environ.get('STREAMHP_FORGERY_BACKEND')
+
+# 'fp32' or 'int8'; INT8 models are built by `python -m shared_utils.quantize build`
+PRECISION = os.environ.get('STREAMHP_PRECISION', 'fp32').lower()
+
+# Micro-batching window for concurrent forgery verifications
+VERIFY_MAX_BATCH = int(os.environ.get('STREAMHP_VERIFY_MAX_BATCH', 8))
+VERIFY_MAX_WAIT_MS = float(os.environ.get('STREAMHP_VERIFY_MAX_WAIT_MS', 10))
+
+_models = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+
+def inference_lock(name):
+    """Return the lock guarding a registered model.
+
+    The same lock serializes loading, and callers can hold it around
+    inference for models that are not safe to call from several threads
+    at once (the Ultralytics predictor keeps per-call state on the model).
+    """
+    with _registry_lock:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def get_model(name, loader):
+    """Return the model registered under `name`, loading it on first use."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with inference_lock(name):
+        # Another session may have finished loading while we waited
+        if name not in _models:
+            _models[name] = loader()
+        return _models[name]
+
+
+def loaded_models():
+    """Names of the models loaded so far in this process."""
+    return sorted(_models)
+
+
+def patch_torch_classes():
+    """Hide torch.classes from Streamlit's file watcher once torch is loaded.
+
+    The watcher walks every module's __path__, and torch.classes raises when
+    asked for it. Torch is only imported by the model loaders, so the
+    workaround is applied there instead of importing torch on every page.
+    """
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.classes.__path__ = []
+
+
+def has_local_weights(model_dir):
+    """Check whether a transformers model directory ships its own weights"""
+    return any(
+        os.path.exists(os.path.join(model_dir, f))
+        for f in ('model.safetensors', 'pytorch_model.bin')
+    )
+
+
+def int8_path(fp32_path):
+    """Path of the INT8 variant of an ONNX model, e.g. sig_detect.int8.onnx"""
+    root, ext = os.path.splitext(fp32_path)
+    return f"{root}.int8{ext}"
+
+
+def resolve_model_path(fp32_path):
+    """Pick the ONNX file matching the configured precision."""
+    if PRECISION != 'int8':
+        return fp32_path
+
+    quantized = int8_path(fp32_path)
+    if os.path.exists(quantized):
+        return quantized
+
+    print(f"INT8 model {quantized} not found, falling back to {fp32_path}")
+    return fp32_path
+
+
+def _load_onnx_forgery_classifier():
+    from shared_utils.vit_onnx import OnnxForgeryClassifier
+    from PIL import Image
+
+    model = OnnxForgeryClassifier(resolve_model_path(VIT_ONNX_PATH))
+    model(Image.new('RGB', (224, 224), 'white'))
+    return model
+
+
+def _load_forgery_classifier():
+    from transformers import pipeline
+    from PIL import Image
+
+    patch_torch_classes()
+
+    if has_local_weights(VIT_MODEL_DIR):
+        model = pipeline("image-classification", model=VIT_MODEL_DIR)
+    else:
+        # Weights come from the hub, config and preprocessing from the local copy
+        model = pipeline(
+            "image-classification",
+            model=FORGERY_MODEL_ID,
+            config=VIT_MODEL_DIR,
+            image_processor=VIT_MODEL_DIR
+        )
+
+    # Warm-up pass so the first real request doesn't pay for lazy init
+    model(Image.new('RGB', (224, 224), 'white'))
+    return model
+
+
+def _load_signature_detector():
+    from ultralytics import YOLO
+    import numpy as np
+
+    patch_torch_classes()
+
+    model = YOLO(resolve_model_path(SIG_MODEL_PATH), task='detect')
+
+    # Warm-up pass builds the ONNX session before the first upload
+    model.predict(np.full((640, 640, 3), 255, dtype=np.uint8), verbose=False)
+    return model
+
+
+def forgery_backend():
+    """Resolve which backend serves the forgery classifier."""
+    if FORGERY_BACKEND:
+        return FORGERY_BACKEND
+
+    return 'onnx' if os.path.exists(VIT_ONNX_PATH) else 'torch'
+
+
+def get_forgery_classifier():
+    """Return the shared ViT forgery classifier.
+
+    Both backends are called the same way: an image in, a list of
+    {'label', 'score'} dicts out.
+    """
+    if forgery_backend() == 'onnx':
+        return get_model('forgery_classifier_onnx', _load_onnx_forgery_classifier)
+    return get_model('forgery_classifier', _load_forgery_classifier)
+
+
+def get_signature_detector():
+    """Return the shared YOLO signature detector."""
+    return get_model('signature_detector', _load_signature_detector)
+
+
+def classify_batch(classifier, images):
+    """Score a list of images with one forward pass on either backend.
+
+    The ONNX classifier batches whatever list it is given, while the
+    transformers pipeline runs a list one image at a time unless it is
+    also given a batch_size.
+    """
+    images = list(images)
+    if hasattr(classifier, 'predict_proba'):
+        return classifier(images)
+    return classifier(images, batch_size=len(images))
+
+
+def _load_batched_forgery_classifier():
+    from shared_utils.micro_batch import MicroBatcher
+
+    classifier = get_forgery_classifier()
+    return MicroBatcher(
+        lambda images: classify_batch(classifier, images),
+        max_batch_size=VERIFY_MAX_BATCH,
+        max_wait_ms=VERIFY_MAX_WAIT_MS,
+        name='forgery-batcher'
+    )
+
+
+def get_batched_forgery_classifier():
+    """Return the forgery classifier behind the shared micro-batching scheduler.
+
+    Called like the plain classifier with one image, but concurrent calls
+    from different sessions are run as one batched forward pass.
+    """
+    return get_model('forgery_classifier_batcher', _load_batched_forgery_classifier)
@@ -0,0 +1,187 @@
+"""Disk cache of rasterized pages, shared by the signature, ELA and forgery pages.
+
+Each page of a document is stored once, as a raw RGB .npy file at the
+highest DPI any caller has asked for, and read back memory-mapped so only
+the pixels actually touched are paged in. Requests for a lower DPI are
+served by downscaling the cached page; a higher DPI re-renders the page and
+replaces the cached copy. Files are evicted least recently used first once
+the cache grows past its size budget.
+
+Downscaled pages are box-filtered from the cached render, so they are close
+to, but not pixel-identical with, a direct render at that DPI. Detection on
+a downscaled page can differ slightly from detection on a fresh render,
+depending on whether a higher-DPI copy was cached first.
+
+Pages are large: about 25 MB each at 300 DPI and 11 MB at 200 DPI for A4,
+so the default 4 GB budget holds a few hundred pages. ELA stores its
+300 DPI renders here, and the signature page then downscales from them.
+"""
+
+import os
+import re
+import tempfile
+import threading
+
+import numpy as np
+import pymupdf
+from PIL import Image
+
+from shared_utils.convert_pdf import render_page
+from shared_utils.model_registry import ROOT_DIR
+from shared_utils.result_cache import DiskBudget
+
+PAGE_CACHE_DIR = os.environ.get('STREAMHP_PAGE_CACHE_DIR', os.path.join(ROOT_DIR, '.cache', 'pages'))
+
+# 0 disables the cache
+PAGE_CACHE_MAX_MB = int(os.environ.get('STREAMHP_PAGE_CACHE_MB', 4096))
+
+_PAGE_FILE = re.compile(r'p(\d+)-(\d+)dpi\.npy$')
+
+
+def page_size(page, dpi):
+    """(width, height) in pixels of page rendered at dpi, as get_pixmap sizes it"""
+    zoom = dpi / 72
+    rect = (page.rect * pymupdf.Matrix(zoom, zoom)).irect
+    return rect.width, rect.height
+
+
+def _to_grayscale(array):
+    return np.asarray(Image.fromarray(array).convert('L'))[:, :, None]
+
+
+class PageCache:
+    """Memory-mapped page images in one folder per document hash."""
+
+    def __init__(self, directory=PAGE_CACHE_DIR, max_mb=PAGE_CACHE_MAX_MB):
+        self.directory = directory
+        self.max_bytes = max_mb * 1024 * 1024
+        self._budget = DiskBudget(self.max_bytes, self._pages)
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _doc_dir(self, doc_hash):
+        return os.path.join(self.directory, doc_hash)
+
+    def _find(self, doc_hash, page_index):
+        """Return (dpi, path) of the cached copy of a page, or None"""
+        try:
+            entries = list(os.scandir(self._doc_dir(doc_hash)))
+        except FileNotFoundError:
+            return None
+        best = None
+        for entry in entries:
+            match = _PAGE_FILE.match(entry.name)
+            if match and int(match.group(1)) == page_index:
+                dpi = int(match.group(2))
+                if best is None or dpi > best[0]:
+                    best = (dpi, entry.path)
+        return best
+
+    def get(self, doc_hash, page, dpi, grayscale=False):
+        """
+        Return a cached page at dpi, or None if it isn't cached at dpi or higher.
+
+        Pages cached at exactly dpi come back as read-only memory maps.
+        """
+        if not self.enabled:
+            return None
+        found = self._find(doc_hash, page.number)
+        if found is None or found[0] < dpi:
+            return None
+        cached_dpi, path = found
+        try:
+            array = np.load(path, mmap_mode='r')
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if cached_dpi != dpi:
+            array = np.asarray(Image.fromarray(array).resize(page_size(page, dpi), Image.Resampling.BOX))
+        return _to_grayscale(array) if grayscale else array
+
+    def put(self, doc_hash, page_index, dpi, array):
+        """Store an (H, W, 3) page rendered at dpi and return it memory-mapped"""
+        if not self.enabled:
+            return array
+        doc_dir = self._doc_dir(doc_hash)
+        os.makedirs(doc_dir, exist_ok=True)
+        path = os.path.join(doc_dir, f"p{page_index}-{dpi}dpi.npy")
+
+        # Written under a temp name so readers never see a partial page
+        fd, tmp_path = tempfile.mkstemp(dir=doc_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            mapped = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=array.shape)
+            mapped[...] = array
+            mapped.flush()
+            del mapped
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        # Lower-resolution copies of this page are now redundant
+        freed = 0
+        for entry in os.scandir(doc_dir):
+            match = _PAGE_FILE.match(entry.name)
+            if match and int(match.group(1)) == page_index and int(match.group(2)) < dpi:
+                try:
+                    freed += entry.stat().st_size
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+        self._budget.add(os.path.getsize(path) - freed)
+        return np.load(path, mmap_mode='r')
+
+    def fetch(self, doc_hash, page, dpi, grayscale=False):
+        """Return a page at dpi from the cache, rendering and storing it on a miss"""
+        array = self.get(doc_hash, page, dpi, grayscale=grayscale)
+        if array is not None:
+            return array
+        array = self.put(doc_hash, page.number, dpi, render_page(page, dpi=dpi, as_array=True))
+        return _to_grayscale(array) if grayscale else array
+
+    def has(self, doc_hash, page_index, dpi):
+        """Whether a page is cached at dpi or higher"""
+        found = self._find(doc_hash, page_index)
+        return self.enabled and found is not None and found[0] >= dpi
+
+    def _pages(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            entry.path
+            for doc_dir in os.scandir(self.directory) if doc_dir.is_dir()
+            for entry in os.scandir(doc_dir.path) if _PAGE_FILE.match(entry.name)
+        ]
+
+    def evict(self):
+        """Remove least recently used pages until the cache fits its budget"""
+        self._budget.evict()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """Return the process-wide page cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache()
+        return _cache
+
+
+def render_cached(page, doc_hash, dpi=200, grayscale=False, as_array=False):
+    """render_page() through the page cache"""
+    array = get_page_cache().fetch(doc_hash, page, dpi, grayscale=grayscale)
+    if as_array:
+        return array
+    return Image.fromarray(array[:, :, 0] if grayscale else array)
@@ -0,0 +1,330 @@
+"""Parallel page rasterization across a process pool.
+
+The PDF bytes are placed in shared memory once per call, and every worker
+opens its own PyMuPDF document from them. Workers write rendered pages into
+fresh shared-memory blocks and return only the block names, so no pixel data
+is pickled. The parent maps the blocks as NumPy arrays and yields them in
+page order.
+
+One pool serves every call in the process. Tasks name the document they
+need, and each worker keeps the last one it opened, so repeated calls pay
+neither for pool startup nor for reopening the document.
+"""
+
+import atexit
+import multiprocessing as mp
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pymupdf
+from PIL import Image
+
+from shared_utils.convert_pdf import iter_pdf_pages, open_pdf
+from shared_utils.page_cache import get_page_cache, render_cached
+from shared_utils.result_cache import document_hash
+
+DEFAULT_WORKERS = int(os.environ.get('STREAMHP_RENDER_WORKERS', min(os.cpu_count() or 1, 8)))
+DEFAULT_MEMORY_BUDGET_MB = int(os.environ.get('STREAMHP_RENDER_MEMORY_MB', 1024))
+
+# Below this many pages handing the document to the pool costs more than it saves
+MIN_PAGES_FOR_POOL = 8
+
+_worker_doc = None
+_worker_doc_ref = None
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _pool_context():
+    # forkserver keeps workers clear of Streamlit's threads and, unlike
+    # spawn, only pays for imports once per process
+    if 'forkserver' in mp.get_all_start_methods():
+        ctx = mp.get_context('forkserver')
+        ctx.set_forkserver_preload(['shared_utils.parallel_render'])
+        return ctx
+    return mp.get_context('spawn')
+
+
+def _shared_pool():
+    """Return the process-wide render pool, starting it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=DEFAULT_WORKERS, mp_context=_pool_context())
+        return _pool
+
+
+def _reset_pool(pool):
+    """Drop a broken pool so the next call starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _worker_document(doc_ref):
+    """Open the document behind a (shared-memory name, size) reference, reusing the last one"""
+    global _worker_doc, _worker_doc_ref
+    if doc_ref != _worker_doc_ref:
+        name, size = doc_ref
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            data = bytes(shm.buf[:size])
+        finally:
+            shm.close()
+        if _worker_doc is not None:
+            _worker_doc.close()
+        _worker_doc = pymupdf.open(stream=data, filetype='pdf')
+        _worker_doc_ref = doc_ref
+    return _worker_doc
+
+
+def _run_page_task(doc_ref, task, page_index, args):
+    return task(_worker_document(doc_ref)[page_index], *args)
+
+
+def _render_range(doc_ref, start, stop, dpi, grayscale):
+    """Render pages [start, stop) into shared memory and return their handles"""
+    doc = _worker_document(doc_ref)
+    handles = []
+    for page_num in range(start, stop):
+        pix = doc[page_num].get_pixmap(
+            dpi=dpi,
+            colorspace=pymupdf.csGRAY if grayscale else pymupdf.csRGB,
+            alpha=False
+        )
+        shape = (pix.height, pix.width, pix.n)
+        shm = shared_memory.SharedMemory(create=True, size=max(len(pix.samples_mv), 1))
+        shm.buf[:len(pix.samples_mv)] = pix.samples_mv
+        # Ownership passes to the parent, which unlinks the block
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        shm.close()
+        handles.append((page_num, shm.name, shape))
+    return handles
+
+
+class _SharedPage:
+    """Keeps a page's shared-memory block mapped while arrays view it."""
+
+    def __init__(self, name, shape):
+        self.shm = shared_memory.SharedMemory(name=name)
+        # Drop the name right away, the mapping stays valid until unmapped
+        self.shm.unlink()
+        self.array = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.__array_interface__ = self.array.__array_interface__
+
+
+def _attach(name, shape):
+    return np.asarray(_SharedPage(name, shape))
+
+
+def _discard(handles):
+    for _, name, _ in handles:
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+            shm.unlink()
+            shm.close()
+        except FileNotFoundError:
+            pass
+
+
+def _page_nbytes(pdf_data, page_index, dpi, grayscale):
+    with open_pdf(pdf_data) as doc:
+        zoom = dpi / 72
+        rect = (doc[page_index].rect * pymupdf.Matrix(zoom, zoom)).irect
+    return rect.width * rect.height * (1 if grayscale else 3)
+
+
+def _cache_page_task(page, doc_hash, dpi):
+    get_page_cache().fetch(doc_hash, page, dpi)
+    return page.number
+
+
+def _iter_cached_pages(pdf_data, dpi, first_page, last_page, grayscale, as_array, workers):
+    """Yield pages from the page cache, rendering the misses into it across the pool"""
+    cache = get_page_cache()
+    doc_hash = document_hash(pdf_data)
+    page_indices = range(first_page - 1, last_page)
+    missing = deque(i for i in page_indices if not cache.has(doc_hash, i, dpi))
+
+    # Workers write straight into the cache and only report page numbers back
+    rendered = map_pages(
+        pdf_data, list(missing), _cache_page_task, (doc_hash, dpi),
+        workers=workers if len(missing) >= MIN_PAGES_FOR_POOL else 1
+    )
+    try:
+        with open_pdf(pdf_data) as doc:
+            for page_index in page_indices:
+                if missing and missing[0] == page_index:
+                    next(rendered)
+                    missing.popleft()
+                yield render_cached(doc[page_index], doc_hash, dpi=dpi, grayscale=grayscale, as_array=as_array)
+    finally:
+        rendered.close()
+
+
+def iter_pdf_pages_parallel(pdf_data, dpi=200, first_page=1, last_page=None, grayscale=False,
+                            as_array=False, workers=None, memory_budget_mb=None, use_cache=False):
+    """
+    Rasterize a page range across a process pool, yielding pages in order.
+
+    Args:
+        pdf_data (bytes): The PDF file content as bytes
+        dpi (int): DPI resolution for the images
+        first_page (int): First page to render (1-based)
+        last_page (int): Last page to render, defaults to the last page
+        grayscale (bool): Render single-channel images
+        as_array (bool): Yield NumPy arrays backed by shared memory instead
+            of PIL images
+        workers (int): Worker processes, defaults to STREAMHP_RENDER_WORKERS
+        memory_budget_mb (int): Cap on rendered pages held at once, counting
+            pages in flight in the workers and pages waiting to be consumed
+        use_cache (bool): Go through the shared page cache. Cached pages are
+            memory-mapped from disk, so the memory budget doesn't apply.
+
+    Yields:
+        PIL.Image or np.ndarray: One image per page, in page order
+    """
+    if hasattr(pdf_data, 'getvalue'):
+        pdf_data = pdf_data.getvalue()
+
+    workers = workers or DEFAULT_WORKERS
+    memory_budget = (memory_budget_mb or DEFAULT_MEMORY_BUDGET_MB) * 1024 * 1024
+
+    with open_pdf(pdf_data) as doc:
+        page_count = doc.page_count
+    last_page = page_count if last_page is None else min(last_page, page_count)
+    total_pages = last_page - first_page + 1
+
+    if use_cache and get_page_cache().enabled:
+        yield from _iter_cached_pages(pdf_data, dpi, first_page, last_page, grayscale, as_array, workers)
+        return
+
+    if workers <= 1 or total_pages < MIN_PAGES_FOR_POOL:
+        yield from iter_pdf_pages(pdf_data, dpi=dpi, first_page=first_page, last_page=last_page,
+                                  grayscale=grayscale, as_array=as_array)
+        return
+
+    # Size the in-flight window from the first page, pages are usually uniform
+    page_bytes = _page_nbytes(pdf_data, first_page - 1, dpi, grayscale)
+    max_in_flight = max(workers, memory_budget // max(page_bytes, 1))
+    chunk_size = max(1, min(-(-total_pages // workers), max_in_flight // workers))
+
+    pending = deque()
+    unconsumed = deque()
+    ranges = deque(
+        (start, min(start + chunk_size, last_page))
+        for start in range(first_page - 1, last_page, chunk_size)
+    )
+
+    try:
+        with document_pool(pdf_data) as submit:
+            in_flight = 0
+            while ranges or pending:
+                while ranges and in_flight + (ranges[0][1] - ranges[0][0]) <= max_in_flight:
+                    start, stop = ranges.popleft()
+                    pending.append(submit(_render_range, start, stop, dpi, grayscale))
+                    in_flight += stop - start
+
+                unconsumed.extend(pending.popleft().result())
+                in_flight -= len(unconsumed)
+                while unconsumed:
+                    _, name, shape = unconsumed.popleft()
+                    array = _attach(name, shape)
+                    if as_array:
+                        yield array
+                    else:
+                        yield Image.fromarray(array[:, :, 0] if grayscale else array)
+    finally:
+        # Release blocks rendered for pages the consumer never reached
+        _discard(unconsumed)
+        while pending:
+            future = pending.popleft()
+            if not future.cancel():
+                try:
+                    _discard(future.result())
+                except Exception:
+                    pass
+
+
+def map_pages(pdf_data, page_indices, task, args=(), workers=None):
+    """
+    Run task(page, *args) for each page, spread across a process pool.
+
+    Pages are only loaded (and rendered, if the task renders) inside the
+    worker that handles them, so pages outside page_indices cost nothing.
+    The task must be a picklable module-level function.
+
+    Args:
+        pdf_data (bytes): The PDF file content as bytes
+        page_indices (list): 0-based page indices to process
+        task (callable): Called as task(pymupdf.Page, *args)
+        args (tuple): Extra arguments for the task
+        workers (int): Pages in progress at once, defaults to
+            STREAMHP_RENDER_WORKERS, which is also the pool size
+
+    Yields:
+        The task's return value for each page, in page_indices order
+    """
+    if hasattr(pdf_data, 'getvalue'):
+        pdf_data = pdf_data.getvalue()
+    page_indices = list(page_indices)
+    workers = min(workers or DEFAULT_WORKERS, len(page_indices))
+
+    if workers <= 1:
+        with open_pdf(pdf_data) as doc:
+            for page_index in page_indices:
+                yield task(doc[page_index], *args)
+        return
+
+    pending = deque()
+    remaining = deque(page_indices)
+    with document_pool(pdf_data) as submit:
+        try:
+            while remaining or pending:
+                # Two tasks per worker keeps them busy without piling up results
+                while remaining and len(pending) < workers * 2:
+                    pending.append(submit(_run_page_task, task, remaining.popleft(), args))
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            # Tasks already running still read the document's shared memory
+            wait(pending)
+
+
+@contextmanager
+def document_pool(pdf_data):
+    """
+    Share a document with the render pool for the duration of a call.
+
+    Yields:
+        callable: submit(fn, *args), running fn(doc_ref, *args) in a worker
+            that opens the document with _worker_document(doc_ref)
+    """
+    doc_shm = shared_memory.SharedMemory(create=True, size=max(len(pdf_data), 1))
+    doc_shm.buf[:len(pdf_data)] = pdf_data
+    doc_ref = (doc_shm.name, len(pdf_data))
+    pool = _shared_pool()
+    try:
+        yield lambda fn, *args: pool.submit(fn, doc_ref, *args)
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        raise
+    finally:
+        doc_shm.close()
+        doc_shm.unlink()
@@ -0,0 +1,94 @@
+"""Cheap blank-page check run before the detectors.
+
+Scanned bundles carry blank separator pages that can't hold a signature or
+an edit. Each page is classified from its content streams when it has none
+to draw, and otherwise from a low-DPI grayscale thumbnail: the histogram
+median gives the paper tone, and pixels well below it count as ink. Pages
+with almost no ink are skipped by signature detection. ELA only skips pages
+with nothing to draw, since an edit such as a white overlay leaves no ink.
+"""
+
+import os
+
+import numpy as np
+
+from shared_utils.convert_pdf import open_pdf, render_page
+
+PREFILTER_DPI = int(os.environ.get('STREAMHP_PREFILTER_DPI', 72))
+# Pages whose thumbnail has at most this fraction of ink pixels are blank
+BLANK_MAX_INK = float(os.environ.get('STREAMHP_BLANK_MAX_INK', 0.00002))
+# Gray levels below the paper tone for a pixel to count as ink
+INK_CONTRAST = int(os.environ.get('STREAMHP_INK_CONTRAST', 48))
+
+
+def has_no_content(page):
+    """True when a page has nothing to draw: empty content streams, no annotations or form fields"""
+    doc = page.parent
+    return page.first_annot is None and page.first_widget is None and not any(
+        doc.xref_stream(xref).strip() for xref in page.get_contents()
+    )
+
+
+def ink_stats(gray, contrast=INK_CONTRAST):
+    """
+    Paper tone and ink coverage of a grayscale page from its histogram.
+
+    Returns:
+        dict: 'background' (median gray level) and 'ink' (fraction of
+            pixels at least contrast levels darker than it)
+    """
+    hist = np.bincount(gray.ravel(), minlength=256)
+    cdf = np.cumsum(hist)
+    total = cdf[-1]
+    background = int(np.searchsorted(cdf, total / 2))
+    cutoff = max(background - contrast, 0)
+    return {
+        'background': background,
+        'ink': float(cdf[cutoff - 1] / total) if cutoff else 0.0
+    }
+
+
+def is_blank_page(page, dpi=PREFILTER_DPI, max_ink=BLANK_MAX_INK, contrast=INK_CONTRAST):
+    """Decide whether one PyMuPDF page is blank enough to skip"""
+    if has_no_content(page):
+        return True
+    thumbnail = render_page(page, dpi=dpi, grayscale=True, as_array=True)
+    return ink_stats(thumbnail[:, :, 0], contrast)['ink'] <= max_ink
+
+
+def find_blank_pages(pdf_data, page_indices=None, dpi=PREFILTER_DPI, max_ink=BLANK_MAX_INK,
+                     contrast=INK_CONTRAST):
+    """
+    Find the pages of a PDF that can't contain a signature or an edit.
+
+    Args:
+        pdf_data (bytes): The PDF file content
+        page_indices (iterable): 0-based pages to check, all pages by default
+
+    Returns:
+        set: 0-based indices of blank pages
+    """
+    with open_pdf(pdf_data) as doc:
+        indices = range(doc.page_count) if page_indices is None else page_indices
+        return {i for i in indices if is_blank_page(doc[i], dpi, max_ink, contrast)}
+
+
+def find_empty_pages(pdf_data, page_indices=None):
+    """
+    Find the pages of a PDF with nothing to draw, by has_no_content().
+
+    Args:
+        pdf_data (bytes): The PDF file content
+        page_indices (iterable): 0-based pages to check, all pages by default
+
+    Returns:
+        set: 0-based indices of empty pages
+    """
+    with open_pdf(pdf_data) as doc:
+        indices = range(doc.page_count) if page_indices is None else page_indices
+        return {i for i in indices if has_no_content(doc[i])}
+
+
+def prefilter_params():
+    """Settings that change the outcome, for result cache keys"""
+    return {'dpi': PREFILTER_DPI, 'max_ink': BLANK_MAX_INK, 'contrast': INK_CONTRAST}
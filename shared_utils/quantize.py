@@ -0,0 +1,214 @@
+"""INT8 dynamic quantization of the ONNX models, with an FP32 comparison report.
+
+Build the quantized models, then check them against FP32 on local samples:
+
+    python -m shared_utils.quantize build
+    python -m shared_utils.quantize report --samples path/to/samples
+
+The sample folder can hold PDFs and images. Every PDF page and image goes
+through both signature detectors, and every image goes through both forgery
+classifiers. Set STREAMHP_PRECISION=int8 to have the app load the INT8 models.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from shared_utils.model_registry import SIG_MODEL_PATH, VIT_ONNX_PATH, int8_path
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def quantize_model(fp32_path, output_path=None, weight_type='int8'):
+    """
+    Dynamically quantize an ONNX model's weights to 8 bits.
+
+    Args:
+        fp32_path (str): Path to the FP32 ONNX model
+        output_path (str): Where to write the quantized model
+        weight_type (str): 'int8' or 'uint8'. Conv-heavy models like YOLO need
+            'uint8' since the CPU ConvInteger kernel has no signed-weight variant.
+
+    Returns:
+        str: Path of the quantized model
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output_path = output_path or int8_path(fp32_path)
+    quant_type = QuantType.QUInt8 if weight_type == 'uint8' else QuantType.QInt8
+
+    quantize_dynamic(fp32_path, output_path, weight_type=quant_type)
+    print(f"Quantized {fp32_path} -> {output_path}")
+    return output_path
+
+
+def build_all():
+    """Quantize the signature detector and the exported ViT classifier."""
+    built = []
+    for fp32_path, weight_type in ((SIG_MODEL_PATH, 'uint8'), (VIT_ONNX_PATH, 'int8')):
+        if not os.path.exists(fp32_path):
+            print(f"Skipping {fp32_path}: model not found")
+            continue
+        built.append(quantize_model(fp32_path, weight_type=weight_type))
+    return built
+
+
+def _box_iou(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy box arrays."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match_boxes(ref_boxes, test_boxes, iou_threshold=0.5):
+    """Greedily match boxes by IoU and return the number of matched pairs."""
+    if len(ref_boxes) == 0 or len(test_boxes) == 0:
+        return 0
+
+    iou = _box_iou(ref_boxes, test_boxes)
+    matched = 0
+    while iou.size and iou.max() >= iou_threshold:
+        i, j = np.unravel_index(iou.argmax(), iou.shape)
+        iou[i, :] = 0
+        iou[:, j] = 0
+        matched += 1
+    return matched
+
+
+def load_samples(sample_dir, dpi=200):
+    """Load sample pages and images as PIL images."""
+    from PIL import Image
+
+    from shared_utils.convert_pdf import iter_pdf_pages
+
+    pages, images = [], []
+    for name in sorted(os.listdir(sample_dir)):
+        path = os.path.join(sample_dir, name)
+        ext = os.path.splitext(name)[1].lower()
+        if ext == '.pdf':
+            with open(path, 'rb') as f:
+                pages.extend(iter_pdf_pages(f.read(), dpi=dpi))
+        elif ext in IMAGE_EXTENSIONS:
+            img = Image.open(path).convert('RGB')
+            pages.append(img)
+            images.append(img)
+    return pages, images
+
+
+def _timed(fn, items):
+    outputs, elapsed = [], 0.0
+    for item in items:
+        start = time.perf_counter()
+        outputs.append(fn(item))
+        elapsed += time.perf_counter() - start
+    return outputs, elapsed / max(len(items), 1)
+
+
+def _size_mb(path):
+    return os.path.getsize(path) / (1024 * 1024)
+
+
+def compare_detectors(pages, fp32_path=SIG_MODEL_PATH, iou_threshold=0.5):
+    """Compare FP32 and INT8 signature detectors on the same pages."""
+    from ultralytics import YOLO
+
+    runs = {}
+    for label, path in (('fp32', fp32_path), ('int8', int8_path(fp32_path))):
+        model = YOLO(path, task='detect')
+        predict = lambda img: model.predict(img, verbose=False)[0].boxes.xyxy.cpu().numpy()
+        predict(pages[0])  # warm-up
+        runs[label] = _timed(predict, pages)
+
+    (ref, ref_latency), (test, test_latency) = runs['fp32'], runs['int8']
+    matched = sum(match_boxes(r, t, iou_threshold) for r, t in zip(ref, test))
+    total = sum(max(len(r), len(t)) for r, t in zip(ref, test))
+
+    return {
+        'samples': len(pages),
+        'fp32_size_mb': _size_mb(fp32_path),
+        'int8_size_mb': _size_mb(int8_path(fp32_path)),
+        'fp32_latency_ms': ref_latency * 1000,
+        'int8_latency_ms': test_latency * 1000,
+        'speedup': ref_latency / test_latency if test_latency else 0.0,
+        'agreement': matched / total if total else 1.0
+    }
+
+
+def compare_classifiers(images, fp32_path=VIT_ONNX_PATH):
+    """Compare FP32 and INT8 forgery classifiers on the same images."""
+    from shared_utils.vit_onnx import OnnxForgeryClassifier
+
+    runs = {}
+    for label, path in (('fp32', fp32_path), ('int8', int8_path(fp32_path))):
+        model = OnnxForgeryClassifier(path)
+        predict = lambda img: model(img)[0]['label']
+        runs[label] = _timed(predict, images)
+
+    (ref, ref_latency), (test, test_latency) = runs['fp32'], runs['int8']
+    agreed = sum(r == t for r, t in zip(ref, test))
+
+    return {
+        'samples': len(images),
+        'fp32_size_mb': _size_mb(fp32_path),
+        'int8_size_mb': _size_mb(int8_path(fp32_path)),
+        'fp32_latency_ms': ref_latency * 1000,
+        'int8_latency_ms': test_latency * 1000,
+        'speedup': ref_latency / test_latency if test_latency else 0.0,
+        'agreement': agreed / len(images) if images else 1.0
+    }
+
+
+def print_report(report):
+    for name, stats in report.items():
+        print(f"\n{name} ({stats['samples']} samples)")
+        print(f"  Size:      {stats['fp32_size_mb']:.1f} MB -> {stats['int8_size_mb']:.1f} MB")
+        print(f"  Latency:   {stats['fp32_latency_ms']:.1f} ms -> {stats['int8_latency_ms']:.1f} ms "
+              f"({stats['speedup']:.2f}x)")
+        print(f"  Agreement: {stats['agreement'] * 100:.1f}%")
+
+
+def run_report(sample_dir, output=None):
+    pages, images = load_samples(sample_dir)
+    report = {}
+
+    if pages and os.path.exists(int8_path(SIG_MODEL_PATH)):
+        report['signature_detector'] = compare_detectors(pages)
+    if images and os.path.exists(int8_path(VIT_ONNX_PATH)):
+        report['forgery_classifier'] = compare_classifiers(images)
+
+    if not report:
+        print("Nothing to compare - build the INT8 models and add samples first")
+        return report
+
+    print_report(report)
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and evaluate INT8 model variants")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('build', help="Quantize the signature detector and forgery classifier")
+
+    report_parser = subparsers.add_parser('report', help="Compare INT8 models against FP32")
+    report_parser.add_argument('--samples', required=True, help="Folder of sample PDFs and images")
+    report_parser.add_argument('--output', help="Optional path for a JSON copy of the report")
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        build_all()
+    else:
+        run_report(args.samples, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""On-disk, content-addressed cache for analysis results.
+
+Entries are keyed by the SHA-256 of the uploaded document plus every
+parameter that affects the result (DPI, ELA settings, model version, ...),
+so the same PDF uploaded again, from any page or session, reuses earlier
+work. Values are pickled one file per entry and written atomically. Reads
+refresh the file's mtime, and writes evict the least recently used entries
+once the directory grows past its size budget. Writes only add to a running
+size estimate; the directory is rescanned when the estimate goes over budget
+and at most once a minute otherwise, to count writes from other processes.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+from shared_utils.model_registry import ROOT_DIR
+
+CACHE_DIR = os.environ.get('STREAMHP_CACHE_DIR', os.path.join(ROOT_DIR, '.cache', 'results'))
+
+# 0 disables the cache
+CACHE_MAX_MB = int(os.environ.get('STREAMHP_CACHE_MAX_MB', 2048))
+
+# Bump when the shape of cached results changes
+CACHE_FORMAT = 1
+
+_SUFFIX = '.pkl'
+
+# Seconds between directory rescans while the size estimate is under budget
+RESCAN_INTERVAL = 60
+
+
+def document_hash(pdf_data):
+    """SHA-256 of an upload given as bytes, a memoryview or a file object"""
+    if hasattr(pdf_data, 'getvalue'):
+        pdf_data = pdf_data.getvalue()
+    elif hasattr(pdf_data, 'read'):
+        pdf_data = pdf_data.read()
+    return hashlib.sha256(pdf_data).hexdigest()
+
+
+def file_version(path):
+    """Cheap version tag for a model file, changes whenever the file is replaced"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return f"{os.path.basename(path)}:missing"
+    return f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def evict_lru(paths, max_bytes):
+    """
+    Delete the least recently touched files until the rest fit in max_bytes.
+
+    Returns:
+        int: Total size in bytes of the files left
+    """
+    entries, total = [], 0
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total += stat.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    return total
+
+
+class DiskBudget:
+    """
+    Running estimate of a cache directory's size, so writes don't rescan it.
+
+    Args:
+        max_bytes (int): Size the directory is evicted down to
+        list_files (callable): Returns the paths of the evictable files
+    """
+
+    def __init__(self, max_bytes, list_files):
+        self.max_bytes = max_bytes
+        self._list_files = list_files
+        self._total = None
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, nbytes):
+        """Count nbytes written, evicting once the estimate is over budget"""
+        with self._lock:
+            stale = time.monotonic() - self._scanned_at > RESCAN_INTERVAL
+            if self._total is None or stale:
+                self._rescan()
+                return
+            self._total += nbytes
+            if self._total > self.max_bytes:
+                self._rescan()
+
+    def evict(self):
+        """Rescan the directory and evict down to the budget"""
+        with self._lock:
+            self._rescan()
+
+    def _rescan(self):
+        self._total = evict_lru(self._list_files(), self.max_bytes)
+        self._scanned_at = time.monotonic()
+
+
+def cache_key(kind, doc_hash, **params):
+    """Key for one kind of result on one document with the given parameters"""
+    payload = json.dumps(
+        {'format': CACHE_FORMAT, 'kind': kind, 'doc': doc_hash, 'params': params},
+        sort_keys=True,
+        default=str
+    )
+    return f"{kind}-{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+class ResultCache:
+    """Pickle files in one directory with LRU eviction by total size."""
+
+    def __init__(self, directory=CACHE_DIR, max_mb=CACHE_MAX_MB):
+        self.directory = directory
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._budget = DiskBudget(self.max_bytes, self._entries)
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default on a miss"""
+        if not self.enabled:
+            return default
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return default
+        except Exception as e:
+            print(f"Discarding unreadable cache entry {key}: {e}")
+            self._remove(path)
+            return default
+
+        # mtime doubles as the last-used time for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        """Store value under key, replacing any previous entry atomically"""
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            self._remove(tmp_path)
+            raise
+        self._budget.add(size)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [e.path for e in os.scandir(self.directory) if e.name.endswith(_SUFFIX)]
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits its budget"""
+        self._budget.evict()
+
+    def clear(self):
+        with self._lock:
+            if os.path.isdir(self.directory):
+                for entry in os.scandir(self.directory):
+                    self._remove(entry.path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the process-wide result cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
@@ -0,0 +1,191 @@
+"""Tiled signature detection for small signatures on large pages.
+
+The detector letterboxes each page down to its input size, so at 200 DPI
+initials end up a few pixels tall. Tiled mode cuts the page into
+overlapping detector-sized tiles instead. Near-white tiles are skipped by
+an ink-density check on a summed-area table, the remaining tiles from all
+pages are batched through the detector, and boxes are mapped back to page
+coordinates and merged across tile edges.
+"""
+
+import os
+from collections import deque
+
+import numpy as np
+
+from shared_utils.detection import DEFAULT_BATCH_SIZE, batch_to_detections, empty_detections, predict_batches
+
+TILE_SIZE = int(os.environ.get('STREAMHP_TILE_SIZE', 640))
+# Fraction of the tile size shared with each neighbour
+TILE_OVERLAP = float(os.environ.get('STREAMHP_TILE_OVERLAP', 0.25))
+# Tiles with less than this fraction of ink pixels are not run through the detector
+TILE_MIN_INK = float(os.environ.get('STREAMHP_TILE_MIN_INK', 0.0005))
+# Darkest channel below this counts as ink
+INK_LEVEL = 200
+# Boxes overlapping by more than this fraction of the smaller one are merged
+MATCH_THRESHOLD = 0.5
+
+
+def tile_origins(height, width, tile_size=TILE_SIZE, overlap=TILE_OVERLAP):
+    """
+    Top-left corners of overlapping tiles covering a page.
+
+    The last row and column are aligned with the page edge, so every tile
+    has the same (tile_h, tile_w) shape.
+
+    Returns:
+        tuple: ((N, 2) array of (y, x) origins, tile_h, tile_w)
+    """
+    tile_h, tile_w = min(tile_size, height), min(tile_size, width)
+    stride = max(int(tile_size * (1 - overlap)), 1)
+
+    def starts(length, size):
+        points = list(range(0, length - size + 1, stride))
+        if points[-1] != length - size:
+            points.append(length - size)
+        return points
+
+    ys, xs = np.meshgrid(starts(height, tile_h), starts(width, tile_w), indexing='ij')
+    return np.stack([ys.ravel(), xs.ravel()], axis=1), tile_h, tile_w
+
+
+def ink_density(pixels, origins, tile_h, tile_w, ink_level=INK_LEVEL):
+    """
+    Fraction of ink pixels in each tile, from one summed-area table.
+
+    Args:
+        pixels (np.ndarray): (H, W, 3) or (H, W) uint8 page
+        origins (np.ndarray): (N, 2) tile origins from tile_origins()
+
+    Returns:
+        np.ndarray: (N,) ink fraction per tile
+    """
+    gray = pixels.min(axis=2) if pixels.ndim == 3 else pixels
+    table = np.zeros((gray.shape[0] + 1, gray.shape[1] + 1), dtype=np.int32)
+    np.cumsum(np.cumsum(gray < ink_level, axis=0, dtype=np.int32), axis=1, out=table[1:, 1:])
+
+    y0, x0 = origins[:, 0], origins[:, 1]
+    y1, x1 = y0 + tile_h, x0 + tile_w
+    counts = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+    return counts / (tile_h * tile_w)
+
+
+def merge_overlapping(boxes, scores, labels, match_threshold=MATCH_THRESHOLD):
+    """
+    Greedy non-maximum merging of boxes from overlapping tiles.
+
+    Boxes are visited by descending score. Each one absorbs every remaining
+    box of the same label that it overlaps by more than match_threshold of
+    the smaller box's area and grows to their union, repeating until nothing
+    else overlaps the union. Plain NMS would keep whichever piece of a
+    signature split by tile edges scored highest.
+
+    Returns:
+        dict: Merged 'boxes', 'scores' and 'labels'
+    """
+    order = np.argsort(-scores, kind='stable')
+    boxes, scores = boxes[order], scores[order]
+    labels = np.asarray(labels, dtype=object)[order]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    used = np.zeros(len(boxes), dtype=bool)
+    merged_boxes, merged_scores, merged_labels = [], [], []
+    for i in range(len(boxes)):
+        if used[i]:
+            continue
+        candidates = ~used & (labels == labels[i])
+        merged = boxes[i].copy()
+        used[i] = True
+        while True:
+            inter_w = np.clip(np.minimum(merged[2], boxes[:, 2]) - np.maximum(merged[0], boxes[:, 0]), 0, None)
+            inter_h = np.clip(np.minimum(merged[3], boxes[:, 3]) - np.maximum(merged[1], boxes[:, 1]), 0, None)
+            merged_area = (merged[2] - merged[0]) * (merged[3] - merged[1])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                overlap = inter_w * inter_h / np.minimum(merged_area, areas)
+            group = candidates & ~used & (overlap > match_threshold)
+            if not group.any():
+                break
+            used |= group
+            members = boxes[group]
+            merged = np.array([
+                min(merged[0], members[:, 0].min()), min(merged[1], members[:, 1].min()),
+                max(merged[2], members[:, 2].max()), max(merged[3], members[:, 3].max())
+            ], dtype=boxes.dtype)
+
+        merged_boxes.append(merged)
+        merged_scores.append(scores[i])
+        merged_labels.append(labels[i])
+
+    return {
+        'boxes': np.array(merged_boxes, dtype=np.float32).reshape(-1, 4),
+        'scores': np.array(merged_scores, dtype=np.float32),
+        'labels': merged_labels
+    }
+
+
+def detect_tiled(model, pages, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, min_ink=TILE_MIN_INK,
+                 batch_size=DEFAULT_BATCH_SIZE, skip=()):
+    """
+    Detect signatures tile by tile and merge them back into page coordinates.
+
+    Tiles from consecutive pages share inference batches. A page is yielded
+    once all of its tiles are through the detector.
+
+    Args:
+        model: Ultralytics YOLO model
+        pages (iterable): RGB page images (PIL or numpy), consumed lazily
+        tile_size (int): Tile edge in pixels, normally the detector input size
+        overlap (float): Fraction of tile_size shared with each neighbour
+        min_ink (float): Tiles with a smaller ink fraction are skipped
+        skip (set): 0-based pages to pass through without detection
+
+    Yields:
+        tuple: (page_num, image, detections) for each page in order, with
+            detections as returned by result_to_detections()
+    """
+    open_pages = deque()
+    tile_owners = deque()
+
+    def tiles():
+        for page_num, img in enumerate(pages):
+            if page_num in skip:
+                open_pages.append({'page_num': page_num, 'image': img, 'remaining': 0, 'skipped': True})
+                continue
+            pixels = np.asarray(img)
+            origins, tile_h, tile_w = tile_origins(pixels.shape[0], pixels.shape[1], tile_size, overlap)
+            origins = origins[ink_density(pixels, origins, tile_h, tile_w) >= min_ink]
+
+            page = {'page_num': page_num, 'image': img, 'remaining': len(origins), 'found': []}
+            open_pages.append(page)
+            for y, x in origins:
+                tile_owners.append((page, x, y))
+                # Ultralytics reads arrays as BGR
+                yield np.ascontiguousarray(pixels[y:y + tile_h, x:x + tile_w, ::-1])
+
+    def finished():
+        while open_pages and open_pages[0]['remaining'] == 0:
+            page = open_pages.popleft()
+            found = page.get('found')
+            if page.get('skipped'):
+                detections = empty_detections(skipped=True)
+            elif found:
+                detections = merge_overlapping(
+                    np.concatenate([d['boxes'] for d in found]),
+                    np.concatenate([d['scores'] for d in found]),
+                    [label for d in found for label in d['labels']]
+                )
+            else:
+                detections = empty_detections()
+            yield page['page_num'], page['image'], detections
+
+    for _, results in predict_batches(model, tiles(), batch_size=batch_size, unit='tiles'):
+        for detections in batch_to_detections(results):
+            page, x, y = tile_owners.popleft()
+            page['remaining'] -= 1
+            if len(detections['labels']):
+                detections['boxes'] = detections['boxes'] + np.array([x, y, x, y], dtype=np.float32)
+                page['found'].append(detections)
+        yield from finished()
+
+    # Pages with no inked tiles after the last batch
+    yield from finished()
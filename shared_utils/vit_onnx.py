@@ -0,0 +1,147 @@
+"""ONNX export and runtime for the ViT forgery classifier.
+
+The runtime side only needs NumPy, Pillow and onnxruntime, so CPU-only
+workers can score signatures without importing torch or transformers.
+Export with:
+
+    python -m shared_utils.vit_onnx --output models/vitmodel/model.onnx
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+from shared_utils.model_registry import (
+    FORGERY_MODEL_ID,
+    VIT_MODEL_DIR,
+    VIT_ONNX_PATH,
+    has_local_weights
+)
+
+
+def load_json_config(model_dir, filename):
+    with open(os.path.join(model_dir, filename)) as f:
+        return json.load(f)
+
+
+def preprocess_images(images, processor_config):
+    """
+    NumPy port of the ViTImageProcessor steps in preprocessor_config.json.
+
+    Args:
+        images (list): PIL images to score
+        processor_config (dict): Parsed preprocessor_config.json
+
+    Returns:
+        np.ndarray: float32 batch of shape (N, 3, height, width)
+    """
+    size = processor_config['size']
+    height, width = size['height'], size['width']
+    mean = np.asarray(processor_config['image_mean'], dtype=np.float32).reshape(1, 1, 3)
+    std = np.asarray(processor_config['image_std'], dtype=np.float32).reshape(1, 1, 3)
+
+    batch = np.empty((len(images), 3, height, width), dtype=np.float32)
+    for i, image in enumerate(images):
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        if processor_config.get('do_resize', True):
+            image = image.resize((width, height), resample=processor_config.get('resample', 2))
+
+        pixels = np.asarray(image, dtype=np.float32)
+        if processor_config.get('do_rescale', True):
+            pixels *= processor_config['rescale_factor']
+        if processor_config.get('do_normalize', True):
+            pixels -= mean
+            pixels /= std
+
+        batch[i] = pixels.transpose(2, 0, 1)
+
+    return batch
+
+
+def _softmax(logits):
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+class OnnxForgeryClassifier:
+    """Drop-in replacement for the transformers image-classification pipeline."""
+
+    def __init__(self, model_path=VIT_ONNX_PATH, model_dir=VIT_MODEL_DIR, providers=None):
+        import onnxruntime as ort
+
+        self.model_path = model_path
+        self.processor_config = load_json_config(model_dir, 'preprocessor_config.json')
+        model_config = load_json_config(model_dir, 'config.json')
+        self.id2label = {int(k): v for k, v in model_config['id2label'].items()}
+
+        self.session = ort.InferenceSession(
+            model_path,
+            providers=providers or ['CPUExecutionProvider']
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict_proba(self, images):
+        """Return an (N, num_labels) array of class probabilities."""
+        pixel_values = preprocess_images(images, self.processor_config)
+        logits = self.session.run(None, {self.input_name: pixel_values})[0]
+        return _softmax(logits)
+
+    def __call__(self, images):
+        """Score one image or a list of images, pipeline-style."""
+        single = isinstance(images, Image.Image)
+        probs = self.predict_proba([images] if single else list(images))
+
+        results = []
+        for row in probs:
+            order = np.argsort(row)[::-1]
+            results.append([
+                {'label': self.id2label[int(i)], 'score': float(row[i])}
+                for i in order
+            ])
+        return results[0] if single else results
+
+
+def export_vit_onnx(output_path=VIT_ONNX_PATH, model_dir=VIT_MODEL_DIR, opset=17):
+    """Export the ViTForImageClassification model to ONNX with a dynamic batch axis."""
+    import torch
+    from transformers import ViTForImageClassification
+
+    if has_local_weights(model_dir):
+        model = ViTForImageClassification.from_pretrained(model_dir)
+    else:
+        model = ViTForImageClassification.from_pretrained(FORGERY_MODEL_ID)
+    model.eval()
+
+    size = load_json_config(model_dir, 'preprocessor_config.json')['size']
+    dummy = torch.zeros(1, 3, size['height'], size['width'])
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy,),
+            output_path,
+            input_names=['pixel_values'],
+            output_names=['logits'],
+            dynamic_axes={'pixel_values': {0: 'batch'}, 'logits': {0: 'batch'}},
+            opset_version=opset
+        )
+    print(f"Exported ViT forgery classifier to {output_path}")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the ViT forgery classifier to ONNX")
+    parser.add_argument('--output', default=VIT_ONNX_PATH)
+    parser.add_argument('--model-dir', default=VIT_MODEL_DIR)
+    parser.add_argument('--opset', type=int, default=17)
+    args = parser.parse_args()
+
+    export_vit_onnx(args.output, args.model_dir, args.opset)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import json
+import os
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pymupdf
+
+import shared_utils.batch as batch
+
+
+class CrashingPool:
+    """Runs documents in-process, a path containing 'crash' breaks the pool"""
+
+    created = 0
+
+    def __init__(self, max_workers=None, mp_context=None):
+        CrashingPool.created += 1
+
+    def submit(self, fn, path, *args):
+        future = Future()
+        if 'crash' in os.path.basename(path):
+            future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        else:
+            future.set_result(fn(path, *args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def write_pdfs(folder, names):
+    for name in names:
+        doc = pymupdf.open()
+        doc.new_page().insert_text((72, 72), name)
+        doc.save(str(folder / name))
+
+
+def read_records(output):
+    with open(output / batch.RESULTS_FILE) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_worker_crash_is_recorded_and_the_run_continues(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, 'ProcessPoolExecutor', CrashingPool)
+    CrashingPool.created = 0
+    inputs, output = tmp_path / 'in', tmp_path / 'out'
+    inputs.mkdir()
+    write_pdfs(inputs, ['a.pdf', 'b_crash.pdf', 'c.pdf', 'd.pdf'])
+
+    counts = batch.run_batch([str(inputs)], str(output), tasks=('versions',), workers=1)
+
+    assert counts == {'processed': 4, 'failed': 1, 'skipped': 0}
+    assert CrashingPool.created == 2
+    statuses = {record['path'].rsplit('/', 1)[-1]: record['status'] for record in read_records(output)}
+    assert statuses == {'a.pdf': 'ok', 'b_crash.pdf': 'error', 'c.pdf': 'ok', 'd.pdf': 'ok'}
+
+    # Only the crashed document is retried on the next run
+    counts = batch.run_batch([str(inputs)], str(output), tasks=('versions',), workers=1)
+    assert counts == {'processed': 1, 'failed': 1, 'skipped': 3}
+
+
+def test_ela_matches_the_shared_analysis(tmp_path):
+    from shared_utils.image_utils import ModdedDocAnalyzer
+
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), "Text")
+    doc.new_page()
+    doc.save(str(tmp_path / 'ela.pdf'))
+    with open(tmp_path / 'ela.pdf', 'rb') as f:
+        pdf_data = f.read()
+
+    record = batch.process_document(str(tmp_path / 'ela.pdf'), ('ela',), ela_dpi=72)
+    expected = ModdedDocAnalyzer().analyze_pdf(pdf_data, dpi=72, workers=1, use_cache=False)
+
+    assert record['status'] == 'ok'
+    assert record['ela']['skipped_pages'] == expected['summary']['skipped_pages'] == [2]
+    assert [page['page'] for page in record['ela']['pages']] == [1]
+    assert record['ela']['pages'][0]['areas'] == expected['pages'][0]['areas']
@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from shared_utils.detection import batch_to_detections
+
+NAMES = {0: 'signature', 1: 'initials'}
+
+
+def fake_result(rows):
+    """Stand-in for an Ultralytics result whose Boxes.data is an (n, 6) array"""
+    data = np.array(rows, dtype=np.float32).reshape(-1, 6)
+    return SimpleNamespace(boxes=SimpleNamespace(data=data), names=NAMES)
+
+
+def test_splits_batch_back_into_pages():
+    results = [
+        fake_result([[0, 0, 10, 10, 0.9, 0], [5, 5, 20, 20, 0.8, 1]]),
+        fake_result([]),
+        fake_result([[1, 2, 3, 4, 0.5, 0]])
+    ]
+
+    detections = batch_to_detections(results)
+
+    assert len(detections) == 3
+    np.testing.assert_array_equal(detections[0]['boxes'], [[0, 0, 10, 10], [5, 5, 20, 20]])
+    np.testing.assert_allclose(detections[0]['scores'], [0.9, 0.8])
+    assert detections[0]['labels'] == ['signature', 'initials']
+
+    assert detections[1]['boxes'].shape == (0, 4)
+    assert detections[1]['scores'].shape == (0,)
+    assert detections[1]['labels'] == []
+
+    np.testing.assert_array_equal(detections[2]['boxes'], [[1, 2, 3, 4]])
+    assert detections[2]['labels'] == ['signature']
+
+
+def test_empty_batch():
+    assert batch_to_detections([]) == []
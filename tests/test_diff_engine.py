@@ -0,0 +1,151 @@
+import difflib
+import random
+
+import pytest
+
+from shared_utils.diff_engine import DIFF_ENGINES, _myers_region, _opcodes, diff_ids, diff_texts, intern_lines
+
+ENGINES = sorted(DIFF_ENGINES)
+
+
+def apply_hunks(old_lines, hunks):
+    """Rebuild the new version from the old one and a diff's hunks"""
+    out, pos = [], 0
+    for hunk in hunks:
+        start = hunk['old_start'] - 1 if hunk['old_count'] else hunk['old_start']
+        out.extend(old_lines[pos:start])
+        pos = start
+        for line in hunk['lines'][1:]:
+            if line[0] in ' -':
+                pos += 1
+            if line[0] in ' +':
+                out.append(line[1:])
+    return out + old_lines[pos:]
+
+
+def apply_opcodes(a, b, opcodes):
+    out = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        out.extend(a[i1:i2] if tag == 'equal' else b[j1:j2])
+    return out
+
+
+def random_versions(rng, lines, vocabulary, edits):
+    words = [f"line {i}" for i in range(vocabulary)]
+    old = [rng.choice(words) for _ in range(lines)]
+    new = list(old)
+    for _ in range(edits):
+        pos = rng.randrange(len(new) + 1)
+        op = rng.choice(('insert', 'delete', 'replace'))
+        if op == 'insert' or not new:
+            new.insert(pos, rng.choice(words))
+        elif op == 'delete':
+            del new[min(pos, len(new) - 1)]
+        else:
+            new[min(pos, len(new) - 1)] = f"edited {rng.random()}"
+    return old, new
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_single_edit_is_one_hunk(engine):
+    old = [f"line {i}" for i in range(20)]
+    new = list(old)
+    new[10] = "changed"
+
+    diff = diff_texts('\n'.join(old), '\n'.join(new), engine=engine)
+
+    assert len(diff['hunks']) == 1
+    hunk = diff['hunks'][0]
+    assert (hunk['old_start'], hunk['old_count'], hunk['new_start'], hunk['new_count']) == (8, 7, 8, 7)
+    assert (diff['additions'], diff['removals']) == (1, 1)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_distant_edits_are_separate_hunks(engine):
+    old = [f"line {i}" for i in range(40)]
+    new = old[:5] + ["inserted"] + old[5:30] + old[31:]
+
+    diff = diff_texts('\n'.join(old), '\n'.join(new), engine=engine)
+
+    assert len(diff['hunks']) == 2
+    assert (diff['additions'], diff['removals']) == (1, 1)
+
+
+def test_unified_lines_match_difflib():
+    old = [f"line {i}" for i in range(30)]
+    new = old[:3] + ["new a", "new b"] + old[4:20] + old[22:]
+
+    diff = diff_texts('\n'.join(old), '\n'.join(new), fromfile='v1', tofile='v2', engine='difflib')
+
+    assert diff['lines'] == list(difflib.unified_diff(old, new, 'v1', 'v2', lineterm=''))
+
+
+def test_identical_texts_have_no_hunks():
+    diff = diff_texts("a\nb\n", "a\nb\n")
+
+    assert diff == {'hunks': [], 'additions': 0, 'removals': 0, 'lines': []}
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('seed', range(5))
+def test_random_edits_reconstruct(engine, seed):
+    rng = random.Random(seed)
+    old, new = random_versions(rng, lines=300, vocabulary=20, edits=40)
+
+    a, b = intern_lines(old, new)
+    assert apply_opcodes(old, new, diff_ids(a, b, engine=engine)) == new
+
+    diff = diff_texts('\n'.join(old), '\n'.join(new), engine=engine)
+    assert apply_hunks(old, diff['hunks']) == new
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_hunk_counts_match_difflib_on_small_edits(engine):
+    rng = random.Random(7)
+    old = [f"unique {i}" for i in range(200)]
+    new = list(old)
+    for pos in sorted(rng.sample(range(200), 5), reverse=True):
+        new[pos] = f"edited {pos}"
+
+    diff = diff_texts('\n'.join(old), '\n'.join(new), engine=engine)
+    expected = sum(1 for line in difflib.unified_diff(old, new, lineterm='') if line.startswith('@@'))
+
+    assert len(diff['hunks']) == expected
+    assert (diff['additions'], diff['removals']) == (5, 5)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_paged_diff_reconstructs(engine):
+    rng = random.Random(3)
+    prev_pages = [''.join(f"p{p} line {rng.randrange(10)}\n" for _ in range(30)) for p in range(12)]
+    curr_pages = list(prev_pages)
+    curr_pages[2] = prev_pages[2].replace('line 1', 'line one')
+    curr_pages[3] = prev_pages[3].replace('line 2', 'line two')
+    curr_pages.insert(8, "a new page\n")
+    del curr_pages[10]
+
+    prev_text, curr_text = ''.join(prev_pages), ''.join(curr_pages)
+    diff = diff_texts(prev_text, curr_text, engine=engine, prev_pages=prev_pages, curr_pages=curr_pages)
+
+    assert apply_hunks(prev_text.splitlines(), diff['hunks']) == curr_text.splitlines()
+
+
+@pytest.mark.parametrize('engine', ['myers', 'patience'])
+def test_rewritten_text_is_one_replace(engine):
+    old = [f"old {i}" for i in range(3000)]
+    new = [f"new {i}" for i in range(3000)]
+
+    a, b = intern_lines(old, new)
+
+    assert diff_ids(a, b, engine=engine) == [('replace', 0, 3000, 0, 3000)]
+
+
+def test_edit_cost_cap_falls_back_and_still_reconstructs():
+    rng = random.Random(11)
+    old, new = random_versions(rng, lines=400, vocabulary=15, edits=150)
+    a, b = intern_lines(old, new)
+
+    matches = []
+    _myers_region(a, b, 0, len(a), 0, len(b), matches, max_cost=10)
+
+    assert apply_opcodes(old, new, _opcodes([m for m in matches if m[2]], len(a), len(b))) == new
@@ -0,0 +1,72 @@
+import io
+
+import numpy as np
+import pymupdf
+import pytest
+from PIL import Image
+
+from shared_utils.convert_pdf import render_page
+from shared_utils.ela import ElaEngine
+from shared_utils.image_utils import ModdedDocAnalyzer
+
+pytest.importorskip('skimage')
+
+
+def run_chain(analyzer, img):
+    """The PIL/scikit-image chain ModdedDocAnalyzer ran before ElaEngine"""
+    ela_image = analyzer.convert_to_ela_image(img, quality=90)
+    deviation = analyzer.highlight_deviations(ela_image, threshold=20)
+    suspicious_areas, _ = analyzer.detect_highlighted_areas(ela_image)
+    return suspicious_areas, np.asarray(deviation)
+
+
+def text_page():
+    doc = pymupdf.open()
+    page = doc.new_page(width=300, height=400)
+    page.insert_text((30, 60), "Payment of $1,000 received", fontsize=12)
+    page.draw_rect(pymupdf.Rect(30, 100, 270, 160), color=(0, 0, 0.6), fill=(0.9, 0.9, 1))
+    return render_page(page, dpi=100, as_array=True)
+
+
+def spliced_page(seed):
+    """Smooth background with a noisy, differently compressed patch pasted in"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:240, 0:320]
+    img = np.stack([(x * 0.5) % 256, (y * 0.7) % 256, np.full_like(x, 200)], axis=-1).astype(np.uint8)
+
+    patch = Image.fromarray(rng.integers(0, 256, (60, 80, 3), dtype=np.uint8))
+    buffer = io.BytesIO()
+    patch.save(buffer, format='JPEG', quality=40)
+    img[100:160, 150:230] = np.asarray(Image.open(buffer))
+    return img
+
+
+@pytest.mark.parametrize('make_page', [text_page, lambda: spliced_page(0), lambda: spliced_page(1)],
+                         ids=['text', 'spliced-0', 'spliced-1'])
+def test_engine_matches_original_chain(make_page):
+    img = make_page()
+    analyzer = ModdedDocAnalyzer()
+
+    chain_areas, chain_deviation = run_chain(analyzer, img)
+    result = ElaEngine(lower_bound=analyzer.lower_bound, upper_bound=analyzer.upper_bound).analyze(
+        img, keep_ela=True
+    )
+
+    assert result['suspicious_areas'] == chain_areas
+    np.testing.assert_array_equal(result['deviation_mask'], chain_deviation)
+    np.testing.assert_array_equal(result['ela'], np.asarray(analyzer.convert_to_ela_image(img)))
+
+
+def test_spliced_patch_is_flagged():
+    result = ElaEngine().analyze(spliced_page(0))
+
+    assert result['suspicious_areas']
+    x, y, w, h = max(zip(result['areas'], result['suspicious_areas']))[1]
+    assert x < 230 and x + w > 150 and y < 160 and y + h > 100
+
+
+def test_pil_and_array_inputs_agree():
+    img = spliced_page(2)
+    engine = ElaEngine()
+
+    assert engine.analyze(Image.fromarray(img))['suspicious_areas'] == engine.analyze(img)['suspicious_areas']
@@ -0,0 +1,165 @@
+import io
+
+import pymupdf
+import pytest
+
+import shared_utils.result_cache as result_cache
+from shared_utils.extract_versions import (
+    PdfVersionIndex,
+    _changed_pages,
+    analyze_pdf_versions,
+    extract_revision_texts,
+    extract_text_from_pdf_data,
+    parse_xref_objects
+)
+
+
+def save_update(path, edit):
+    """Apply edit to the PDF at path and append it as an incremental update"""
+    with pymupdf.open(path) as doc:
+        edit(doc)
+        doc.saveIncr()
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def full_texts(index):
+    return [extract_text_from_pdf_data(version) for version in index]
+
+
+def saved_versions(path, texts, **save_options):
+    """Save a one-page PDF, then append one incremental update per further text"""
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), texts[0])
+    doc.save(path, **save_options)
+    for i, text in enumerate(texts[1:], 1):
+        data = save_update(path, lambda d: d[0].insert_text((72, 72 + 20 * i), text))
+    return data
+
+
+@pytest.mark.parametrize('save_options', [{}, {'use_objstms': True}], ids=['xref-table', 'xref-stream'])
+def test_index_finds_every_version(tmp_path, save_options):
+    data = saved_versions(str(tmp_path / 'versions.pdf'), ['one', 'two', 'three'], **save_options)
+
+    index = PdfVersionIndex(data)
+
+    assert len(index) == 3
+    assert index[-1] == data.rstrip()
+    assert [bytes(index.view(i)) for i in range(3)] == list(index)
+    assert [text.split() for text in full_texts(index)] == [['one'], ['one', 'two'], ['one', 'two', 'three']]
+    for (_, xref_offset, _), version in zip(index.entries[1:], list(index)[1:]):
+        # Each update rewrites the page and adds its new content stream
+        with pymupdf.open(stream=version) as doc:
+            assert doc[0].xref in parse_xref_objects(index.data, xref_offset)
+
+
+def test_index_accepts_file_objects_and_cached_entries(tmp_path):
+    data = saved_versions(str(tmp_path / 'versions.pdf'), ['one', 'two'])
+    index = PdfVersionIndex(io.BytesIO(data))
+
+    reused = PdfVersionIndex(data, entries=[list(entry) for entry in index.entries])
+
+    assert reused.entries == index.entries == PdfVersionIndex(io.BufferedReader(io.BytesIO(data))).entries
+    assert list(reused) == list(index)
+
+
+def test_index_ignores_markers_inside_streams():
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), "Body")
+    xref = doc.get_new_xref()
+    doc.update_object(xref, "<<>>")
+    doc.update_stream(xref, b"startxref\n123\n%%EOF\n", compress=0)
+    data = doc.tobytes()
+
+    assert data.count(b'%%EOF') == 2
+    assert len(PdfVersionIndex(data)) == 1
+
+
+def test_font_inherited_from_page_tree_is_tracked(tmp_path):
+    path = str(tmp_path / 'inherited.pdf')
+    doc = pymupdf.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Hello")
+    # Move the page's resources up to its /Pages parent
+    parent = int(doc.xref_get_key(page.xref, 'Parent')[1].split()[0])
+    doc.xref_set_key(parent, 'Resources', doc.xref_get_key(page.xref, 'Resources')[1])
+    doc.xref_set_key(page.xref, 'Resources', 'null')
+    font_xref = page.get_fonts()[0][0]
+    doc.save(path)
+
+    # The update rewrites only the font, reachable through the parent's /Resources
+    data = save_update(path, lambda d: d.xref_set_key(
+        font_xref, 'Encoding', '<</Type/Encoding/BaseEncoding/WinAnsiEncoding/Differences[72/A 101/x]>>'
+    ))
+    index = PdfVersionIndex(data)
+
+    assert parse_xref_objects(index.data, index.entries[1][1]) == {font_xref}
+    assert extract_revision_texts(index)[0] == full_texts(index) == ['Hello\n', 'Axllo\n']
+
+
+def test_links_between_pages_dont_mark_every_page(tmp_path):
+    path = str(tmp_path / 'linked.pdf')
+    doc = pymupdf.open()
+    pages = 40
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"Page {i}")
+    for i in range(pages):
+        doc[i].insert_link({'kind': pymupdf.LINK_GOTO, 'from': pymupdf.Rect(10, 10, 50, 50),
+                            'page': (i + 1) % pages})
+    doc.set_toc([[1, f"Page {i}", i + 1] for i in range(pages)])
+    doc.save(path)
+
+    data = save_update(path, lambda d: d[5].insert_text((72, 200), "Added"))
+    index = PdfVersionIndex(data)
+    touched = parse_xref_objects(index.data, index.entries[1][1])
+
+    with pymupdf.open(stream=data) as latest:
+        assert _changed_pages(latest, touched) == {5}
+    texts = extract_revision_texts(index)[0]
+    assert texts == full_texts(index)
+    assert 'Added' in texts[1] and 'Added' not in texts[0]
+
+
+def test_unparseable_update_rereads_every_page():
+    doc = pymupdf.open()
+    for _ in range(3):
+        doc.new_page()
+
+    assert _changed_pages(doc, None) == {0, 1, 2}
+
+
+def test_cache_hit_skips_the_scan(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, '_cache', result_cache.ResultCache(str(tmp_path / 'cache')))
+    path = str(tmp_path / 'cached.pdf')
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), "First")
+    doc.save(path)
+    data = save_update(path, lambda d: d[0].insert_text((72, 144), "Second"))
+
+    first = analyze_pdf_versions(data)
+    monkeypatch.setattr(PdfVersionIndex, '_scan', staticmethod(lambda data: pytest.fail("index rescanned")))
+    second = analyze_pdf_versions(data)
+
+    assert second['texts'] == first['texts']
+    assert second['versions'].entries == first['versions'].entries
+    assert second['versions'][0] == first['versions'][0]
+
+
+@pytest.mark.parametrize('save_options', [{}, {'use_objstms': True}], ids=['xref-table', 'xref-stream'])
+def test_revision_texts_reread_only_edited_pages(tmp_path, save_options):
+    path = str(tmp_path / 'pages.pdf')
+    doc = pymupdf.open()
+    for i in range(4):
+        doc.new_page().insert_text((72, 72), f"Page {i}")
+    doc.save(path, **save_options)
+    save_update(path, lambda d: d[2].insert_text((72, 144), "Edited"))
+    data = save_update(path, lambda d: d.new_page().insert_text((72, 72), "Appended"))
+    index = PdfVersionIndex(data)
+
+    with pymupdf.open(stream=index[1]) as version:
+        assert _changed_pages(version, parse_xref_objects(index.data, index.entries[1][1])) == {2}
+
+    texts, page_texts = extract_revision_texts(index)
+    assert texts == full_texts(index)
+    assert [len(pages) for pages in page_texts] == [4, 4, 5]
+    assert page_texts[1][2] == 'Page 2\nEdited\n' and page_texts[2][4] == 'Appended\n'
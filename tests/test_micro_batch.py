@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from shared_utils.micro_batch import MicroBatcher
+
+
+def test_results_follow_submission_order():
+    batches = []
+
+    def batch_fn(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=50)
+    try:
+        futures = [batcher.submit(i) for i in range(10)]
+        assert [f.result(timeout=5) for f in futures] == [i * 10 for i in range(10)]
+    finally:
+        batcher.close()
+
+    assert [item for batch in batches for item in batch] == list(range(10))
+    assert max(len(batch) for batch in batches) <= 4
+    assert batcher.items == 10
+
+
+def test_concurrent_callers_get_their_own_results():
+    batcher = MicroBatcher(lambda items: [-item for item in items], max_batch_size=8, max_wait_ms=20)
+    results = {}
+
+    def call(i):
+        results[i] = batcher(i)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(16)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+    finally:
+        batcher.close()
+
+    assert results == {i: -i for i in range(16)}
+
+
+def test_batch_error_reaches_every_caller():
+    def batch_fn(items):
+        if 'bad' in items:
+            raise ValueError('bad item')
+        return items
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+    try:
+        futures = [batcher.submit(item) for item in ('a', 'bad', 'c')]
+        for future in futures:
+            with pytest.raises(ValueError, match='bad item'):
+                future.result(timeout=5)
+        # The scheduler keeps serving after a failed batch
+        assert batcher('ok') == 'ok'
+    finally:
+        batcher.close()
+
+
+def test_result_count_mismatch_is_an_error():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=1)
+    try:
+        with pytest.raises(RuntimeError, match='0 results for 1 items'):
+            batcher('x')
+    finally:
+        batcher.close()
+
+
+def test_cancelled_request_does_not_stop_the_scheduler():
+    started, release = threading.Event(), threading.Event()
+
+    def batch_fn(items):
+        started.set()
+        release.wait(timeout=5)
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=1, max_wait_ms=0)
+    try:
+        first = batcher.submit('a')
+        assert started.wait(timeout=5)
+        # Still queued behind the running batch, so it can be cancelled
+        cancelled = batcher.submit('b')
+        assert cancelled.cancel()
+        later = batcher.submit('c')
+        release.set()
+
+        assert first.result(timeout=5) == 'A'
+        assert later.result(timeout=5) == 'C'
+        assert batcher('d') == 'D'
+        assert cancelled.cancelled()
+        assert batcher.items == 3
+    finally:
+        batcher.close()
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pymupdf
+import pytest
+
+from shared_utils.convert_pdf import render_page
+import shared_utils.page_cache
+import shared_utils.result_cache
+from shared_utils.image_utils import ModdedDocAnalyzer
+from shared_utils.page_cache import PageCache, page_size
+from shared_utils.result_cache import ResultCache, document_hash
+
+
+@pytest.fixture
+def page():
+    doc = pymupdf.open()
+    page = doc.new_page(width=200, height=300)
+    page.insert_text((20, 40), "Cached page")
+    yield page
+    doc.close()
+
+
+def page_files(cache, doc_hash='doc'):
+    return sorted(os.listdir(os.path.join(cache.directory, doc_hash)))
+
+
+def test_put_then_get_at_the_same_dpi(tmp_path, page):
+    cache = PageCache(str(tmp_path), max_mb=64)
+    rendered = render_page(page, dpi=100, as_array=True)
+
+    stored = cache.put('doc', page.number, 100, rendered)
+    loaded = cache.get('doc', page, 100)
+
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(stored, rendered)
+    np.testing.assert_array_equal(loaded, rendered)
+    assert cache.has('doc', page.number, 100)
+
+
+def test_lower_dpi_is_downscaled_and_higher_dpi_misses(tmp_path, page):
+    cache = PageCache(str(tmp_path), max_mb=64)
+    cache.put('doc', page.number, 150, render_page(page, dpi=150, as_array=True))
+
+    small = cache.get('doc', page, 72)
+    assert small.shape == (*page_size(page, 72)[::-1], 3)
+    # Close to a direct render, not identical
+    direct = render_page(page, dpi=72, as_array=True)
+    assert np.abs(small.astype(int) - direct).mean() < 10
+
+    gray = cache.get('doc', page, 72, grayscale=True)
+    assert gray.shape == (*page_size(page, 72)[::-1], 1)
+
+    assert cache.get('doc', page, 200) is None
+    assert not cache.has('doc', page.number, 200)
+
+
+def test_higher_dpi_replaces_lower_copy(tmp_path, page):
+    cache = PageCache(str(tmp_path), max_mb=64)
+    cache.fetch('doc', page, 100)
+    cache.fetch('doc', page, 150)
+
+    assert page_files(cache) == ['p0-150dpi.npy']
+    assert cache.has('doc', page.number, 100)
+
+
+def test_eviction_keeps_most_recently_used_pages(tmp_path):
+    cache = PageCache(str(tmp_path), max_mb=1)
+    for index in range(6):
+        cache.put('doc', index, 72, np.full((300, 300, 3), index, dtype=np.uint8))
+
+    files = page_files(cache)
+    assert sum(os.path.getsize(os.path.join(tmp_path, 'doc', f)) for f in files) <= 1024 * 1024
+    assert 'p5-72dpi.npy' in files and 'p0-72dpi.npy' not in files
+
+
+def test_disabled_cache_stores_nothing(tmp_path, page):
+    cache = PageCache(str(tmp_path), max_mb=0)
+    rendered = render_page(page, dpi=72, as_array=True)
+
+    assert cache.put('doc', page.number, 72, rendered) is rendered
+    assert cache.get('doc', page, 72) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_ela_render_serves_lower_dpi_requests(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path / 'pages'), max_mb=64)
+    monkeypatch.setattr(shared_utils.page_cache, '_cache', cache)
+    monkeypatch.setattr(shared_utils.result_cache, '_cache', ResultCache(str(tmp_path / 'results'), max_mb=64))
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), "Contract")
+    pdf = doc.tobytes()
+
+    ModdedDocAnalyzer().analyze_pdf(pdf, dpi=150, workers=1)
+
+    assert cache.has(document_hash(pdf), 0, 150)
+    assert cache.has(document_hash(pdf), 0, 100)
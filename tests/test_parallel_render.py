@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pymupdf
+import pytest
+
+from shared_utils.convert_pdf import iter_pdf_pages, render_page
+from shared_utils.parallel_render import MIN_PAGES_FOR_POOL, iter_pdf_pages_parallel, map_pages
+
+PAGES = MIN_PAGES_FOR_POOL + 4
+SHM_DIR = '/dev/shm'
+
+
+@pytest.fixture(scope='module')
+def pdf():
+    """Pages that render differently, so any reordering shows"""
+    doc = pymupdf.open()
+    for i in range(PAGES):
+        page = doc.new_page()
+        page.draw_rect(pymupdf.Rect(20, 20 + 40 * i, 200, 50 + 40 * i), color=(0, 0, 0), fill=(0, 0, 0))
+    return doc.tobytes()
+
+
+def shared_blocks():
+    """Shared-memory blocks, minus the pool's own semaphores"""
+    if not os.path.isdir(SHM_DIR):
+        return set()
+    return {name for name in os.listdir(SHM_DIR) if not name.startswith('sem.')}
+
+
+def assert_pages_equal(pages, expected):
+    assert len(pages) == len(expected)
+    for page, want in zip(pages, expected):
+        np.testing.assert_array_equal(np.asarray(page), np.asarray(want))
+
+
+@pytest.mark.parametrize('memory_budget_mb', [None, 1], ids=['default', 'one-page-window'])
+def test_parallel_pages_match_serial_order(pdf, memory_budget_mb):
+    serial = list(iter_pdf_pages(pdf, dpi=30, as_array=True))
+
+    pages = list(iter_pdf_pages_parallel(pdf, dpi=30, as_array=True, workers=2,
+                                         memory_budget_mb=memory_budget_mb))
+
+    assert_pages_equal(pages, serial)
+
+
+def test_parallel_page_range_and_pil_output(pdf):
+    serial = list(iter_pdf_pages(pdf, dpi=30, first_page=2, last_page=PAGES - 1))
+
+    pages = list(iter_pdf_pages_parallel(pdf, dpi=30, first_page=2, last_page=PAGES - 1, workers=2))
+
+    assert all(page.mode == 'RGB' for page in pages)
+    assert_pages_equal(pages, serial)
+
+
+def test_closing_parallel_pages_early_releases_shared_memory(pdf):
+    before = shared_blocks()
+
+    pages = iter_pdf_pages_parallel(pdf, dpi=30, as_array=True, workers=2, memory_budget_mb=1)
+    first = [next(pages) for _ in range(3)]
+    pages.close()
+    del first
+
+    assert shared_blocks() <= before
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_map_pages_keeps_page_indices_order(pdf, workers):
+    indices = [5, 0, PAGES - 1, 2, 7, 1]
+
+    results = list(map_pages(pdf, indices, render_page, (30,), workers=workers))
+
+    with pymupdf.open(stream=pdf) as doc:
+        assert_pages_equal(results, [render_page(doc[i], dpi=30) for i in indices])
+
+
+def test_closing_map_pages_early_leaves_the_pool_usable(pdf):
+    before = shared_blocks()
+
+    results = map_pages(pdf, range(PAGES), render_page, (30,), workers=2)
+    next(results)
+    results.close()
+
+    assert shared_blocks() <= before
+    assert len(list(map_pages(pdf, range(PAGES), render_page, (30,), workers=2))) == PAGES
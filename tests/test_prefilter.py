@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pymupdf
+
+from shared_utils.detection import detect_kept_pages
+from shared_utils.prefilter import find_blank_pages, find_empty_pages, ink_stats
+
+
+def make_pdf():
+    """Text page, white-overlay page, empty page and a page with a small mark"""
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), "Signed and agreed", fontsize=14)
+    doc.new_page().draw_rect(pymupdf.Rect(100, 100, 300, 150), color=(1, 1, 1), fill=(1, 1, 1))
+    doc.new_page()
+    doc.new_page().draw_rect(pymupdf.Rect(200, 600, 260, 620), color=(0, 0, 0), fill=(0, 0, 0))
+    return doc.tobytes()
+
+
+def test_ink_stats_on_white_page_with_ink():
+    gray = np.full((100, 100), 250, dtype=np.uint8)
+    gray[:5, :20] = 10
+
+    stats = ink_stats(gray)
+
+    assert stats['background'] == 250
+    assert stats['ink'] == 0.01
+
+
+def test_ink_stats_on_blank_and_dark_pages():
+    assert ink_stats(np.full((50, 50), 255, dtype=np.uint8)) == {'background': 255, 'ink': 0.0}
+    # Nothing can be darker than a black page
+    assert ink_stats(np.zeros((50, 50), dtype=np.uint8))['ink'] == 0.0
+
+
+def test_find_blank_pages():
+    pdf = make_pdf()
+
+    assert find_blank_pages(pdf) == {1, 2}
+    assert find_blank_pages(pdf, [0, 2]) == {2}
+
+
+def test_find_empty_pages_keeps_white_overlays():
+    assert find_empty_pages(make_pdf()) == {2}
+
+
+def test_find_empty_pages_keeps_form_fields():
+    doc = pymupdf.open()
+    doc.new_page()
+    widget = pymupdf.Widget()
+    widget.field_type = pymupdf.PDF_WIDGET_TYPE_TEXT
+    widget.field_name = 'signed_by'
+    widget.field_value = 'Jane Doe'
+    widget.rect = pymupdf.Rect(72, 72, 272, 100)
+    doc[0].add_widget(widget)
+    doc.new_page()
+
+    assert doc[0].first_annot is None
+    assert find_empty_pages(doc.tobytes()) == {1}
+
+
+class FakeDetector:
+    """Predicts one box per image, scored by the image's value"""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, batch, verbose=False):
+        self.batches.append(list(batch))
+        return [
+            SimpleNamespace(
+                boxes=SimpleNamespace(data=np.array([[0, 0, 1, 1, img, 0]], dtype=np.float32)),
+                names={0: 'signature'}
+            )
+            for img in batch
+        ]
+
+
+def test_detect_kept_pages_yields_every_page_in_order():
+    model = FakeDetector()
+    pages = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6]
+
+    out = list(detect_kept_pages(model, pages, skip={0, 2, 3, 5}, batch_size=1))
+
+    assert [page_num for page_num, _, _ in out] == list(range(6))
+    assert [img for _, img, _ in out] == pages
+    assert model.batches == [[0.2], [0.5]]
+    for page_num, img, detections in out:
+        if page_num in {0, 2, 3, 5}:
+            assert detections.get('skipped')
+            assert detections['labels'] == []
+        else:
+            np.testing.assert_allclose(detections['scores'], [img])
+
+
+def test_detect_kept_pages_with_every_page_skipped():
+    model = FakeDetector()
+
+    out = list(detect_kept_pages(model, ['a', 'b'], skip={0, 1}))
+
+    assert [(page_num, img) for page_num, img, _ in out] == [(0, 'a'), (1, 'b')]
+    assert model.batches == []
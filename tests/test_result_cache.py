@@ -0,0 +1,130 @@
+import os
+
+import shared_utils.result_cache as result_cache
+from shared_utils.result_cache import DiskBudget, ResultCache, cache_key, document_hash, evict_lru
+
+
+def age(path, seconds):
+    """Make a file look last used seconds ago"""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - seconds * 10**9))
+
+
+def test_put_then_get(tmp_path):
+    cache = ResultCache(str(tmp_path), max_mb=8)
+    key = cache_key('ela', document_hash(b'%PDF'), dpi=300)
+
+    assert cache.get(key) is None
+    assert cache.get(key, 'missing') == 'missing'
+    cache.put(key, {'pages': [1, 2]})
+    assert cache.get(key) == {'pages': [1, 2]}
+
+
+def test_keys_depend_on_kind_document_and_params():
+    doc = document_hash(b'%PDF')
+
+    assert cache_key('ela', doc, dpi=300, workers=None) == cache_key('ela', doc, workers=None, dpi=300)
+    assert len({
+        cache_key('ela', doc, dpi=300),
+        cache_key('ela', doc, dpi=200),
+        cache_key('signatures', doc, dpi=300),
+        cache_key('ela', document_hash(b'%PDF-other'), dpi=300)
+    }) == 4
+
+
+def test_get_or_compute_stores_only_real_results(tmp_path):
+    cache = ResultCache(str(tmp_path), max_mb=8)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value
+
+    assert cache.get_or_compute('a', lambda: compute(1)) == 1
+    assert cache.get_or_compute('a', lambda: compute(2)) == 1
+    assert cache.get_or_compute('b', lambda: compute(None)) is None
+    assert cache.get_or_compute('b', lambda: compute(3)) == 3
+    assert calls == [1, None, 3]
+
+
+def test_unreadable_entry_is_discarded(tmp_path):
+    cache = ResultCache(str(tmp_path), max_mb=8)
+    cache.put('key', 'value')
+    with open(cache._path('key'), 'wb') as f:
+        f.write(b'not a pickle')
+
+    assert cache.get('key') is None
+    assert not os.path.exists(cache._path('key'))
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_mb=0)
+    cache.put('key', 'value')
+
+    assert cache.get('key') is None
+    assert not os.path.exists(cache.directory)
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_mb=1)
+    blob = b'x' * (400 * 1024)
+    for i, key in enumerate(['old', 'used', 'new']):
+        cache.put(key, blob)
+        age(cache._path(key), 100 - i)
+    # Reading an entry makes it the most recently used
+    assert cache.get('used') == blob
+
+    cache.evict()
+
+    assert cache.get('old') is None
+    assert cache.get('used') == cache.get('new') == blob
+
+
+def test_evict_lru_returns_remaining_size(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"{i}.bin"
+        path.write_bytes(b'x' * 100)
+        age(str(path), 10 - i)
+        paths.append(str(path))
+
+    assert evict_lru(paths + [str(tmp_path / 'gone.bin')], 250) == 200
+    assert sorted(os.listdir(tmp_path)) == ['2.bin', '3.bin']
+
+
+class Directory:
+    """Stands in for a cache directory, counting how often it is listed"""
+
+    def __init__(self, tmp_path):
+        self.path = tmp_path
+        self.scans = 0
+
+    def write(self, name, nbytes):
+        (self.path / name).write_bytes(b'x' * nbytes)
+        return nbytes
+
+    def list_files(self):
+        self.scans += 1
+        return [str(p) for p in self.path.iterdir()]
+
+
+def test_budget_rescans_only_when_over_or_stale(tmp_path, monkeypatch):
+    directory = Directory(tmp_path)
+    budget = DiskBudget(1000, directory.list_files)
+
+    budget.add(directory.write('a', 300))
+    assert directory.scans == 1
+    budget.add(directory.write('b', 300))
+    budget.add(directory.write('c', 300))
+    assert directory.scans == 1
+
+    # Going over the estimate rescans and evicts the oldest file
+    age(str(tmp_path / 'a'), 10)
+    budget.add(directory.write('d', 300))
+    assert directory.scans == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['b', 'c', 'd']
+
+    # A stale estimate is refreshed even when the write fits
+    monkeypatch.setattr(result_cache, 'RESCAN_INTERVAL', -1)
+    budget.add(directory.write('e', 10))
+    assert directory.scans == 3
@@ -0,0 +1,39 @@
+import pytest
+
+import core
+import service.server as server
+from service.server import MAX_DPI, HttpError
+
+
+def test_dpi_is_clamped(monkeypatch):
+    calls = []
+    monkeypatch.setattr(core, 'detect_signatures', lambda body, **kwargs: calls.append(kwargs) or {})
+
+    server._detect(b'%PDF', {'dpi': ['100000'], 'coarse_dpi': ['100000']})
+    server._detect(b'%PDF', {'dpi': ['-5']})
+
+    assert (calls[0]['dpi'], calls[0]['coarse_dpi']) == (MAX_DPI, MAX_DPI)
+    assert (calls[1]['dpi'], calls[1]['coarse_dpi']) == (1, None)
+
+
+def test_tiled_with_coarse_dpi_is_a_bad_request():
+    with pytest.raises(HttpError) as e:
+        server._detect(b'%PDF', {'tiled': ['1'], 'coarse_dpi': ['72']})
+
+    assert e.value.status == 400
+
+
+def test_undecodable_pdf_is_a_bad_request():
+    with pytest.raises(HttpError) as e:
+        server._ela(b'not a pdf', {})
+
+    assert e.value.status == 400
+
+
+def test_analysis_errors_are_not_blamed_on_the_input(monkeypatch):
+    def broken(body, **kwargs):
+        raise ValueError("bug in the analysis")
+    monkeypatch.setattr(core, 'analyze_manipulation', broken)
+
+    with pytest.raises(ValueError):
+        server._ela(b'%PDF', {})
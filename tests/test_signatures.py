@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pymupdf
+import pytest
+from PIL import Image
+
+from core import detect_signatures
+from shared_utils.convert_pdf import open_pdf, render_page
+
+
+class InkBoxDetector:
+    """Reports the bounding box of all dark pixels on a page as one signature"""
+
+    def predict(self, batch, verbose=False):
+        results = []
+        for img in batch:
+            ys, xs = np.nonzero(np.asarray(img).min(axis=2) < 100)
+            rows = [[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1, 0.9, 0]] if len(xs) else []
+            results.append(SimpleNamespace(
+                boxes=SimpleNamespace(data=np.array(rows, dtype=np.float32).reshape(-1, 6)),
+                names={0: 'signature'}
+            ))
+        return results
+
+
+def make_pdf(rotate=0):
+    doc = pymupdf.open()
+    page = doc.new_page()
+    page.draw_rect(pymupdf.Rect(100, 600, 220, 630), color=(0, 0, 0), fill=(0, 0, 0))
+    page.set_rotation(rotate)
+    return doc.tobytes()
+
+
+@pytest.mark.parametrize('rotate', [0, 90])
+def test_coarse_boxes_are_reported_at_the_crop_dpi(rotate):
+    pdf = make_pdf(rotate)
+    full = detect_signatures(pdf, dpi=200, model=InkBoxDetector(), use_cache=False, workers=1,
+                             with_crops=True)
+    coarse = detect_signatures(pdf, dpi=200, model=InkBoxDetector(), use_cache=False, workers=1,
+                               with_crops=True, coarse_dpi=72)
+
+    assert full['dpi'] == coarse['dpi'] == 200
+    full_sig, coarse_sig = full['pages'][0]['signatures'][0], coarse['pages'][0]['signatures'][0]
+    # Same box, up to the rounding of a 72 DPI render
+    assert np.abs(np.subtract(full_sig['bbox'], coarse_sig['bbox'])).max() <= 200 / 72 + 1
+
+    with open_pdf(pdf) as doc:
+        page = render_page(doc[0], dpi=200, as_array=True)
+    for result in (full, coarse):
+        signature, crop = result['pages'][0]['signatures'][0], result['pages'][0]['crops'][0]
+        x1, y1, x2, y2 = signature['crop_bbox']
+        assert crop.shape[:2] == (y2 - y1, x2 - x1)
+        np.testing.assert_array_equal(page[y1:y2, x1:x2], crop)
+
+
+def test_batch_records_match_written_crops(tmp_path, monkeypatch):
+    import core.signatures
+    from shared_utils.batch import process_document
+
+    monkeypatch.setattr(core.signatures, 'get_signature_detector', InkBoxDetector)
+    path = tmp_path / 'doc.pdf'
+    path.write_bytes(make_pdf())
+
+    record = process_document(str(path), ('signatures',), crops_dir=str(tmp_path / 'crops'), dpi=200,
+                              coarse_dpi=72)
+
+    assert record['status'] == 'ok', record.get('traceback')
+    signature = record['signatures'][0]
+    assert signature['dpi'] == 200
+    x1, y1, x2, y2 = signature['crop_bbox']
+    with Image.open(signature['crop']) as crop:
+        assert crop.size == (x2 - x1, y2 - y1)
+    bx1, by1, bx2, by2 = signature['bbox']
+    assert x1 <= bx1 < bx2 <= x2 and y1 <= by1 < by2 <= y2
@@ -0,0 +1,62 @@
+import numpy as np
+
+from shared_utils.tiling import ink_density, merge_overlapping, tile_origins
+
+
+def test_tiles_cover_page_with_edge_aligned_last_row():
+    origins, tile_h, tile_w = tile_origins(1000, 1500, tile_size=640, overlap=0.25)
+
+    assert (tile_h, tile_w) == (640, 640)
+    assert sorted(set(origins[:, 0])) == [0, 360]
+    assert sorted(set(origins[:, 1])) == [0, 480, 860]
+    assert len(origins) == 6
+    assert (origins[:, 0] + tile_h).max() == 1000
+    assert (origins[:, 1] + tile_w).max() == 1500
+
+
+def test_page_smaller_than_a_tile_is_one_tile():
+    origins, tile_h, tile_w = tile_origins(300, 200, tile_size=640)
+
+    np.testing.assert_array_equal(origins, [[0, 0]])
+    assert (tile_h, tile_w) == (300, 200)
+
+
+def test_ink_density_per_tile():
+    page = np.full((200, 200, 3), 255, dtype=np.uint8)
+    page[0:10, 0:10] = 0
+    origins = np.array([[0, 0], [100, 100]])
+
+    np.testing.assert_allclose(ink_density(page, origins, 100, 100), [0.01, 0.0])
+
+
+def test_merges_pieces_split_by_a_tile_edge():
+    boxes = np.array([
+        [0, 0, 100, 50],
+        [80, 0, 160, 50],
+        [300, 300, 320, 320]
+    ], dtype=np.float32)
+    scores = np.array([0.6, 0.9, 0.7], dtype=np.float32)
+
+    # Overlap of the first two is 20x50, 25% of the smaller box
+    merged = merge_overlapping(boxes, scores, ['signature'] * 3, match_threshold=0.2)
+
+    np.testing.assert_array_equal(merged['boxes'], [[0, 0, 160, 50], [300, 300, 320, 320]])
+    np.testing.assert_allclose(merged['scores'], [0.9, 0.7])
+    assert merged['labels'] == ['signature', 'signature']
+
+
+def test_keeps_boxes_of_different_labels_apart():
+    boxes = np.array([[0, 0, 100, 100], [10, 10, 90, 90]], dtype=np.float32)
+    scores = np.array([0.8, 0.9], dtype=np.float32)
+
+    merged = merge_overlapping(boxes, scores, ['signature', 'initials'])
+
+    assert len(merged['boxes']) == 2
+    assert merged['labels'] == ['initials', 'signature']
+
+
+def test_merge_with_no_boxes():
+    merged = merge_overlapping(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), [])
+
+    assert merged['boxes'].shape == (0, 4)
+    assert merged['labels'] == []